@@ -60,6 +60,57 @@ export async function fetchBriefing(
   return response.json();
 }
 
+export interface BriefingStreamHandlers {
+  onToken?: (delta: string) => void;
+  onField?: (name: string, value: unknown) => void;
+  onTimings?: (timings: { first_token_ms: number | null; total_ms: number; cached: boolean }) => void;
+}
+
+/**
+ * Stream a briefing over SSE: insight fields arrive as the LLM writes them,
+ * resolving with the full Briefing once the final event is received.
+ */
+export async function streamBriefing(
+  accountId: string,
+  role: "sdr" | "ae" = "ae",
+  query: string = "",
+  handlers: BriefingStreamHandlers = {}
+): Promise<Briefing> {
+  const params = new URLSearchParams({ role, query });
+  const response = await fetch(
+    `${ORCHESTRATION_BASE_URL}/api/briefing/${accountId}/stream?${params}`,
+    { method: "POST", headers: { Accept: "text/event-stream" } }
+  );
+  if (!response.ok || !response.body) throw new Error(`Failed to stream briefing: ${response.statusText}`);
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let briefing: Briefing | null = null;
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary: number;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = frame.match(/^event: (.*)$/m)?.[1];
+      const data = frame.match(/^data: (.*)$/m)?.[1];
+      if (!event || data === undefined) continue;
+      const payload = JSON.parse(data);
+      if (event === "token") handlers.onToken?.(payload.delta);
+      else if (event === "field") handlers.onField?.(payload.name, payload.value);
+      else if (event === "briefing") briefing = payload;
+      else if (event === "done") handlers.onTimings?.(payload);
+      else if (event === "error" && !briefing) console.warn("Briefing stream:", payload.detail);
+    }
+  }
+  if (!briefing) throw new Error("Briefing stream ended without a briefing");
+  return briefing;
+}
+
 export async function fetchDrillDown(
   accountId: string,
   insightId: string
@@ -0,0 +1,158 @@
+"""
+Local stand-in for the Groq OpenAI-compatible chat-completions API, for offline benchmarks.
+
+Run with: python -m bench.fake_groq --port 8090 --latency-ms 400 --failure-rate 0.02
+    --model-latency-ms openai/gpt-oss-120b=3000 makes one model slow (to exercise hedging)
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_ANSWER = {
+    "insight": "The account is consolidating cloud vendors ahead of its renewal; lead with migration cost savings.",
+    "confidence": 0.82,
+    "reasoning": "Recent filings show rising R&D spend on automation while the incumbent contract renews within six months.",
+    "sources": ["[1]", "[2]"],
+    "Action": "Book a cost-of-migration workshop with the platform engineering lead this quarter.",
+}
+
+
+def create_app(
+    latency_ms: float = 400.0,
+    jitter_ms: float = 100.0,
+    first_token_ms: float = 150.0,
+    tokens_per_second: float = 400.0,
+    failure_rate: float = 0.0,
+    failure_status: int = 503,
+    model_latency_ms: Optional[Dict[str, float]] = None,
+) -> FastAPI:
+    """
+    Completions take `latency_ms` (± `jitter_ms`); streamed ones emit the first
+    token after `first_token_ms` and the rest at `tokens_per_second`. A
+    `failure_rate` fraction of requests fail with `failure_status`: 503 like an
+    overloaded upstream, or 429 (with Retry-After) like a rate limit.
+    `model_latency_ms` overrides both the latency and the first-token delay
+    for the named models.
+    """
+    model_latency_ms = model_latency_ms or {}
+    app = FastAPI(title="Fake Groq")
+    answer = json.dumps(CANNED_ANSWER)
+    # ~4 characters per token, streamed as separate chunks
+    pieces = [answer[i:i + 4] for i in range(0, len(answer), 4)]
+    stats = {"requests": 0, "streams": 0, "failures": 0, "models": {}}
+
+    def usage(prompt: str) -> dict:
+        prompt_tokens = max(1, len(prompt) // 4)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces), "total_tokens": prompt_tokens + len(pieces)}
+
+    def delay(ms: float) -> float:
+        return max(0.0, ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if random.random() < failure_rate:
+            stats["failures"] += 1
+            await asyncio.sleep(delay(latency_ms) / 4)
+            if failure_status == 429:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached (injected failure)", "type": "tokens", "code": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": "1"},
+                )
+            return JSONResponse(
+                {"error": {"message": "Service unavailable (injected failure)", "type": "server_error"}},
+                status_code=failure_status,
+            )
+        prompt = "".join(str(m.get("content", "")) for m in body.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+        stats["models"][model] = stats["models"].get(model, 0) + 1
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay(model_latency_ms.get(model, latency_ms)))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage(prompt),
+            }
+
+        stats["streams"] += 1
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> bytes:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+        async def events():
+            await asyncio.sleep(delay(model_latency_ms.get(model, first_token_ms)))
+            yield chunk({"role": "assistant", "content": ""})
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(1.0 / tokens_per_second)
+                yield chunk({"content": piece})
+            yield chunk({}, "stop", x_groq={"id": completion_id, "usage": usage(prompt)})
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--first-token-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=503, help="503 (overloaded) or 429 (rate limited)")
+    parser.add_argument(
+        "--model-latency-ms", action="append", default=[], metavar="MODEL=MS",
+        help="latency (and first-token delay) for one model; repeatable",
+    )
+    args = parser.parse_args()
+    model_latency_ms = {}
+    for spec in args.model_latency_ms:
+        model, _, ms = spec.rpartition("=")
+        model_latency_ms[model] = float(ms)
+
+    import uvicorn
+
+    uvicorn.run(
+        create_app(
+            args.latency_ms, args.jitter_ms, args.first_token_ms, args.tokens_per_second, args.failure_rate,
+            args.failure_status, model_latency_ms,
+        ),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
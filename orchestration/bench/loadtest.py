@@ -0,0 +1,319 @@
+"""
+Load test for the orchestration service against a local fake Groq server, fully offline.
+
+Run from orchestration/:
+    python -m bench.loadtest --concurrency 16 --requests 400
+    python -m bench.loadtest --scenarios briefing --refresh --compare bench/results/<earlier>.json
+
+Starts bench.fake_groq and the FastAPI app (hashing embeddings, throwaway cache
+directories, no databases required) unless --base-url points at a running
+service, drives each scenario in turn and writes throughput plus p50/p95/p99
+latency to a JSON file so runs can be compared between commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ORCHESTRATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["briefing", "stream", "drill_down", "graph"]
+QUERIES = ["", "cloud migration", "renewal risk", "hiring trends", "competitive threats"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed: float, extra: Optional[Dict[str, List[float]]] = None) -> Dict[str, Any]:
+    values = sorted(latencies_ms)
+    summary = {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+    for name, samples in (extra or {}).items():
+        samples = sorted(samples)
+        summary[f"{name}_p50_ms"] = round(percentile(samples, 0.50), 2)
+        summary[f"{name}_p95_ms"] = round(percentile(samples, 0.95), 2)
+    return summary
+
+
+def app_env(workdir: str, groq_url: str) -> Dict[str, str]:
+    """Environment for running the app offline: hashing embeddings, state under `workdir`, no databases."""
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_URL": groq_url,
+        "GROQ_API_KEY": "bench",
+        "EMBEDDING_BACKEND": "hashing",
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite"),
+        "VECTOR_BACKEND": "numpy",
+        "VECTOR_INDEX_PATH": os.path.join(workdir, "vector_index"),
+        "LEXICAL_INDEX_PATH": os.path.join(workdir, "lexical_index"),
+        "PROVENANCE_PATH": os.path.join(workdir, "provenance.sqlite"),
+        "BRIEFING_CACHE_SHARED_PATH": os.path.join(workdir, "briefings.sqlite"),
+        "WATERMARK_BRIEFING_PATH": os.path.join(workdir, "watermarked_briefings.sqlite"),
+        # Nothing listens here, so SQL retrieval fails fast instead of waiting on a connect timeout
+        "PG_HOST": "127.0.0.1",
+        "PG_PORT": str(free_port()),
+    })
+    return env
+
+
+class Stack:
+    """The fake Groq server plus the orchestration app, as subprocesses on free ports."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.processes: List[subprocess.Popen] = []
+        self.workdir = tempfile.mkdtemp(prefix="salesai-bench-")
+        self.base_url = ""
+
+    def _spawn(self, cmd: List[str], env: Dict[str, str], name: str) -> None:
+        log = open(os.path.join(self.workdir, f"{name}.log"), "wb")
+        self.processes.append(subprocess.Popen(cmd, cwd=ORCHESTRATION_DIR, env=env, stdout=log, stderr=subprocess.STDOUT))
+
+    def start(self) -> str:
+        args = self.args
+        groq_port, app_port = free_port(), free_port()
+        self._spawn(
+            [
+                sys.executable, "-m", "bench.fake_groq", "--port", str(groq_port),
+                "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+                "--first-token-ms", str(args.llm_first_token_ms), "--tokens-per-second", str(args.llm_tokens_per_second),
+                "--failure-rate", str(args.llm_failure_rate), "--failure-status", str(args.llm_failure_status),
+            ],
+            dict(os.environ),
+            "fake_groq",
+        )
+        env = app_env(self.workdir, f"http://127.0.0.1:{groq_port}/openai/v1/chat/completions")
+        env.update({"HOST": "127.0.0.1", "PORT": str(app_port), "WORKERS": str(args.workers)})
+        self._spawn(
+            [sys.executable, "orchestration.py"],
+            env,
+            "orchestration",
+        )
+        self.base_url = f"http://127.0.0.1:{app_port}"
+        deadline = time.monotonic() + args.startup_timeout
+        while time.monotonic() < deadline:
+            for process in self.processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"a benchmark process exited early; see logs in {self.workdir}")
+            try:
+                if httpx.get(f"{self.base_url}/health", timeout=1.0).status_code == 200:
+                    return self.base_url
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"orchestration app did not become healthy; see logs in {self.workdir}")
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    args: argparse.Namespace,
+    insights: List[Tuple[str, str]],
+) -> Dict[str, Any]:
+    """Issue `args.requests` requests for one scenario from `args.concurrency` workers."""
+    accounts = [f"acct-{i:03d}" for i in range(args.accounts)]
+    remaining = args.requests
+    latencies: List[float] = []
+    first_event: List[float] = []
+    errors = 0
+    refresh = "true" if args.refresh else "false"
+
+    async def one() -> None:
+        nonlocal errors
+        account = random.choice(accounts)
+        query = random.choice(QUERIES)
+        start = time.perf_counter()
+        try:
+            if name == "briefing":
+                response = await client.post(f"/api/briefing/{account}", params={"query": query, "refresh": refresh})
+                response.raise_for_status()
+                insight = response.json()["insights"][0]
+                if len(insights) < 1000:
+                    insights.append((account, insight["id"]))
+            elif name == "stream":
+                async with client.stream(
+                    "GET", f"/api/briefing/{account}/stream", params={"query": query, "refresh": refresh}
+                ) as response:
+                    response.raise_for_status()
+                    first = None
+                    async for _ in response.aiter_bytes():
+                        if first is None:
+                            first = (time.perf_counter() - start) * 1000
+                    first_event.append(first or 0.0)
+            elif name == "drill_down":
+                account, insight_id = random.choice(insights)
+                response = await client.post(
+                    f"/api/briefing/{account}/drill-down", json={"insight_id": insight_id, "account_id": account}
+                )
+                response.raise_for_status()
+            elif name == "graph":
+                response = await client.get(f"/api/graph/{account}")
+                response.raise_for_status()
+        except (httpx.HTTPError, KeyError, ValueError):
+            errors += 1
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await one()
+
+    if name == "drill_down" and not insights:
+        # Drill-down needs ids of insights that were actually generated
+        seed = argparse.Namespace(**{**vars(args), "requests": min(args.accounts * 2, 50)})
+        await run_scenario(client, "briefing", seed, insights)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed, {"first_event": first_event} if name == "stream" else None)
+
+
+async def run_all(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    insights: List[Tuple[str, str]] = []
+    results: Dict[str, Any] = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.request_timeout) as client:
+        for name in args.scenarios:
+            if args.warmup:
+                warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup})
+                await run_scenario(client, name, warmup, insights)
+            results[name] = await run_scenario(client, name, args, insights)
+            r = results[name]
+            print(
+                f"{name:<11} {r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:>8.1f}ms  "
+                f"p95 {r['p95_ms']:>8.1f}ms  p99 {r['p99_ms']:>8.1f}ms  errors {r['errors']}"
+            )
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ORCHESTRATION_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\nvs baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        deltas = []
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(metric):
+                change = (result[metric] - before[metric]) / before[metric] * 100
+                deltas.append(f"{metric} {before[metric]} -> {result[metric]} ({change:+.1f}%)")
+        print(f"  {name}: " + ", ".join(deltas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="benchmark an already running service instead of starting one")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--workers", type=int, default=1, help="app worker processes (sharing the briefing cache)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--accounts", type=int, default=20, help="distinct account ids (fewer = more cache hits)")
+    parser.add_argument("--refresh", action="store_true", help="bypass the briefing cache (every briefing is cold)")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=150.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-failure-status", type=int, default=503, help="status of injected failures: 503 or 429")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="result file (default bench/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {sorted(unknown)}")
+    random.seed(args.seed)
+
+    stack = None
+    base_url = args.base_url
+    if not base_url:
+        stack = Stack(args)
+        base_url = stack.start()
+    try:
+        results = asyncio.run(run_all(base_url, args))
+    finally:
+        if stack:
+            stack.stop()
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "target": args.base_url or "local stack",
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        ORCHESTRATION_DIR, "bench", "results", f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: Briefing serialization via model_dump() + JSONResponse versus FastJSONResponse.
+
+Run from orchestration/: python -m bench.serialization [--number 2000]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.models import Briefing, BriefingMetadata, Citation, Insight
+from src.responses import FastJSONResponse
+
+
+def make_briefing(insights: int = 3, citations: int = 3, snippet_chars: int = 200) -> Briefing:
+    """A briefing shaped like real output: a few insights, each citing retrieved snippets."""
+    return Briefing(
+        metadata=BriefingMetadata(
+            account_id="acct-042",
+            account_name="Acme Manufacturing",
+            trigger_type="calendar",
+            generated_at=datetime.now(timezone.utc).isoformat(),
+            role="ae",
+        ),
+        insights=[
+            Insight(
+                id=f"ins_{i:020d}",
+                text="Acme is consolidating cloud vendors ahead of its renewal; lead with migration savings. " * 2,
+                category="opportunity",
+                confidence=0.82,
+                citations=[
+                    Citation(
+                        source_url=f"https://news.example.com/acme/{i}/{j}",
+                        title=f"Acme expands EU data-centre footprint ({j})",
+                        text_snippet=("Acme said on Tuesday it would double its EU capacity " * 8)[:snippet_chars],
+                        retrieval_method="vector",
+                        confidence=0.91,
+                    )
+                    for j in range(citations)
+                ],
+                reasoning="Recent filings show rising R&D spend on automation while the incumbent contract renews soon.",
+                action="Book a cost-of-migration workshop with the platform engineering lead this quarter.",
+            )
+            for i in range(insights)
+        ],
+        financial_metrics={"roe": "12%", "fcf_growth": "+15%", "debt_to_equity": "0.45"},
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="iterations per case")
+    args = parser.parse_args()
+
+    briefing = make_briefing()
+    cases = {
+        "single briefing (3 insights x 3 citations)": briefing,
+        "large briefing (10 insights x 8 citations)": make_briefing(10, 8, 500),
+        "batch of 50 briefings": [{"index": i, "status": "ok", "briefing": briefing} for i in range(50)],
+    }
+    assert json.loads(FastJSONResponse(briefing).body) == json.loads(JSONResponse(briefing.model_dump()).body)
+
+    def baseline(content):
+        # What the routes did: model_dump() to dicts, then the stdlib encoder
+        if isinstance(content, list):
+            return JSONResponse([{**item, "briefing": item["briefing"].model_dump()} for item in content]).body
+        return JSONResponse(content.model_dump()).body
+
+    def dict_route(content):
+        # Returning a model from a route: jsonable_encoder pass, then the stdlib encoder
+        return JSONResponse(jsonable_encoder(content)).body
+
+    print(f"{'case':<46}{'size':>9}{'model_dump+json':>18}{'jsonable_encoder':>18}{'FastJSONResponse':>18}{'speedup':>9}")
+    for name, content in cases.items():
+        size = len(FastJSONResponse(content).body)
+        timings = [
+            timeit.timeit(lambda: fn(content), number=args.number) / args.number * 1e6
+            for fn in (baseline, dict_route, lambda c: FastJSONResponse(c).body)
+        ]
+        print(
+            f"{name:<46}{size:>8}B{timings[0]:>16.1f}us{timings[1]:>16.1f}us{timings[2]:>16.1f}us"
+            f"{timings[0] / timings[2]:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Startup-time check: import time of src.main and time from process start to the first response.
+
+Run from orchestration/:
+    python -m bench.startup
+    python -m bench.startup --runs 5 --max-first-response-s 1.5 --max-import-s 0.8
+
+Each run starts the app offline (see bench.loadtest.app_env) in a fresh
+process and polls /health/live until it answers, then /health/ready. Exits
+non-zero if the median import or first-response time exceeds its budget, so
+CI can fail a change that puts slow imports or blocking connects back on the
+startup path.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import httpx
+
+from bench.loadtest import ORCHESTRATION_DIR, app_env, free_port
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)"
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ORCHESTRATION_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_boot(env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    """Seconds from spawning uvicorn to the first /health/live 200 and the first /health/ready 200."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ORCHESTRATION_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    timings: Dict[str, float] = {}
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            for name, path in (("first_response_s", "/health/live"), ("ready_s", "/health/ready")):
+                while name not in timings:
+                    if process.poll() is not None:
+                        raise RuntimeError("app exited during startup")
+                    if time.perf_counter() - start > timeout:
+                        raise RuntimeError(f"no 200 from {path} within {timeout}s")
+                    try:
+                        if client.get(f"{base_url}{path}").status_code == 200:
+                            timings[name] = time.perf_counter() - start
+                            continue
+                    except httpx.HTTPError:
+                        pass
+                    time.sleep(0.005)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-import-s", type=float, default=1.0, help="budget for the median import of src.main")
+    parser.add_argument("--max-first-response-s", type=float, default=2.0, help="budget for the median spawn-to-first-response")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="salesai-startup-")
+    try:
+        env = app_env(workdir, "http://127.0.0.1:9/openai/v1/chat/completions")
+        # Backends fail fast against the unreachable ports, so /health/ready settles after one attempt
+        imports = [measure_import(env) for _ in range(args.runs)]
+        boots = [measure_boot(env, args.timeout) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "import_s": round(statistics.median(imports), 3),
+        "first_response_s": round(statistics.median(b["first_response_s"] for b in boots), 3),
+        "ready_s": round(statistics.median(b["ready_s"] for b in boots), 3),
+        "runs": args.runs,
+    }
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if result["import_s"] > args.max_import_s:
+        failures.append(f"import of src.main took {result['import_s']}s (budget {args.max_import_s}s)")
+    if result["first_response_s"] > args.max_first_response_s:
+        failures.append(f"first response after {result['first_response_s']}s (budget {args.max_first_response_s}s)")
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
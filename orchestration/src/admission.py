@@ -0,0 +1,264 @@
+"""
+LLM admission control: request/token rate limits and a priority queue in front of the GROQ client.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from src.config import settings
+from src.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_WAIT_SECONDS, LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+BATCH = 1
+PREWARM = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", PREWARM: "prewarm"}
+
+
+class AdmissionTimeout(Exception):
+    """The request waited longer than its class allows, or the queue was full."""
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute / 60` units per second up to `burst` (default: one
+    minute's worth). A rate of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else float(per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be now)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        # Requests larger than the bucket are admitted once it is full
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        if self.rate:
+            self._refill(now)
+            self.tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Return (positive) or charge (negative) the difference between estimated and actual use."""
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdmissionController:
+    """
+    Admits LLM calls in priority order while both the requests-per-minute and
+    tokens-per-minute buckets can cover them.
+
+    Waiting calls are ordered by class (INTERACTIVE, BATCH, PREWARM), then by
+    when they're needed (a meeting's start, else arrival), so background work
+    only runs on capacity interactive traffic leaves over. Only the head of the
+    queue is admitted, so a large request isn't overtaken indefinitely by
+    smaller ones behind it. A 429 pauses all admissions for its Retry-After.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_queue: int = 1000,
+        max_wait_seconds: Optional[dict] = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds or {}
+        self._queue: List[Tuple[int, float, int, asyncio.Future, int]] = []
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self.admitted = 0
+        self.timeouts = 0
+        self.throttled = 0
+
+    async def admit(self, priority: int, tokens: int, needed_by: Optional[float] = None) -> None:
+        """
+        Wait until the call may go out. `tokens` is the estimated prompt plus
+        completion size; `needed_by` is a time.monotonic() deadline used for
+        ordering within the class.
+        """
+        name = PRIORITY_NAMES[priority]
+        if len(self._queue) >= self.max_queue:
+            self.timeouts += 1
+            ADMISSION_WAIT_SECONDS.labels(name, "rejected").observe(0.0)
+            raise AdmissionTimeout(f"LLM admission queue full ({self.max_queue})")
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, start if needed_by is None else needed_by, next(self._seq), future, tokens))
+        ADMISSION_QUEUE_DEPTH.labels(name).inc()
+        self._kick()
+        outcome = "admitted"
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait_seconds.get(priority))
+        except asyncio.TimeoutError:
+            if not future.done():
+                outcome = "timeout"
+                self.timeouts += 1
+                future.cancel()
+                raise AdmissionTimeout(f"waited over {self.max_wait_seconds.get(priority)}s for LLM capacity ({name})")
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            future.cancel()
+            raise
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(name).dec()
+            ADMISSION_WAIT_SECONDS.labels(name, outcome).observe(time.monotonic() - start)
+
+    def settle(self, estimated: int, used: Optional[int]) -> None:
+        """Correct the token bucket once the response reports actual usage."""
+        if used is not None:
+            self.tokens.adjust(estimated - used)
+
+    def throttle(self, retry_after: float) -> None:
+        """Upstream said 429: admit nothing else for `retry_after` seconds."""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        # Whatever the buckets believe, upstream has no capacity left right now
+        self.requests.tokens = min(self.requests.tokens, 0.0)
+
+    def _kick(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (e.g. the app was restarted in-process)
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        while self._queue:
+            priority, _, _, future, tokens = self._queue[0]
+            if future.done():
+                # Timed out or cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self.requests.delay(1, now), self.tokens.delay(tokens, now))
+            if wait > 0:
+                # Re-evaluate early when a new (possibly more urgent) call arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self.admitted += 1
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future, _ in self._queue:
+            if not future.done():
+                depth[PRIORITY_NAMES[priority]] += 1
+        return {
+            "queued": depth,
+            "admitted": self.admitted,
+            "timeouts": self.timeouts,
+            "throttled": self.throttled,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "request_tokens": round(self.requests.tokens, 2) if self.requests.rate else None,
+            "token_tokens": round(self.tokens.tokens, 2) if self.tokens.rate else None,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform over [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The Retry-After header of an HTTP error response, if it has one."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_reason(error: Exception) -> Optional[str]:
+    """Why a failed call is worth retrying ("rate_limited", "server_error", "connection"), else None."""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server_error"
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return "connection"
+    return None
+
+
+async def call_with_admission(
+    controller: AdmissionController,
+    call: Callable[[], Awaitable[Any]],
+    priority: int,
+    tokens: int,
+    needed_by: Optional[float] = None,
+    max_retries: int = 2,
+    backoff_base: float = 0.5,
+    backoff_cap: float = 20.0,
+) -> Any:
+    """
+    Run `call` once admitted; on 429/5xx/connection errors, back off with
+    jitter (or for Retry-After) and queue for admission again.
+    """
+    attempt = 0
+    while True:
+        await controller.admit(priority, tokens, needed_by)
+        try:
+            return await call()
+        except Exception as e:
+            reason = retry_reason(e)
+            if reason is None or attempt >= max_retries:
+                raise
+            retry_after = retry_after_seconds(e)
+            delay = retry_after if retry_after is not None else backoff_delay(attempt, backoff_base, backoff_cap)
+            if reason == "rate_limited":
+                controller.throttle(delay)
+            LLM_RETRIES.labels(reason).inc()
+            logger.warning(f"LLM call failed ({reason}), retry {attempt + 1}/{max_retries} in {delay:.2f}s: {e}")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def build_admission_controller() -> AdmissionController:
+    """Controller configured from Settings; the configured limits are split evenly across worker processes."""
+    workers = max(1, settings.workers)
+    return AdmissionController(
+        requests_per_minute=settings.llm_requests_per_minute / workers,
+        tokens_per_minute=settings.llm_tokens_per_minute / workers,
+        max_queue=settings.llm_admission_max_queue,
+        max_wait_seconds={
+            INTERACTIVE: settings.llm_admission_max_wait_interactive,
+            BATCH: settings.llm_admission_max_wait_background,
+            PREWARM: settings.llm_admission_max_wait_background,
+        },
+    )
@@ -0,0 +1,333 @@
+"""
+Briefing result cache: TTL + LRU eviction with single-flight coalescing,
+optionally backed by a tier shared between worker processes.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.kvstore import SqliteKVStore
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str, str]
+
+# Joins key parts in the shared store (doesn't occur in ids, roles or queries)
+KEY_SEPARATOR = "\x1f"
+
+
+class UncacheableResult(Exception):
+    """Raised by a compute function to hand `value` to callers without caching it."""
+
+    def __init__(self, value: Any):
+        super().__init__("result not cacheable")
+        self.value = value
+
+
+def context_fingerprint(context_text: str) -> str:
+    """Stable short hash of the assembled context used in cache keys."""
+    return hashlib.sha256(context_text.encode("utf-8")).hexdigest()[:16]
+
+
+def briefing_cache_key(account_id: str, role: str, query: str, context_text: str) -> CacheKey:
+    return (account_id, role, query.strip().lower(), context_fingerprint(context_text))
+
+
+class SharedCacheTier:
+    """
+    Cache tier shared by every worker process through one SQLite file (WAL,
+    so reads don't wait on writers).
+
+    Values are stored serialized with their origin. Leases (a second table)
+    let one process claim a key while it computes it, so the other workers
+    wait for its result instead of repeating the LLM call.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        lease_seconds: float = 90.0,
+        poll_seconds: float = 0.05,
+        max_bytes: Optional[int] = None,
+    ):
+        self._values = SqliteKVStore(path, table="briefings", max_bytes=max_bytes)
+        self._leases = SqliteKVStore(path, table="briefing_leases")
+        self.dumps = dumps
+        self.loads = loads
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._owner = str(os.getpid()).encode()
+
+    @staticmethod
+    def _key(key: CacheKey) -> str:
+        return KEY_SEPARATOR.join(key)
+
+    def get(self, key: CacheKey) -> Optional[Tuple[Optional[float], Any, str]]:
+        """(seconds left or None, value, origin) if another worker has stored `key`."""
+        entry = self._values.get_with_expiry(self._key(key))
+        if entry is None:
+            return None
+        blob, expires_at = entry
+        origin, _, payload = bytes(blob).partition(b"\n")
+        try:
+            value = self.loads(payload)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable shared cache entry: {e}")
+            return None
+        return (expires_at - time.time() if expires_at is not None else None), value, origin.decode()
+
+    def put(self, key: CacheKey, value: Any, ttl: float, origin: str) -> None:
+        self._values.put(self._key(key), origin.encode() + b"\n" + self.dumps(value), ttl=ttl)
+
+    def acquire(self, key: CacheKey) -> bool:
+        """Claim `key` for computing; False while another worker's lease is live."""
+        return self._leases.put_if_absent(self._key(key), self._owner, ttl=self.lease_seconds)
+
+    def release(self, key: CacheKey) -> None:
+        self._leases.delete(self._key(key))
+
+    def invalidate(self, account_id: Optional[str] = None) -> int:
+        return self._values.delete_prefix("" if account_id is None else account_id + KEY_SEPARATOR)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def close(self) -> None:
+        self._values.close()
+        self._leases.close()
+
+
+class BriefingCache:
+    """
+    In-memory cache of generated briefings.
+
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted once `max_entries` is reached. Concurrent misses for the same key
+    share one in-flight computation instead of each calling the LLM. It runs
+    in its own task, so a caller that is cancelled (client disconnect) only
+    stops waiting; the others still get the result.
+
+    With a `shared` tier, misses fall through to it, new entries are written
+    to it, and a miss no worker has stored yet is computed by whichever
+    worker takes the lease first while the others wait for its result. Its
+    SQLite reads and writes run in worker threads, off the event loop.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 512, shared: Optional[SharedCacheTier] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any, str]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        # Hits served from entries written by the pre-warm scheduler
+        self.prewarmed_hits = 0
+        # Served from the shared tier, and misses that waited on another worker's lease
+        self.shared_hits = 0
+        self.shared_waits = 0
+
+    def _lookup(self, key: CacheKey) -> Optional[Tuple[float, Any, str]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def _lookup_shared(self, key: CacheKey) -> Optional[Tuple[float, Any, str]]:
+        """Copy an entry another worker stored into memory, for at most its remaining TTL."""
+        if self.shared is None:
+            return None
+        try:
+            found = await asyncio.to_thread(self.shared.get, key)
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return None
+        if found is None:
+            return None
+        remaining, value, origin = found
+        self._remember(key, value, self.ttl_seconds if remaining is None else min(remaining, self.ttl_seconds), origin)
+        self.shared_hits += 1
+        return self._entries[key]
+
+    async def get(self, key: CacheKey) -> Optional[Any]:
+        entry = self._lookup(key) or await self._lookup_shared(key)
+        return entry[1] if entry else None
+
+    def origin(self, key: CacheKey) -> Optional[str]:
+        """Who produced the cached entry ("request" or "prewarm"), if present and unexpired."""
+        entry = self._entries.get(key)
+        return entry[2] if entry and entry[0] > time.monotonic() else None
+
+    def record_hit(self, key: CacheKey) -> None:
+        self.hits += 1
+        if self.origin(key) == "prewarm":
+            self.prewarmed_hits += 1
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    def _remember(self, key: CacheKey, value: Any, ttl: float, origin: str) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value, origin)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def set(self, key: CacheKey, value: Any, ttl: Optional[float] = None, origin: str = "request") -> None:
+        ttl = self.ttl_seconds if ttl is None else ttl
+        self._remember(key, value, ttl, origin)
+        await self._put_shared(key, value, ttl, origin)
+
+    async def _put_shared(self, key: CacheKey, value: Any, ttl: float, origin: str) -> None:
+        if self.shared is None:
+            return
+        try:
+            await asyncio.to_thread(self.shared.put, key, value, ttl, origin)
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def invalidate(self, account_id: Optional[str] = None) -> int:
+        """
+        Drop all entries, or only those for one account. Returns the count
+        removed from memory (copies other workers hold in memory live out their TTL).
+        """
+        if self.shared is not None:
+            self.shared.invalidate(account_id)
+        if account_id is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        stale = [k for k in self._entries if k[0] == account_id]
+        for k in stale:
+            del self._entries[k]
+        return len(stale)
+
+    async def _await_other_worker(self, key: CacheKey) -> Tuple[bool, Optional[Tuple[float, Any, str]]]:
+        """
+        Take the shared lease for `key`, or wait for the worker holding it to
+        store a result. Returns (holding the lease, entry found meanwhile).
+        Gives up waiting after one lease period and computes without the lease.
+        """
+        deadline = time.monotonic() + self.shared.lease_seconds
+        waited = False
+        while True:
+            try:
+                if await asyncio.to_thread(self.shared.acquire, key):
+                    return True, None
+            except Exception as e:
+                logger.warning(f"Shared cache lease failed: {e}")
+                return False, None
+            if not waited:
+                waited = True
+                self.shared_waits += 1
+            if time.monotonic() >= deadline:
+                return False, None
+            await asyncio.sleep(self.shared.poll_seconds)
+            entry = await self._lookup_shared(key)
+            if entry is not None:
+                return False, entry
+
+    async def get_or_compute(
+        self,
+        key: CacheKey,
+        compute: Callable[[], Awaitable[Any]],
+        bypass: bool = False,
+        ttl: Optional[float] = None,
+        origin: str = "request",
+    ) -> Any:
+        """
+        Return the cached value for `key`, or run `compute` once and cache it.
+        Degraded results (e.g. LLM fallbacks) can be returned uncached by
+        raising `UncacheableResult` from `compute`.
+
+        With `bypass=True` the cached value is ignored and refreshed, but the
+        call still joins an identical computation that is already running.
+        """
+        if not bypass:
+            entry = self._lookup(key) or await self._lookup_shared(key)
+            if entry is not None:
+                if origin == "request":
+                    self.record_hit(key)
+                return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._compute(key, compute, bypass, ttl, origin))
+            self._inflight[key] = task
+            # Consumed even if every caller has gone, so a failure isn't logged as never retrieved
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self,
+        key: CacheKey,
+        compute: Callable[[], Awaitable[Any]],
+        bypass: bool,
+        ttl: Optional[float],
+        origin: str,
+    ) -> Any:
+        """The in-flight computation for `key`: wait for another worker's result or run `compute` and cache it."""
+        leased = False
+        try:
+            if self.shared is not None and not bypass:
+                leased, entry = await self._await_other_worker(key)
+                if entry is not None:
+                    if origin == "request":
+                        self.record_hit(key)
+                    return entry[1]
+            if origin == "request":
+                self.record_miss()
+            try:
+                value = await compute()
+            except UncacheableResult as e:
+                return e.value
+            ttl = self.ttl_seconds if ttl is None else ttl
+            self._remember(key, value, ttl, origin)
+            # Stored before the lease is released, so waiting workers find it
+            await self._put_shared(key, value, ttl, origin)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            if leased:
+                try:
+                    await asyncio.to_thread(self.shared.release, key)
+                except Exception as e:
+                    logger.warning(f"Shared cache lease release failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "prewarmed_hits": self.prewarmed_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "inflight": len(self._inflight),
+            "shared": self.shared is not None,
+            "shared_hits": self.shared_hits,
+            "shared_waits": self.shared_waits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        if self.shared is not None:
+            self.shared.close()
@@ -0,0 +1,149 @@
+"""
+Streaming, token-bounded chunking of long documents (e.g. SEC filings) for embedding.
+"""
+import re
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Tuple
+
+# Characters handed to the splitter at a time
+BLOCK_CHARS = 65536
+
+# End of a sentence (terminal punctuation, optional closing quote/bracket, whitespace) or of a line
+_BOUNDARY_RE = re.compile(r"[.!?]+[\"')\]]*\s+|\n\s*")
+_WORD_RE = re.compile(r"\S+\s*")
+
+
+class Chunk:
+    """One chunk of a document: its position, text and approximate token count."""
+
+    def __init__(self, index: int, text: str, tokens: int, char_start: int):
+        self.index = index
+        self.text = text
+        self.tokens = tokens
+        self.char_start = char_start
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.index}, tokens={self.tokens}, char_start={self.char_start})"
+
+
+def iter_file(path: str, block_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    """A text file in blocks, so a large filing is never held in memory whole."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                return
+            yield block
+
+
+def document_pieces(doc: Dict[str, Any], block_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    """A canonical document's title and text, as the splitter consumes them."""
+    title = doc.get("title") or ""
+    if title:
+        yield f"{title}\n\n"
+    text = doc.get("text") or ""
+    for start in range(0, len(text), block_chars):
+        yield text[start:start + block_chars]
+
+
+def iter_units(pieces: Iterable[str], max_unit_chars: int = 8192) -> Iterator[str]:
+    """
+    Split streamed text into sentences/lines, each with its trailing
+    whitespace so they concatenate back to the input. Text with no boundary
+    for `max_unit_chars` is cut at the last space before that point.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        end = 0
+        for match in _BOUNDARY_RE.finditer(buffer):
+            yield buffer[end:match.end()]
+            end = match.end()
+        buffer = buffer[end:]
+        while len(buffer) > max_unit_chars:
+            cut = buffer.rfind(" ", 0, max_unit_chars) + 1 or max_unit_chars
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer:
+        yield buffer
+
+
+def _split_long_unit(unit: str, max_tokens: int, count_tokens: Callable[[str], int]) -> Iterator[Tuple[str, int]]:
+    """Word-wise pieces of a unit that alone exceeds the chunk size."""
+    part, part_tokens = "", 0
+    for word in _WORD_RE.findall(unit) or [unit]:
+        tokens = count_tokens(word)
+        if tokens > max_tokens:
+            # Nothing to split on (e.g. a long table row): cut by characters
+            step = max(1, len(word) * max_tokens // tokens)
+            if part:
+                yield part, part_tokens
+            for start in range(0, len(word), step):
+                piece = word[start:start + step]
+                yield piece, count_tokens(piece)
+            part, part_tokens = "", 0
+            continue
+        if part and part_tokens + tokens > max_tokens:
+            yield part, part_tokens
+            part, part_tokens = "", 0
+        part += word
+        part_tokens += tokens
+    if part:
+        yield part, part_tokens
+
+
+def _has_text(window: Iterable[Tuple[str, int, int]]) -> bool:
+    return any(not unit.isspace() for unit, _, _ in window)
+
+
+def chunk_text(
+    pieces: Iterable[str],
+    max_tokens: int,
+    overlap_tokens: int,
+    count_tokens: Callable[[str], int],
+) -> Iterator[Chunk]:
+    """
+    Yield chunks of at most ~`max_tokens` (summed per sentence) built from
+    whole sentences where possible. Each chunk after the first starts with
+    the trailing sentences of the previous one, up to `overlap_tokens`.
+    Only the current chunk is held in memory.
+    """
+    window: Deque[Tuple[str, int, int]] = deque()  # (text, tokens, char offset)
+    window_tokens = 0
+    # Units in the window that no emitted chunk has covered yet
+    fresh = 0
+    index = 0
+    offset = 0
+
+    def emit() -> Chunk:
+        nonlocal index
+        text = "".join(unit for unit, _, _ in window)
+        chunk = Chunk(index, text.strip(), window_tokens, window[0][2] + len(text) - len(text.lstrip()))
+        index += 1
+        return chunk
+
+    for unit in iter_units(pieces):
+        parts = [(unit, count_tokens(unit))]
+        if parts[0][1] > max_tokens:
+            parts = list(_split_long_unit(unit, max_tokens, count_tokens))
+        for text, tokens in parts:
+            if fresh and window_tokens + tokens > max_tokens:
+                if _has_text(window):
+                    yield emit()
+                fresh = 0
+                # Keep the tail of the chunk as overlap, leaving room for this unit
+                kept = 0
+                overlap: List[Tuple[str, int, int]] = []
+                for item in reversed(window):
+                    if kept + item[1] > overlap_tokens or kept + item[1] + tokens > max_tokens:
+                        break
+                    overlap.append(item)
+                    kept += item[1]
+                window = deque(reversed(overlap))
+                window_tokens = kept
+            window.append((text, tokens, offset))
+            window_tokens += tokens
+            fresh += 1
+            offset += len(text)
+    if fresh and _has_text(window):
+        yield emit()
@@ -8,29 +8,194 @@ class Settings(BaseSettings):
     groq_api_url: str = "https://api.groq.com/openai/v1/chat/completions"
     groq_api_key: str = "API"
     groq_model: str = "openai/gpt-oss-120b"
-    
+    groq_max_connections: int = 20
+    groq_max_keepalive_connections: int = 10
+    groq_keepalive_expiry: float = 30.0
+    groq_connect_timeout: float = 5.0
+    groq_read_timeout: float = 60.0
+    groq_max_retries: int = 2
+    # Completion tokens requested per synthesis (reserved out of the context budget)
+    llm_max_tokens: int = 1024
+    # Model routing: "role[:trigger]=tier" rules over the "deep" (GROQ_MODEL) and "fast" tiers; unmatched
+    # calls (all of them by default) use GROQ_MODEL. Interactive deep calls are hedged with the fast model
+    # after LLM_HEDGE_AFTER_MS without a token (0 = off, the default)
+    llm_fast_model: str = "llama-3.1-8b-instant"
+    llm_routes: str = ""
+    llm_hedge_after_ms: float = 0.0
+    # Latency history needed before a latency budget can reroute a tier
+    llm_route_min_samples: int = 20
+    # Admission control: account-wide Groq limits (0 = unlimited), split across WORKERS
+    llm_requests_per_minute: int = 0
+    llm_tokens_per_minute: int = 0
+    llm_admission_max_queue: int = 1000
+    llm_admission_max_wait_interactive: float = 15.0
+    llm_admission_max_wait_background: float = 600.0
+    # Pre-warms for meetings starting within this many minutes queue as interactive
+    llm_admission_imminent_minutes: float = 10.0
+    llm_retry_backoff_base: float = 0.5
+    llm_retry_backoff_cap: float = 20.0
+
     # PostgreSQL + pgvector
     pg_host: str = "localhost"
     pg_port: int = 5432
     pg_user: str = "postgres"
     pg_password: str = "postgres"
     pg_database: str = "salesai"
+    pg_pool_min_size: int = 2
+    pg_pool_max_size: int = 10
+    pg_pool_idle_timeout: float = 300.0
+    pg_pool_health_check_interval: float = 30.0
+    pg_pool_acquire_timeout: float = 2.0
+    pg_connect_timeout: int = 3
+    pg_statement_timeout_ms: int = 2000
     
     # Milvus
     milvus_host: str = "localhost"
     milvus_port: int = 19530
+    milvus_collection: str = "documents"
+    
+    # Vector backend: "milvus" or "numpy" (embedded memory-mapped index)
+    vector_backend: str = "numpy"
+    vector_index_path: str = ".cache/vector_index"
+    vector_index_mode: str = "exact"  # "exact" or "ivf"
+    vector_ivf_nlist: int = 256
+    vector_ivf_nprobe: int = 16
+    vector_ivf_min_size: int = 20000
     
     # Neo4j
     neo4j_uri: str = "neo4j://localhost:7687"
     neo4j_user: str = "neo4j"
     neo4j_password: str = "password"
+    # Off: graph_search serves stub relationships instead of querying Neo4j
+    neo4j_enabled: bool = False
+    graph_cache_load_depth: int = 3
+    graph_cache_max_accounts: int = 2048
+    graph_cache_ttl_seconds: float = 3600.0
+    graph_invalidation_poll_seconds: float = 5.0
     
     # RabbitMQ
     rabbitmq_url: str = "amqp://localhost"
     rabbitmq_queue: str = "ingestion.documents"
+    rabbitmq_prefetch: int = 256
+    
+    # Ingestion worker micro-batching (python -m src.consumer)
+    ingest_batch_size: int = 128
+    ingest_batch_max_wait_seconds: float = 2.0
+    # Near-duplicate suppression before embedding (MinHash LSH per account over word shingles).
+    # "cluster": duplicates go to SQL linked to the first copy but aren't embedded; "drop": discarded; "off"
+    dedup_mode: str = "cluster"
+    dedup_threshold: float = 0.8  # estimated Jaccard similarity
+    dedup_num_perm: int = 128
+    dedup_shingle_words: int = 5
+    dedup_index_path: str = ".cache/dedup.sqlite"
+    # Signatures older than this are forgotten (0 = never); the newest per account are kept in memory
+    dedup_window_days: float = 14.0
+    dedup_max_per_account: int = 5000
+    # Chunked documents in PostgreSQL/pgvector (document_chunks): overlapping chunks of at most
+    # CHUNK_MAX_TOKENS (keep under the embedding model's input limit), COPY-loaded in batches
+    chunk_ingest_enabled: bool = True
+    chunk_max_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    chunk_load_batch_rows: int = 1000
+    # Replaces PG_STATEMENT_TIMEOUT_MS for the bulk writes
+    chunk_load_statement_timeout_ms: int = 120000
+    
+    # Hybrid retrieval per-source deadlines (seconds)
+    retrieval_vector_timeout: float = 1.5
+    retrieval_lexical_timeout: float = 0.5
+    retrieval_graph_timeout: float = 1.5
+    retrieval_sql_timeout: float = 1.0
+    # Threads for the vector, keyword and graph searches (SQL gets one per pooled connection)
+    retrieval_search_workers: int = 16
+    # Embedded BM25 keyword index next to the vector index; its hits, the vector, graph and SQL
+    # results are merged by reciprocal-rank fusion (score = sum of 1 / (RRF_K + rank))
+    lexical_index_enabled: bool = True
+    lexical_index_path: str = ".cache/lexical"
+    lexical_top_k: int = 5
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    rrf_k: int = 60
+    
+    # Embeddings (CPU, in-process); backend: "hashing" (no model, works on a stock install) or
+    # "sentence-transformers" (pip install sentence-transformers; not in the lock file since it pulls in torch)
+    embedding_backend: str = "hashing"
+    embedding_model: str = "sentence-transformers/all-mpnet-base-v2"
+    embedding_dim: int = 768
+    embedding_batch_size: int = 32
+    embedding_batch_wait_ms: float = 5.0
+    embedding_cache_size: int = 10000
+    embedding_cache_path: str = ".cache/embeddings.sqlite"
+    # Oldest cached vectors are dropped past this size (0 = unbounded)
+    embedding_cache_max_bytes: int = 536870912
+    
+    # Briefing cache
+    briefing_cache_ttl_seconds: float = 300.0
+    briefing_cache_max_entries: int = 512
+    # Shared by all worker processes; one worker computes a missing key while the rest wait.
+    # Empty uses .cache/briefings.sqlite when WORKERS > 1 and disables the tier otherwise
+    briefing_cache_shared_path: str = ""
+    briefing_cache_shared_max_bytes: int = 268435456
+    briefing_cache_lease_seconds: float = 90.0
+    # Semantic answer cache: reuse the answer to a similarly worded query (cosine >= threshold) for the
+    # same account and role while the account's graph/SQL context is unchanged
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.9
+    semantic_cache_ttl_seconds: float = 1800.0
+    semantic_cache_max_per_account: int = 256
+    semantic_cache_max_accounts: int = 2048
+    # Fraction of hits re-synthesized in the background to check the reused answer (0 = no audits)
+    semantic_cache_audit_rate: float = 0.05
+    semantic_cache_audit_min_agreement: float = 0.8
+    # Delta briefings: the latest briefing per (account, role, query) is stored with the account's document
+    # watermark. Unchanged accounts get it back without retrieval or an LLM call; changed accounts get a
+    # synthesis over just the new documents plus the previous insights, until DELTA_MAX_CHAIN deltas in a row
+    watermark_briefings_enabled: bool = True
+    watermark_poll_seconds: float = 5.0
+    watermark_briefing_path: str = ".cache/watermarked_briefings.sqlite"
+    watermark_briefing_ttl_seconds: float = 604800.0
+    delta_max_documents: int = 20
+    delta_document_chars: int = 1500
+    delta_max_chain: int = 10
+    
+    # Context assembly (prompt + answer token budget for one synthesis)
+    context_token_budget: int = 6000
+    context_dedup_threshold: float = 0.8
+    
+    # Insight provenance (drill-down); records expire after the TTL, oldest are evicted past the size cap
+    provenance_path: str = ".cache/provenance.sqlite"
+    provenance_ttl_seconds: float = 604800.0
+    provenance_max_bytes: int = 268435456
+    
+    # Batch briefings
+    batch_max_items: int = 50
+    batch_max_concurrency: int = 4
+    
+    # Calendar pre-warming
+    prewarm_enabled: bool = False
+    prewarm_meetings_path: str = ""
+    prewarm_lead_time_minutes: float = 30.0
+    prewarm_poll_interval_seconds: float = 30.0
+    prewarm_max_per_minute: int = 6
+    prewarm_max_interactive_inflight: int = 4
+    
+    # Profiling (X-Profile: 1 header, or a random sample of requests)
+    profiling_enabled: bool = False
+    profile_dir: str = ".cache/profiles"
+    profile_sample_rate: float = 0.0
+    profile_max_per_minute: int = 6
+    
+    # Startup: backends connect in the background; failed ones are retried.
+    # /health/ready waits for every backend to be attempted, and for the listed ones to connect
+    backend_retry_seconds: float = 15.0
+    # Comma-separated, e.g. "embeddings,postgres,vector"; without embeddings neither vector search nor the
+    # semantic cache work, so a pod whose model failed to load isn't ready
+    readiness_required_backends: str = "embeddings"
     
     # App
+    host: str = "0.0.0.0"
     port: int = 4011
+    # Worker processes for `python -m src.main`; they share the briefing cache
+    workers: int = 1
     debug: bool = False
     
     class Config:
@@ -0,0 +1,161 @@
+"""
+RabbitMQ worker: consume canonical documents and ingest them in micro-batches.
+
+Run with: python -m src.consumer
+"""
+import json
+import logging
+import signal
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pika
+from neo4j import GraphDatabase
+
+from src.config import settings
+from src.db import PgConnectionPool, pg_dsn, pg_pool_options
+from src.dedup import build_dedup_index
+from src.embeddings import build_embedding_service
+from src.ingest import IngestionPipeline, build_chunk_loader
+from src.lexical import build_lexical_index
+from src.vector_index import build_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionConsumer:
+    """
+    Groups deliveries into batches bounded by `batch_size` messages or
+    `max_wait_seconds` since the first message, runs the batch through the
+    pipeline and only then acks it (one multiple-ack). A failed batch is
+    nacked back onto the queue; unparseable messages are rejected individually.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        amqp_url: str,
+        queue: str,
+        batch_size: int = 128,
+        max_wait_seconds: float = 2.0,
+        prefetch: int = 256,
+        retry_delay_seconds: float = 5.0,
+    ):
+        self.pipeline = pipeline
+        self.amqp_url = amqp_url
+        self.queue = queue
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        # Prefetch must cover a full batch or the batch can never fill
+        self.prefetch = max(prefetch, batch_size)
+        self.retry_delay_seconds = retry_delay_seconds
+        self._batch: List[Tuple[int, Dict[str, Any]]] = []
+        self._batch_started: Optional[float] = None
+        self._stopping = False
+        self.batches = 0
+        self.documents = 0
+        self.duplicates = 0
+        self.failed_batches = 0
+        self.rejected = 0
+
+    def stop(self, *_args) -> None:
+        logger.info("Stopping ingestion consumer after current batch")
+        self._stopping = True
+
+    def _on_message(self, channel, method, properties, body: bytes) -> None:
+        try:
+            doc = json.loads(body)
+            if not isinstance(doc, dict) or not doc.get("id"):
+                raise ValueError("document without id")
+        except ValueError as e:
+            logger.warning(f"Rejecting malformed message: {e}")
+            channel.basic_reject(delivery_tag=method.delivery_tag, requeue=False)
+            self.rejected += 1
+            return
+        if not self._batch:
+            self._batch_started = time.monotonic()
+        self._batch.append((method.delivery_tag, doc))
+        if len(self._batch) >= self.batch_size:
+            self._flush(channel)
+
+    def _batch_due(self) -> bool:
+        return bool(self._batch) and (
+            len(self._batch) >= self.batch_size
+            or time.monotonic() - self._batch_started >= self.max_wait_seconds
+        )
+
+    def _flush(self, channel) -> None:
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        last_tag = batch[-1][0]
+        start = time.perf_counter()
+        try:
+            result = self.pipeline.process([doc for _, doc in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"Ingestion batch of {len(batch)} failed, requeueing: {e}", exc_info=True)
+            channel.basic_nack(delivery_tag=last_tag, multiple=True, requeue=True)
+            time.sleep(self.retry_delay_seconds)
+            return
+        channel.basic_ack(delivery_tag=last_tag, multiple=True)
+        self.batches += 1
+        self.documents += len(batch)
+        self.duplicates += result.get("duplicates", 0)
+        logger.info(
+            f"Ingested batch of {len(batch)} documents ({result.get('duplicates', 0)} near-duplicates not embedded) "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms (total={self.documents}, duplicates={self.duplicates})"
+        )
+
+    def run(self) -> None:
+        connection = pika.BlockingConnection(pika.URLParameters(self.amqp_url))
+        channel = connection.channel()
+        channel.queue_declare(queue=self.queue, durable=True)
+        channel.basic_qos(prefetch_count=self.prefetch)
+        channel.basic_consume(queue=self.queue, on_message_callback=self._on_message)
+        logger.info(
+            f"Consuming {self.queue} (batch_size={self.batch_size}, "
+            f"max_wait={self.max_wait_seconds}s, prefetch={self.prefetch})"
+        )
+        try:
+            while not self._stopping:
+                connection.process_data_events(time_limit=min(self.max_wait_seconds, 0.5))
+                if self._batch_due():
+                    self._flush(channel)
+            self._flush(channel)
+        finally:
+            if connection.is_open:
+                connection.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    embedder = build_embedding_service()
+    pg_pool = PgConnectionPool(pg_dsn(), **pg_pool_options())
+    pipeline = IngestionPipeline(
+        embedder,
+        build_vector_store(embedder.dim),
+        pg_pool,
+        GraphDatabase.driver(settings.neo4j_uri, auth=(settings.neo4j_user, settings.neo4j_password))
+        if settings.neo4j_enabled
+        else None,
+        dedup=build_dedup_index(),
+        dedup_mode=settings.dedup_mode,
+        chunk_loader=build_chunk_loader(pg_pool, embedder),
+        lexical_index=build_lexical_index(),
+    )
+    consumer = IngestionConsumer(
+        pipeline,
+        settings.rabbitmq_url,
+        settings.rabbitmq_queue,
+        batch_size=settings.ingest_batch_size,
+        max_wait_seconds=settings.ingest_batch_max_wait_seconds,
+        prefetch=settings.rabbitmq_prefetch,
+    )
+    signal.signal(signal.SIGTERM, consumer.stop)
+    signal.signal(signal.SIGINT, consumer.stop)
+    consumer.run()
+
+
+if __name__ == "__main__":
+    main()
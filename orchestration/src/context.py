@@ -0,0 +1,244 @@
+"""
+Token-budgeted context assembly: rank retrieved items, drop near-duplicates, pack into a prompt budget.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Section order in the rendered context, with the retrieval key each comes from
+SECTIONS = [
+    ("vector", "vector_results", "Vector Results"),
+    ("lexical", "lexical_results", "Keyword Matches"),
+    ("graph", "graph_context", "Graph Context"),
+    ("sql", "sql_metadata", "SQL Metadata"),
+    ("delta", "delta_documents", "New Documents Since Last Briefing"),
+]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=8)
+def _encoder(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Groq-hosted open models (gpt-oss, llama) are close enough to o200k for budgeting
+        return tiktoken.get_encoding("o200k_base")
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """Token counter for `model`: tiktoken when installed, else a ~4 chars/token estimate."""
+    encoder = _encoder(model)
+    if encoder is None:
+        return lambda text: (len(text) + 3) // 4
+    return lambda text: len(encoder.encode(text, disallowed_special=()))
+
+
+def _words(text: str) -> set:
+    return set(_WORD_RE.findall(text.lower()))
+
+
+class ContextItem:
+    """One retrieved vector hit, keyword hit, graph edge or SQL row, with its relevance score and rendering."""
+
+    def __init__(self, source: str, data: Dict[str, Any], text: str, score: float):
+        self.source = source
+        self.data = data
+        self.text = text
+        self.score = score
+        self.words = _words(text)
+        self.tokens = 0
+        # Position in the rendered context ("[n]"), set once packed
+        self.number = 0
+
+    @property
+    def key(self) -> Optional[str]:
+        """Document identity shared across sources (a document can come back from vector and SQL)."""
+        doc_id = self.data.get("id")
+        return str(doc_id) if self.source != "graph" and doc_id is not None else None
+
+    @property
+    def url(self) -> str:
+        return self.data.get("url") or ""
+
+    @property
+    def citation_url(self) -> str:
+        """The item's URL, or a stable pseudo-URL for graph edges and URL-less rows."""
+        if self.url:
+            return self.url
+        if self.source == "graph":
+            return f"graph://{self.data.get('from')}/{self.data.get('relation')}/{self.data.get('to')}"
+        return f"{self.source}://{self.key or ''}"
+
+    @property
+    def title(self) -> str:
+        if self.source == "graph":
+            return f"{self.data.get('from')} {self.data.get('relation')} {self.data.get('to')}"
+        return self.data.get("title") or str(self.data.get("id") or "")
+
+
+def _render_item(source: str, item: Dict[str, Any]) -> str:
+    if source == "graph":
+        return f"{item.get('from')} -[{item.get('relation')}]-> {item.get('to')}"
+    label = item.get("title") or str(item.get("id") or "")
+    origin = ", ".join(str(v) for v in (item.get("source"), item.get("url")) if v)
+    if origin:
+        label += f" ({origin})"
+    if item.get("text"):
+        label += f": {item['text']}"
+    return label
+
+
+def _score(source: str, position: int, count: int, item: Dict[str, Any], words: set, query_words: set) -> float:
+    """
+    Relevance in roughly [0, 1.3]: vector hits use their similarity; keyword
+    hits (BM25 scores aren't on a fixed scale), graph edges and SQL rows decay
+    with rank, SQL rows being newest first. New documents for a delta briefing
+    (newest first) rank above everything else. Overlap with the query terms
+    adds up to 0.3.
+    """
+    if source == "delta":
+        base = 1.0 - 0.3 * position / max(count, 1)
+    elif source == "vector":
+        base = max(0.0, min(float(item.get("score") or 0.0), 1.0))
+    elif source in ("lexical", "graph"):
+        base = 0.6 - 0.3 * position / max(count, 1)
+    else:
+        base = 0.5 - 0.3 * position / max(count, 1)
+    overlap = len(words & query_words) / len(query_words) if query_words else 0.0
+    return base + 0.3 * overlap
+
+
+def rank_items(retrieval_results: Optional[dict], query: str) -> List[ContextItem]:
+    """
+    Flatten hybrid search results into scored items, best first: in the
+    reciprocal-rank fusion order when the results have one (a document found
+    by several sources is one item), else by score.
+    """
+    if not retrieval_results:
+        return []
+    query_words = _words(query)
+    items = []
+    fused = retrieval_results.get("fused_results")
+    if fused is not None:
+        counts = {source: len(retrieval_results.get(key) or []) for source, key, _ in SECTIONS}
+        for entry in fused:
+            source, data = entry["source"], entry["item"]
+            item = ContextItem(source, data, _render_item(source, data), 0.0)
+            item.score = _score(source, entry["rank"] - 1, counts[source], data, item.words, query_words)
+            items.append(item)
+        return items
+    for source, result_key, _ in SECTIONS:
+        results = retrieval_results.get(result_key) or []
+        for position, data in enumerate(results):
+            text = _render_item(source, data)
+            item = ContextItem(source, data, text, 0.0)
+            item.score = _score(source, position, len(results), data, item.words, query_words)
+            items.append(item)
+    items.sort(key=lambda i: i.score, reverse=True)
+    return items
+
+
+def _is_near_duplicate(item: ContextItem, kept: Sequence[ContextItem], threshold: float) -> bool:
+    for other in kept:
+        if item.key is not None and item.key == other.key:
+            return True
+        if item.url and item.url == other.url:
+            return True
+        union = len(item.words | other.words)
+        if union and len(item.words & other.words) / union >= threshold:
+            return True
+    return False
+
+
+class AssembledContext:
+    """Rendered context text plus the retrieved items that made it in, numbered as cited in the text."""
+
+    def __init__(
+        self,
+        text: str,
+        items: List[ContextItem],
+        tokens: int,
+        dropped: Dict[str, int],
+        retrieval_status: Optional[Dict[str, Any]] = None,
+        graph_paths: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.text = text
+        self.items = items
+        self.tokens = tokens
+        self.dropped = dropped
+        # Kept for the insight's provenance record
+        self.retrieval_status = retrieval_status or {}
+        self.graph_paths = graph_paths or []
+        # Version of the account's query-independent context, for the semantic answer cache
+        self.account_version: Optional[str] = None
+        # Account document watermark the context reflects (None when unknown or retrieval was partial)
+        self.watermark: Optional[int] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tokens": self.tokens, "included": len(self.items), "dropped": self.dropped}
+
+
+def pack_context(
+    header: str,
+    retrieval_results: Optional[dict],
+    query: str,
+    budget_tokens: int,
+    count_tokens: Callable[[str], int],
+    dedup_threshold: float = 0.8,
+) -> AssembledContext:
+    """
+    Append the best-ranked retrieved items to `header` until `budget_tokens`
+    (for the whole context) is used up. Near-duplicates of an already chosen
+    item are skipped; an item too large for the remaining room is skipped in
+    favour of smaller, lower-ranked ones. Chosen items are rendered grouped by
+    source and numbered [1], [2], ... in that order.
+    """
+    header_tokens = count_tokens(header)
+    remaining = budget_tokens - header_tokens
+    chosen: List[ContextItem] = []
+    dropped = {"duplicate": 0, "budget": 0}
+    for item in rank_items(retrieval_results, query):
+        if _is_near_duplicate(item, chosen, dedup_threshold):
+            dropped["duplicate"] += 1
+            continue
+        # "[nn] " prefix, newline and the section title are small; count them per item
+        item.tokens = count_tokens(item.text) + 4
+        if item.tokens > remaining:
+            dropped["budget"] += 1
+            continue
+        chosen.append(item)
+        remaining -= item.tokens
+
+    order = {source: i for i, (source, _, _) in enumerate(SECTIONS)}
+    chosen.sort(key=lambda i: (order[i.source], -i.score))
+    text = header
+    number = 0
+    for source, _, title in SECTIONS:
+        section = [i for i in chosen if i.source == source]
+        if not section:
+            continue
+        lines = []
+        for item in section:
+            number += 1
+            item.number = number
+            lines.append(f"[{number}] {item.text}")
+        text += f"\n{title}:\n" + "\n".join(lines) + "\n"
+    tokens = budget_tokens - remaining
+    if dropped["duplicate"] or dropped["budget"]:
+        logger.info(f"Context packed {len(chosen)} items in {tokens} tokens, dropped {dropped}")
+    return AssembledContext(
+        text,
+        chosen,
+        tokens,
+        dropped,
+        retrieval_status=(retrieval_results or {}).get("status"),
+        graph_paths=(retrieval_results or {}).get("graph_context"),
+    )
@@ -0,0 +1,197 @@
+"""
+Bounded PostgreSQL connection pool with idle health checks and per-connection prepared statements.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the acquire timeout."""
+
+
+class PooledConnection:
+    """A pooled psycopg2 connection plus the statements prepared on its session."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.prepared: set = set()
+        self.last_used = time.monotonic()
+
+    def execute_prepared(self, name: str, params: Sequence[Any], sql: str) -> List[tuple]:
+        """EXECUTE a server-side prepared statement, preparing it on first use."""
+        with self.conn.cursor() as cur:
+            if name not in self.prepared:
+                cur.execute(f"PREPARE {name} AS {sql}")
+                self.prepared.add(name)
+            placeholders = ", ".join(["%s"] * len(params))
+            cur.execute(f"EXECUTE {name} ({placeholders})", tuple(params))
+            return cur.fetchall() if cur.description else []
+
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        """Explicit transaction on an autocommit connection; yields a cursor."""
+        with self.conn.cursor() as cur:
+            cur.execute("BEGIN")
+            try:
+                yield cur
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+
+
+class PgConnectionPool:
+    """
+    Thread-safe pool of autocommit connections.
+
+    At most `max_size` connections are checked out at once; callers block up to
+    `acquire_timeout` seconds for one. Connections idle longer than
+    `health_check_interval` are pinged before reuse, and those idle longer than
+    `idle_timeout` are closed (keeping `min_size` warm).
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        statement_timeout_ms: int = 2000,
+        connect_timeout: int = 3,
+        acquire_timeout: float = 2.0,
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.statement_timeout_ms = statement_timeout_ms
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle: Deque[PooledConnection] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._closed = False
+        self.created = 0
+        self.discarded = 0
+
+    def _connect(self) -> PooledConnection:
+        # Imported on first connect so loading the app doesn't pay for libpq
+        import psycopg2
+
+        conn = psycopg2.connect(
+            self.dsn,
+            connect_timeout=self.connect_timeout,
+            options=f"-c statement_timeout={self.statement_timeout_ms}",
+        )
+        conn.autocommit = True
+        self.created += 1
+        return PooledConnection(conn)
+
+    def _discard(self, pc: PooledConnection) -> None:
+        self.discarded += 1
+        try:
+            pc.conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pc: PooledConnection) -> bool:
+        if pc.conn.closed:
+            return False
+        if time.monotonic() - pc.last_used < self.health_check_interval:
+            return True
+        try:
+            with pc.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def warm_up(self) -> None:
+        """Open `min_size` connections ahead of the first request."""
+        with self._lock:
+            missing = self.min_size - len(self._idle)
+        for _ in range(max(missing, 0)):
+            pc = self._connect()
+            with self._lock:
+                self._idle.append(pc)
+        logger.info(f"PostgreSQL pool warmed up ({self.min_size} connections)")
+
+    def _reap_idle(self) -> None:
+        """Close connections idle past `idle_timeout`, beyond the warm minimum. Caller holds the lock."""
+        now = time.monotonic()
+        while len(self._idle) > self.min_size and now - self._idle[0].last_used > self.idle_timeout:
+            self._discard(self._idle.popleft())
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        if self._closed:
+            raise RuntimeError("connection pool is closed")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeout(f"no PostgreSQL connection available within {self.acquire_timeout}s")
+        pc: Optional[PooledConnection] = None
+        try:
+            while pc is None:
+                with self._lock:
+                    # Most recently used first: it is the least likely to need a ping
+                    candidate = self._idle.pop() if self._idle else None
+                if candidate is None:
+                    pc = self._connect()
+                elif self._is_healthy(candidate):
+                    pc = candidate
+                else:
+                    self._discard(candidate)
+            yield pc
+        except Exception:
+            # A failed statement may leave the session unusable; don't return it
+            if pc is not None:
+                self._discard(pc)
+                pc = None
+            raise
+        finally:
+            if pc is not None:
+                pc.last_used = time.monotonic()
+                with self._lock:
+                    if self._closed:
+                        self._discard(pc)
+                    else:
+                        self._idle.append(pc)
+                        self._reap_idle()
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idle = len(self._idle)
+        return {"idle": idle, "max_size": self.max_size, "created": self.created, "discarded": self.discarded}
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.popleft())
+
+
+def pg_dsn() -> str:
+    return f"postgresql://{settings.pg_user}:{settings.pg_password}@{settings.pg_host}:{settings.pg_port}/{settings.pg_database}"
+
+
+def pg_pool_options() -> Dict[str, Any]:
+    """PgConnectionPool keyword arguments from Settings."""
+    return {
+        "min_size": settings.pg_pool_min_size,
+        "max_size": settings.pg_pool_max_size,
+        "idle_timeout": settings.pg_pool_idle_timeout,
+        "health_check_interval": settings.pg_pool_health_check_interval,
+        "acquire_timeout": settings.pg_pool_acquire_timeout,
+        "connect_timeout": settings.pg_connect_timeout,
+        "statement_timeout_ms": settings.pg_statement_timeout_ms,
+    }
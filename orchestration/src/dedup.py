@@ -0,0 +1,273 @@
+"""
+Near-duplicate document suppression before embedding: MinHash signatures with a banded LSH index per account.
+
+Run `python -m src.dedup` to print what the persisted index has saved so far.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.kvstore import SqliteKVStore
+
+logger = logging.getLogger(__name__)
+
+# Permutations are (a * x + b) mod a Mersenne prime over 32-bit shingle hashes,
+# with a and b drawn from [1, p): the product wraps in uint64, which still
+# mixes well (a small `a` would leave shingles with small hashes minimal
+# under every permutation)
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Joins account and document id in index keys (doesn't occur in either)
+KEY_SEPARATOR = "\x1f"
+
+# (account_id, doc_id, signature) of a document partition() found to be new
+KeptSignature = Tuple[str, str, np.ndarray]
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) for LSH over `num_perm` hashes. Picks the split whose
+    candidate threshold (1/bands)^(1/rows) is the highest one not above
+    `threshold`, so pairs at the threshold are found with good probability
+    (candidates are verified against the full signature afterwards).
+    """
+    best = (num_perm, 1)
+    best_t = 0.0
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        t = (1.0 / bands) ** (1.0 / rows)
+        if best_t < t <= threshold:
+            best, best_t = (bands, rows), t
+    return best
+
+
+class MinHasher:
+    """MinHash signatures of word-shingle sets, reproducible across processes for a given `seed`."""
+
+    def __init__(self, num_perm: int = 128, shingle_words: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        words = _WORD_RE.findall(text.lower())
+        n = self.shingle_words
+        if len(words) <= n:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """uint32 signature of `text`; None when it has no words to compare."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME
+        return (permuted.min(axis=0) & MAX_HASH).astype(np.uint32)
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of the MinHash signatures of documents kept so far, per
+    account. A document whose estimated Jaccard similarity (over word
+    shingles) to a kept document of the same account reaches `threshold` is
+    a near-duplicate of it; otherwise it is kept and indexed.
+
+    Signatures are persisted in SQLite (expiring after `ttl_seconds`, since
+    a wire story stops being republished after a few days) and reloaded on
+    start. Each account keeps at most `max_per_account` in memory, oldest
+    dropped first. Running totals of what was saved are persisted alongside.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_words: int = 5,
+        ttl_seconds: Optional[float] = None,
+        max_per_account: int = 5000,
+    ):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_words)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self.max_per_account = max_per_account
+        self._store = SqliteKVStore(path, table="minhash_signatures", ttl_seconds=ttl_seconds)
+        self._totals_store = SqliteKVStore(path, table="dedup_totals")
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[str, int, bytes], List[str]] = {}
+        self._order: Dict[str, Deque[str]] = {}
+        saved = self._totals_store.get("totals")
+        self.totals = json.loads(saved) if saved else {
+            "documents": 0, "duplicates": 0, "embeddings_saved": 0, "bytes_saved": 0,
+        }
+        self._load()
+
+    @staticmethod
+    def _key(account_id: str, doc_id: str) -> str:
+        return account_id + KEY_SEPARATOR + doc_id
+
+    def _band_keys(self, account_id: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        r = self.rows
+        return [(account_id, band, signature[band * r:(band + 1) * r].tobytes()) for band in range(self.bands)]
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        for key, blob in self._store.items():
+            account_id, _, doc_id = key.partition(KEY_SEPARATOR)
+            self._index(account_id, doc_id, np.frombuffer(blob, dtype=np.uint32))
+        if self._signatures:
+            logger.info(
+                f"Loaded {len(self._signatures)} document signatures for dedup "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+            )
+
+    def _index(self, account_id: str, doc_id: str, signature: np.ndarray) -> None:
+        key = self._key(account_id, doc_id)
+        if key in self._signatures:
+            self._unindex(account_id, doc_id)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(account_id, signature):
+            self._buckets.setdefault(band_key, []).append(doc_id)
+        order = self._order.setdefault(account_id, deque())
+        order.append(doc_id)
+        while len(order) > self.max_per_account:
+            self._unindex(account_id, order[0])
+
+    def _unindex(self, account_id: str, doc_id: str) -> None:
+        signature = self._signatures.pop(self._key(account_id, doc_id))
+        for band_key in self._band_keys(account_id, signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.remove(doc_id)
+                if not bucket:
+                    del self._buckets[band_key]
+        self._order[account_id].remove(doc_id)
+
+    def find(
+        self,
+        account_id: str,
+        doc_id: str,
+        signature: np.ndarray,
+        pending: Iterable[Tuple[str, np.ndarray]] = (),
+    ) -> Optional[Tuple[str, float]]:
+        """
+        The most similar kept document of `account_id` at or above the
+        threshold, and its similarity. `pending` (doc_id, signature) pairs of
+        the same account, not indexed yet, are compared too.
+        """
+        best: Optional[Tuple[str, float]] = None
+        seen = {doc_id}
+        for band_key in self._band_keys(account_id, signature):
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = estimated_jaccard(signature, self._signatures[self._key(account_id, candidate)])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+        for candidate, candidate_signature in pending:
+            if candidate in seen:
+                continue
+            similarity = estimated_jaccard(signature, candidate_signature)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        return best
+
+    def partition(self, docs: Iterable[Tuple[str, str, str]]) -> Tuple[List[Optional[str]], List[KeptSignature]]:
+        """
+        For each (account_id, doc_id, text), the id of the kept document it
+        duplicates, or None if it is new; and the signatures of the new ones.
+        Later documents in the batch are compared against earlier new ones,
+        but nothing is indexed until those signatures are passed to commit(),
+        so a batch that fails to store is not remembered as seen.
+        """
+        canonical: List[Optional[str]] = []
+        kept: List[KeptSignature] = []
+        pending: Dict[str, List[Tuple[str, np.ndarray]]] = {}
+        for account_id, doc_id, text in docs:
+            signature = self.hasher.signature(text)
+            if signature is None:
+                canonical.append(None)
+                continue
+            account_pending = pending.setdefault(account_id, [])
+            match = self.find(account_id, doc_id, signature, account_pending)
+            if match is not None:
+                canonical.append(match[0])
+                continue
+            canonical.append(None)
+            account_pending.append((doc_id, signature))
+            kept.append((account_id, doc_id, signature))
+        return canonical, kept
+
+    def commit(self, kept: List[KeptSignature]) -> None:
+        """Index and persist the new documents' signatures from partition(), once the batch is stored."""
+        for account_id, doc_id, signature in kept:
+            self._index(account_id, doc_id, signature)
+        self._store.put_many([(self._key(acc, doc_id), signature.tobytes()) for acc, doc_id, signature in kept])
+
+    def record(self, documents: int, duplicates: int, bytes_saved: int) -> None:
+        """Add one batch's outcome to the persisted totals."""
+        self.totals["documents"] += documents
+        self.totals["duplicates"] += duplicates
+        self.totals["embeddings_saved"] += duplicates
+        self.totals["bytes_saved"] += bytes_saved
+        self._totals_store.put("totals", json.dumps(self.totals).encode())
+
+    def stats(self) -> Dict[str, Any]:
+        documents = self.totals["documents"]
+        return {
+            **self.totals,
+            "duplicate_rate": round(self.totals["duplicates"] / documents, 4) if documents else 0.0,
+            "indexed": len(self._signatures),
+            "accounts": len(self._order),
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+        }
+
+    def close(self) -> None:
+        self._store.close()
+        self._totals_store.close()
+
+
+def build_dedup_index() -> Optional[NearDuplicateIndex]:
+    """Index configured from Settings; None when DEDUP_MODE is "off"."""
+    if settings.dedup_mode == "off":
+        return None
+    if settings.dedup_mode not in ("cluster", "drop"):
+        raise ValueError(f"DEDUP_MODE must be cluster, drop or off, not {settings.dedup_mode!r}")
+    return NearDuplicateIndex(
+        settings.dedup_index_path,
+        threshold=settings.dedup_threshold,
+        num_perm=settings.dedup_num_perm,
+        shingle_words=settings.dedup_shingle_words,
+        ttl_seconds=settings.dedup_window_days * 86400 if settings.dedup_window_days > 0 else None,
+        max_per_account=settings.dedup_max_per_account,
+    )
+
+
+if __name__ == "__main__":
+    index = build_dedup_index()
+    print(json.dumps(index.stats() if index else {"mode": "off"}, indent=2))
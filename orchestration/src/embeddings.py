@@ -0,0 +1,342 @@
+"""
+In-process CPU embeddings with micro-batching and a content-addressed cache.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.kvstore import SqliteKVStore
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9$][A-Za-z0-9$.&'-]*")
+
+
+class EmbeddingModel:
+    """Pluggable model interface: encode a batch of texts to L2-normalized float32 rows."""
+
+    name: str = "base"
+    dim: int = 0
+    loaded: bool = True
+
+    def load(self) -> "EmbeddingModel":
+        """The model ready to encode (a no-op unless it is loaded lazily)."""
+        return self
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbedder(EmbeddingModel):
+    """
+    Deterministic feature-hashing embedder (unigrams + bigrams, signed buckets).
+
+    Needs no model download or network, so it stands in for the real model in
+    tests, benchmarks and offline development.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = [t.lower() for t in _TOKEN_RE.findall(text)]
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        # Sublinear term weighting, then unit length so dot product == cosine
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class SentenceTransformerEmbedder(EmbeddingModel):
+    """sentence-transformers model pinned to CPU (optional dependency)."""
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self._model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+class LazyEmbeddingModel(EmbeddingModel):
+    """
+    Builds the wrapped model on first use or load(), so importing the API
+    doesn't import torch or read model weights. Until then `dim` is the
+    configured size; a model producing another size fails to load.
+    """
+
+    def __init__(self, factory: Callable[[], EmbeddingModel], name: str, dim: int):
+        self._factory = factory
+        self._model: Optional[EmbeddingModel] = None
+        self._lock = threading.Lock()
+        self.name = name
+        self.dim = dim
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> EmbeddingModel:
+        with self._lock:
+            if self._model is None:
+                model = self._factory()
+                if model.dim != self.dim:
+                    raise ValueError(f"{model.name} produces {model.dim}-dim embeddings but EMBEDDING_DIM is {self.dim}")
+                self._model = model
+                logger.info(f"Loaded embedding model {model.name}")
+        return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.load().encode(texts)
+
+
+def create_embedding_model(backend: str, model_name: str, dim: int, batch_size: int = 32) -> EmbeddingModel:
+    """
+    Build the configured model. A missing sentence-transformers install is an
+    error rather than a silent switch to hashing, which would quietly degrade
+    retrieval; EMBEDDING_BACKEND=hashing has to be chosen instead.
+    """
+    if backend == "sentence-transformers":
+        try:
+            return SentenceTransformerEmbedder(model_name, batch_size=batch_size)
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=sentence-transformers but sentence-transformers is not installed "
+                "(pip install sentence-transformers, or set EMBEDDING_BACKEND=hashing)"
+            ) from e
+    if backend != "hashing":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    return HashingEmbedder(dim)
+
+
+def content_key(model_name: str, text: str) -> str:
+    """Cache key: the same text under the same model is embedded exactly once."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache: in-memory LRU in front of an optional on-disk SQLite
+    store, which drops its oldest writes past `disk_max_bytes`.
+    """
+
+    def __init__(self, max_entries: int = 10000, disk_path: Optional[str] = None, disk_max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk = SqliteKVStore(disk_path, table="embeddings", max_bytes=disk_max_bytes) if disk_path else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+        if missing and self._disk is not None:
+            from_disk = self._disk.get_many(missing)
+            with self._lock:
+                for key, blob in from_disk.items():
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    found[key] = vector
+                self.disk_hits += len(from_disk)
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+        if self._disk is not None:
+            self._disk.put_many((key, vector.astype(np.float32).tobytes()) for key, vector in items)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+
+class EmbeddingService:
+    """
+    Cache-aware embedding front end.
+
+    `encode_batch` is the synchronous bulk path (ingestion workers). `embed`
+    is the async request path: concurrent calls are queued and flushed to the
+    model as one batch once `max_batch_size` texts are waiting or
+    `max_wait_ms` has passed since the first one arrived.
+    """
+
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.model = model
+        self.cache = cache or EmbeddingCache()
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.encoded = 0
+
+    @property
+    def dim(self) -> int:
+        return self.model.dim
+
+    def load(self) -> None:
+        """Load the model now rather than on the first embedding (blocking; run it in a thread)."""
+        self.model.load()
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, computing only those not already cached (duplicates encoded once)."""
+        keys = [content_key(self.model.name, t) for t in texts]
+        cached = self.cache.get_many(list(dict.fromkeys(keys)))
+        todo: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                todo.setdefault(key, text)
+        if todo:
+            vectors = self.model.encode(list(todo.values()))
+            fresh = list(zip(todo.keys(), vectors))
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+            self.batches += 1
+            self.encoded += len(todo)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([cached[key] for key in keys])
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text via the shared micro-batching queue."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(self.encode_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.cache.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"model": self.model.name, "batches": self.batches, "encoded": self.encoded, **self.cache.stats()}
+
+
+def build_embedding_service() -> EmbeddingService:
+    """Embedding service configured from Settings; a sentence-transformers model is loaded on first use."""
+    if settings.embedding_backend == "hashing":
+        model: EmbeddingModel = HashingEmbedder(settings.embedding_dim)
+    elif settings.embedding_backend != "sentence-transformers":
+        raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
+    else:
+        model = LazyEmbeddingModel(
+            lambda: create_embedding_model(
+                settings.embedding_backend,
+                settings.embedding_model,
+                settings.embedding_dim,
+                batch_size=settings.embedding_batch_size,
+            ),
+            settings.embedding_model,
+            settings.embedding_dim,
+        )
+    cache = EmbeddingCache(
+        max_entries=settings.embedding_cache_size,
+        disk_path=settings.embedding_cache_path or None,
+        disk_max_bytes=settings.embedding_cache_max_bytes or None,
+    )
+    return EmbeddingService(
+        model,
+        cache,
+        max_batch_size=settings.embedding_batch_size,
+        max_wait_ms=settings.embedding_batch_wait_ms,
+    )
@@ -0,0 +1,223 @@
+"""
+In-process cache of account subgraphs (adjacency lists over integer node ids) for graph_search.
+"""
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Edge = Dict[str, Any]
+
+# Deepest neighbourhood loaded or served; a hop more reaches most of a dense graph
+MAX_DEPTH = 3
+
+# Variable-length match in both directions, as the apoc.path.expandConfig traversal did.
+# Relationships written by the ingestion pipeline carry their type in `relation`.
+# Pattern bounds can't be parameters, so the pattern stops at MAX_DEPTH and $depth filters.
+ACCOUNT_SUBGRAPH_CYPHER = f"""
+MATCH p = (acc:Account {{id: $account_id}})-[*1..{MAX_DEPTH}]-()
+WHERE length(p) <= $depth
+UNWIND relationships(p) AS r
+WITH DISTINCT r
+RETURN coalesce(startNode(r).id, startNode(r).name) AS source,
+       coalesce(endNode(r).id, endNode(r).name) AS target,
+       coalesce(r.relation, type(r)) AS relation
+LIMIT $limit
+"""
+
+
+class AccountSubgraph:
+    """
+    One account's neighbourhood: node and relation names are interned to small
+    ints, edges live in parallel int arrays and each node keeps a list of
+    incident edge indexes, so traversal never touches strings.
+    """
+
+    def __init__(self, root: str, edges: List[Edge]):
+        self.nodes: List[str] = []
+        self.relations: List[str] = []
+        node_ids: Dict[str, int] = {}
+        relation_ids: Dict[str, int] = {}
+        self.sources = array("i")
+        self.targets = array("i")
+        self.edge_relations = array("i")
+        self.adjacency: List[List[int]] = []
+
+        def intern_node(name: str) -> int:
+            node = node_ids.get(name)
+            if node is None:
+                node = node_ids[name] = len(self.nodes)
+                self.nodes.append(name)
+                self.adjacency.append([])
+            return node
+
+        self.root = intern_node(root)
+        for edge in edges:
+            source = intern_node(str(edge["from"]))
+            target = intern_node(str(edge["to"]))
+            relation = str(edge.get("relation") or "")
+            if relation not in relation_ids:
+                relation_ids[relation] = len(self.relations)
+                self.relations.append(relation)
+            index = len(self.sources)
+            self.sources.append(source)
+            self.targets.append(target)
+            self.edge_relations.append(relation_ids[relation])
+            self.adjacency[source].append(index)
+            if target != source:
+                self.adjacency[target].append(index)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def bfs(self, depth: int, limit: Optional[int] = None) -> List[Edge]:
+        """Edges within `depth` hops of the account, nearest first, each once and in its stored direction."""
+        seen_nodes = {self.root}
+        seen_edges = set()
+        frontier = deque([(self.root, 0)])
+        found: List[int] = []
+        while frontier:
+            node, hops = frontier.popleft()
+            if hops >= depth:
+                continue
+            for index in self.adjacency[node]:
+                if index in seen_edges:
+                    continue
+                seen_edges.add(index)
+                found.append(index)
+                if limit is not None and len(found) >= limit:
+                    frontier.clear()
+                    break
+                other = self.targets[index] if self.sources[index] == node else self.sources[index]
+                if other not in seen_nodes:
+                    seen_nodes.add(other)
+                    frontier.append((other, hops + 1))
+        return [
+            {
+                "from": self.nodes[self.sources[i]],
+                "to": self.nodes[self.targets[i]],
+                "relation": self.relations[self.edge_relations[i]],
+            }
+            for i in found
+        ]
+
+
+class GraphCache:
+    """
+    LRU of account subgraphs in front of a loader (Neo4j).
+
+    A miss loads the neighbourhood once at `load_depth` (or deeper if asked),
+    after which any depth up to that is answered by in-process BFS. Entries
+    live for `ttl_seconds` as a backstop; the ingestion pipeline's writes
+    invalidate accounts explicitly. A load that fails raises and caches
+    nothing, so callers can tell a missing graph from an empty one.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str, int], List[Edge]],
+        load_depth: int = 3,
+        max_accounts: int = 2048,
+        ttl_seconds: float = 3600.0,
+    ):
+        self.loader = loader
+        self.load_depth = min(load_depth, MAX_DEPTH)
+        self.max_accounts = max_accounts
+        self.ttl_seconds = ttl_seconds
+        # account_id -> (expires_at, loaded_depth, subgraph)
+        self._entries: "OrderedDict[str, Tuple[float, int, AccountSubgraph]]" = OrderedDict()
+        # Bumped by invalidate() so a load racing an invalidation isn't stored
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_errors = 0
+        self.invalidations = 0
+        self.load_ms_total = 0.0
+
+    def lookup(self, account_id: str, depth: int, limit: Optional[int] = None) -> Optional[List[Edge]]:
+        """Cached edges for the account, or None on a miss. Never calls the loader."""
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] < depth:
+                return None
+            self._entries.move_to_end(account_id)
+            self.hits += 1
+            subgraph = entry[2]
+        return subgraph.bfs(depth, limit)
+
+    def get(self, account_id: str, depth: int = 2, limit: Optional[int] = None) -> List[Edge]:
+        if not 1 <= depth <= MAX_DEPTH:
+            raise ValueError(f"graph depth must be between 1 and {MAX_DEPTH}, got {depth}")
+        edges = self.lookup(account_id, depth, limit)
+        if edges is not None:
+            return edges
+        with self._lock:
+            self.misses += 1
+            generation = self._generations.get(account_id, 0)
+        load_depth = max(depth, self.load_depth)
+        start = time.perf_counter()
+        try:
+            loaded = self.loader(account_id, load_depth)
+        except Exception as e:
+            self.load_errors += 1
+            logger.warning(f"Graph load for {account_id} failed: {e}")
+            raise
+        self.load_ms_total += (time.perf_counter() - start) * 1000
+        subgraph = AccountSubgraph(account_id, loaded)
+        with self._lock:
+            if self._generations.get(account_id, 0) == generation:
+                self._entries[account_id] = (time.monotonic() + self.ttl_seconds, load_depth, subgraph)
+                self._entries.move_to_end(account_id)
+                while len(self._entries) > self.max_accounts:
+                    self._entries.popitem(last=False)
+        return subgraph.bfs(depth, limit)
+
+    def invalidate(self, account_id: Optional[str] = None) -> int:
+        """Drop one account's subgraph, or all of them. Returns the count removed."""
+        with self._lock:
+            if account_id is None:
+                removed = len(self._entries)
+                for cached in self._entries:
+                    self._generations[cached] = self._generations.get(cached, 0) + 1
+                self._entries.clear()
+            else:
+                self._generations[account_id] = self._generations.get(account_id, 0) + 1
+                removed = 1 if self._entries.pop(account_id, None) is not None else 0
+            self.invalidations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            accounts = len(self._entries)
+            edges = sum(len(entry[2]) for entry in self._entries.values())
+        return {
+            "accounts": accounts,
+            "edges": edges,
+            "max_accounts": self.max_accounts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "load_errors": self.load_errors,
+            "invalidations": self.invalidations,
+            "avg_load_ms": round(self.load_ms_total / self.misses, 2) if self.misses else 0.0,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def neo4j_subgraph_loader(driver, limit: int = 500) -> Callable[[str, int], List[Edge]]:
+    """Loader that expands an account's neighbourhood in Neo4j."""
+
+    def load(account_id: str, depth: int) -> List[Edge]:
+        with driver.session() as session:
+            result = session.run(ACCOUNT_SUBGRAPH_CYPHER, account_id=account_id, depth=depth, limit=limit)
+            return [
+                {"from": record["source"], "to": record["target"], "relation": record["relation"]}
+                for record in result
+            ]
+
+    return load
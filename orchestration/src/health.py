@@ -0,0 +1,67 @@
+"""
+Connection state of each backend, reported by the liveness/readiness endpoints.
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+PENDING = "pending"
+CONNECTING = "connecting"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+# States in which the startup sequence has finished with a backend
+SETTLED = (READY, FAILED, DISABLED)
+
+
+class BackendStatus:
+    """
+    Tracks each backend through pending -> connecting -> ready / failed
+    (failed ones are retried) or disabled by config.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = {
+            name: {"state": PENDING, "since": self.started_at, "error": None, "attempts": 0} for name in names
+        }
+
+    def set(self, name: str, state: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self._states.setdefault(name, {"state": PENDING, "since": time.time(), "error": None, "attempts": 0})
+            if state == CONNECTING:
+                entry["attempts"] += 1
+            if entry["state"] != state:
+                entry["since"] = time.time()
+            entry["state"] = state
+            entry["error"] = error
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            entry = self._states.get(name)
+            return entry["state"] if entry else PENDING
+
+    def failed(self) -> list:
+        with self._lock:
+            return [name for name, entry in self._states.items() if entry["state"] == FAILED]
+
+    def settled(self) -> bool:
+        """Every backend has been attempted (connected, failed or disabled)."""
+        with self._lock:
+            return all(entry["state"] in SETTLED for entry in self._states.values())
+
+    def is_ready(self, required: Iterable[str] = ()) -> bool:
+        """
+        Every backend has been attempted, and each `required` one is connected.
+        Other backends may have failed: the service degrades without them.
+        """
+        with self._lock:
+            if any(entry["state"] not in SETTLED for entry in self._states.values()):
+                return False
+            return all(self._states.get(name, {}).get("state") == READY for name in required)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._states.items()}
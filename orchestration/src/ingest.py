@@ -0,0 +1,479 @@
+"""
+Batch ingestion of canonical documents: embed once per batch, bulk-write vector and SQL stores.
+
+Load one large file (e.g. a 10-K) as a chunked document with:
+python -m src.ingest path/to/filing.txt --id <doc id> --account-id <account>
+"""
+import argparse
+import io
+import itertools
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from src.chunking import Chunk, chunk_text, document_pieces, iter_file
+from src.config import settings
+from src.db import PgConnectionPool, pg_dsn, pg_pool_options
+from src.dedup import KeptSignature, NearDuplicateIndex
+from src.embeddings import EmbeddingService, build_embedding_service
+from src.lexical import LexicalIndex
+from src.vector_index import VectorStore
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    account_id TEXT,
+    title TEXT,
+    source TEXT,
+    url TEXT,
+    text TEXT,
+    published_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS documents_account_created_idx ON documents (account_id, created_at DESC);
+-- Set on near-duplicates (same story from another outlet): the id of the copy that was embedded
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS duplicate_of TEXT;
+CREATE TABLE IF NOT EXISTS account_graph_versions (
+    account_id TEXT PRIMARY KEY,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS account_graph_versions_updated_idx ON account_graph_versions (updated_at);
+-- Ingest order: a document gets the next value when it is inserted or its title/text change
+CREATE SEQUENCE IF NOT EXISTS document_ingest_seq;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS ingest_seq BIGINT DEFAULT nextval('document_ingest_seq');
+CREATE INDEX IF NOT EXISTS documents_account_ingest_idx ON documents (account_id, ingest_seq);
+-- Highest ingest_seq among each account's kept (non-duplicate) documents
+CREATE TABLE IF NOT EXISTS account_watermarks (
+    account_id TEXT PRIMARY KEY,
+    watermark BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS account_watermarks_updated_idx ON account_watermarks (updated_at);
+"""
+
+UPSERT_DOCUMENTS_SQL = """
+INSERT INTO documents (id, account_id, title, source, url, text, published_at, duplicate_of)
+VALUES %s
+ON CONFLICT (id) DO UPDATE SET
+    account_id = EXCLUDED.account_id,
+    title = EXCLUDED.title,
+    source = EXCLUDED.source,
+    url = EXCLUDED.url,
+    text = EXCLUDED.text,
+    published_at = EXCLUDED.published_at,
+    duplicate_of = EXCLUDED.duplicate_of,
+    ingest_seq = CASE
+        WHEN documents.title IS DISTINCT FROM EXCLUDED.title OR documents.text IS DISTINCT FROM EXCLUDED.text
+        THEN EXCLUDED.ingest_seq ELSE documents.ingest_seq
+    END
+"""
+
+# Serializes document writes so ingest_seq order is commit order: a briefing
+# stored at watermark W never misses a document committed later with seq < W
+LOCK_INGEST_SQL = "SELECT pg_advisory_xact_lock(hashtext('document_ingest_seq'))"
+
+# Moves the watermarks of the accounts whose documents were just written
+ADVANCE_WATERMARKS_SQL = """
+INSERT INTO account_watermarks (account_id, watermark)
+SELECT account_id, max(ingest_seq) FROM documents
+WHERE id = ANY(%s) AND account_id <> '' AND duplicate_of IS NULL
+GROUP BY account_id
+ON CONFLICT (account_id) DO UPDATE SET watermark = EXCLUDED.watermark, updated_at = now()
+WHERE account_watermarks.watermark < EXCLUDED.watermark
+"""
+
+# Tells orchestration instances to drop their cached subgraph for these accounts
+TOUCH_GRAPH_VERSIONS_SQL = """
+INSERT INTO account_graph_versions (account_id) VALUES %s
+ON CONFLICT (account_id) DO UPDATE SET updated_at = now()
+"""
+
+MERGE_EDGES_CYPHER = """
+UNWIND $edges AS e
+MERGE (acc:Account {id: e.account_id})
+MERGE (n:Entity {id: e.to})
+MERGE (acc)-[r:RELATED {relation: e.relation}]->(n)
+"""
+
+DOCUMENT_CHUNKS_SCHEMA_SQL = """
+CREATE EXTENSION IF NOT EXISTS vector;
+CREATE TABLE IF NOT EXISTS document_chunks (
+    document_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    account_id TEXT,
+    text TEXT NOT NULL,
+    token_count INTEGER NOT NULL,
+    char_start BIGINT NOT NULL,
+    embedding vector({dim}),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (document_id, chunk_index)
+);
+CREATE INDEX IF NOT EXISTS document_chunks_account_idx ON document_chunks (account_id);
+"""
+
+# Per-session staging table the COPY fills; emptied at every commit
+STAGE_CHUNKS_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS document_chunks_staging
+    (LIKE document_chunks INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+"""
+
+CHUNK_COLUMNS = "document_id, chunk_index, account_id, text, token_count, char_start, embedding"
+
+COPY_CHUNKS_SQL = f"COPY document_chunks_staging ({CHUNK_COLUMNS}) FROM STDIN"
+
+UPSERT_CHUNKS_SQL = f"""
+INSERT INTO document_chunks ({CHUNK_COLUMNS})
+SELECT {CHUNK_COLUMNS} FROM document_chunks_staging
+ON CONFLICT (document_id, chunk_index) DO UPDATE SET
+    account_id = EXCLUDED.account_id,
+    text = EXCLUDED.text,
+    token_count = EXCLUDED.token_count,
+    char_start = EXCLUDED.char_start,
+    embedding = EXCLUDED.embedding,
+    updated_at = now()
+"""
+
+# Drops chunks left over from a longer earlier version of a document
+TRIM_CHUNKS_SQL = """
+DELETE FROM document_chunks c USING (VALUES %s) AS d (document_id, chunks)
+WHERE c.document_id = d.document_id AND c.chunk_index >= d.chunks
+"""
+
+# Characters of document text embedded and kept as the vector payload snippet
+EMBED_TEXT_CHARS = 4000
+SNIPPET_CHARS = 500
+
+
+def document_account_id(doc: Dict[str, Any]) -> str:
+    """Canonical documents carry the CRM account in `account_id` or `meta.account_id`."""
+    return str(doc.get("account_id") or (doc.get("meta") or {}).get("account_id") or "")
+
+
+def document_edges(doc: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Relationships extracted upstream (entity linking), as `relations` or
+    `meta.relations`: [{"to": "Jane Doe", "relation": "hasExecutive"}, ...].
+    Each edge hangs off the document's account.
+    """
+    account_id = document_account_id(doc)
+    relations = doc.get("relations") or (doc.get("meta") or {}).get("relations") or []
+    if not account_id:
+        return []
+    return [
+        {"account_id": account_id, "to": str(r["to"]), "relation": str(r.get("relation") or "related")}
+        for r in relations
+        if isinstance(r, dict) and r.get("to")
+    ]
+
+
+def embedding_text(doc: Dict[str, Any]) -> str:
+    title = doc.get("title") or ""
+    text = (doc.get("text") or "")[:EMBED_TEXT_CHARS]
+    return f"{title}\n\n{text}".strip()
+
+
+def _copy_text(value: str) -> str:
+    """A value escaped for COPY's text format."""
+    return (
+        value.replace("\x00", "").replace("\\", "\\\\")
+        .replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _copy_vectors(vectors: np.ndarray) -> List[str]:
+    """Rows in pgvector's text input form, "[x,y,...]"."""
+    row_format = "[" + ",".join(["%.6g"] * vectors.shape[1]) + "]"
+    return [row_format % tuple(row) for row in vectors.tolist()]
+
+
+class ChunkLoader:
+    """
+    Streams documents into `document_chunks`: each is split into overlapping,
+    token-bounded chunks (src/chunking.py) as its text is read, and chunks
+    are embedded and written `batch_rows` at a time. A batch is COPYed into a
+    session staging table and upserted from there in one transaction, keyed
+    on (document_id, chunk_index), so reloading a document is idempotent;
+    once its last chunk is written, higher-numbered chunks from an earlier,
+    longer version are deleted. Only one batch is held in memory.
+    """
+
+    def __init__(
+        self,
+        pg_pool: PgConnectionPool,
+        embedder: EmbeddingService,
+        count_tokens: Callable[[str], int],
+        max_tokens: int = 256,
+        overlap_tokens: int = 32,
+        batch_rows: int = 1000,
+        statement_timeout_ms: int = 120000,
+    ):
+        self.pg_pool = pg_pool
+        self.embedder = embedder
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.batch_rows = batch_rows
+        self.statement_timeout_ms = statement_timeout_ms
+        self._schema_ready = False
+
+    def ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self.pg_pool.connection() as pc, pc.transaction() as cur:
+            cur.execute(DOCUMENT_CHUNKS_SCHEMA_SQL.format(dim=self.embedder.dim))
+        self._schema_ready = True
+
+    def _chunks(self, docs: Iterable[Tuple[str, str, Iterable[str]]]) -> Iterator[Tuple[str, str, Chunk, bool]]:
+        """(doc_id, account_id, chunk, is_last) for every chunk of every document, in order."""
+        for doc_id, account_id, pieces in docs:
+            previous = None
+            for chunk in chunk_text(pieces, self.max_tokens, self.overlap_tokens, self.count_tokens):
+                if previous is not None:
+                    yield doc_id, account_id, previous, False
+                previous = chunk
+            if previous is not None:
+                yield doc_id, account_id, previous, True
+
+    def load(self, docs: Iterable[Tuple[str, str, Iterable[str]]]) -> Dict[str, Any]:
+        """
+        Load (doc_id, account_id, text pieces) documents; pieces may be a
+        lazy iterator (see `iter_file`, `document_pieces`). Returns counts
+        and timings.
+        """
+        self.ensure_schema()
+        start = time.perf_counter()
+        totals = {"documents": 0, "chunks": 0, "tokens": 0, "batches": 0, "embed_seconds": 0.0, "write_seconds": 0.0}
+        batch: List[Tuple[str, str, Chunk]] = []
+        finished: List[Tuple[str, int]] = []
+        for doc_id, account_id, chunk, is_last in self._chunks(docs):
+            batch.append((doc_id, account_id, chunk))
+            if is_last:
+                finished.append((doc_id, chunk.index + 1))
+            if len(batch) >= self.batch_rows:
+                self._write(batch, finished, totals)
+                batch, finished = [], []
+        if batch:
+            self._write(batch, finished, totals)
+        totals["seconds"] = round(time.perf_counter() - start, 3)
+        totals["embed_seconds"] = round(totals["embed_seconds"], 3)
+        totals["write_seconds"] = round(totals["write_seconds"], 3)
+        return totals
+
+    def _write(self, batch: List[Tuple[str, str, Chunk]], finished: List[Tuple[str, int]], totals: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        embeddings = self.embedder.encode_batch([chunk.text for _, _, chunk in batch])
+        encoded = time.perf_counter()
+        buffer = io.StringIO()
+        for (doc_id, account_id, chunk), vector in zip(batch, _copy_vectors(embeddings)):
+            buffer.write(
+                f"{_copy_text(doc_id)}\t{chunk.index}\t{_copy_text(account_id)}\t{_copy_text(chunk.text)}\t"
+                f"{chunk.tokens}\t{chunk.char_start}\t{vector}\n"
+            )
+        buffer.seek(0)
+        with self.pg_pool.connection() as pc, pc.transaction() as cur:
+            # A large batch outlasts the pool's request-path statement timeout
+            cur.execute(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}")
+            cur.execute(STAGE_CHUNKS_SQL)
+            cur.copy_expert(COPY_CHUNKS_SQL, buffer)
+            cur.execute(UPSERT_CHUNKS_SQL)
+            if finished:
+                execute_values(cur, TRIM_CHUNKS_SQL, finished, page_size=len(finished))
+        totals["documents"] += len(finished)
+        totals["chunks"] += len(batch)
+        totals["tokens"] += sum(chunk.tokens for _, _, chunk in batch)
+        totals["batches"] += 1
+        totals["embed_seconds"] += encoded - started
+        totals["write_seconds"] += time.perf_counter() - encoded
+
+
+class IngestionPipeline:
+    """
+    Processes one micro-batch of canonical documents (see server/ingestion normalizer):
+    a single embedding call, one bulk vector upsert and one SQL transaction.
+    Writes are idempotent upserts keyed on document id, so a redelivered batch is harmless.
+    Relationship edges go to Neo4j (when a driver is given) and the affected
+    accounts are marked in `account_graph_versions` so cached subgraphs are dropped.
+    The same transaction advances `account_watermarks` for the accounts that
+    received new or changed documents, which drives delta briefings.
+
+    With a `dedup` index, near-duplicates of a document already kept for the
+    same account are not embedded or added to the vector store. In "cluster"
+    mode they are still written to SQL with `duplicate_of` set to the kept
+    copy; in "drop" mode they are discarded.
+
+    With a `chunk_loader`, the kept documents are also chunked into
+    `document_chunks` after the SQL write. With a `lexical_index`, they are
+    added to the keyword index alongside the vector store.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        vector_store: VectorStore,
+        pg_pool: Optional[PgConnectionPool] = None,
+        neo4j_driver=None,
+        dedup: Optional[NearDuplicateIndex] = None,
+        dedup_mode: str = "cluster",
+        chunk_loader: Optional[ChunkLoader] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+    ):
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.pg_pool = pg_pool
+        self.neo4j_driver = neo4j_driver
+        self.dedup = dedup
+        self.dedup_mode = dedup_mode
+        self.chunk_loader = chunk_loader
+        self.lexical_index = lexical_index
+        self._schema_ready = False
+
+    def ensure_schema(self) -> None:
+        if self.pg_pool is None or self._schema_ready:
+            return
+        with self.pg_pool.connection() as pc, pc.transaction() as cur:
+            cur.execute(DOCUMENTS_SCHEMA_SQL)
+        self._schema_ready = True
+
+    def process(self, docs: List[Dict[str, Any]]) -> Dict[str, int]:
+        if not docs:
+            return {"documents": 0}
+        ids = [str(d["id"]) for d in docs]
+        account_ids = [document_account_id(d) for d in docs]
+        duplicate_of: List[Optional[str]] = [None] * len(docs)
+        kept_signatures: List[KeptSignature] = []
+        if self.dedup is not None:
+            duplicate_of, kept_signatures = self.dedup.partition(
+                (acc, doc_id, f"{d.get('title') or ''}\n{d.get('text') or ''}")
+                for acc, doc_id, d in zip(account_ids, ids, docs)
+            )
+        unique = [i for i, canonical in enumerate(duplicate_of) if canonical is None]
+        payloads = [
+            {"title": d.get("title"), "url": d.get("url"), "source": d.get("source"),
+             "text": (d.get("text") or "")[:SNIPPET_CHARS]}
+            for d in docs
+        ]
+        if unique:
+            embeddings = self.embedder.encode_batch([embedding_text(docs[i]) for i in unique])
+            self.vector_store.add(
+                [ids[i] for i in unique], embeddings, [account_ids[i] for i in unique], [payloads[i] for i in unique]
+            )
+            self.vector_store.flush()
+            if self.lexical_index is not None:
+                self.lexical_index.add(
+                    [ids[i] for i in unique],
+                    [f"{docs[i].get('title') or ''}\n{docs[i].get('text') or ''}" for i in unique],
+                    [account_ids[i] for i in unique],
+                    [payloads[i] for i in unique],
+                )
+        received, duplicates = len(docs), len(docs) - len(unique)
+        # Counted once the batch is stored, so a requeued batch isn't counted twice
+        bytes_saved = self._bytes_saved(docs, payloads, duplicate_of) if duplicates else 0
+        if self.dedup_mode == "drop" and duplicates:
+            docs, ids, account_ids = [docs[i] for i in unique], [ids[i] for i in unique], [account_ids[i] for i in unique]
+            duplicate_of = [None] * len(unique)
+        edges = [edge for d in docs for edge in document_edges(d)] if self.neo4j_driver is not None else []
+        if edges:
+            with self.neo4j_driver.session() as session:
+                session.run(MERGE_EDGES_CYPHER, edges=edges).consume()
+        if self.pg_pool is not None:
+            self.ensure_schema()
+            rows = [
+                (doc_id, acc, d.get("title"), d.get("source"), d.get("url"), d.get("text"),
+                 d.get("publishedAt") or datetime.now(timezone.utc).isoformat(), canonical)
+                for doc_id, acc, d, canonical in zip(ids, account_ids, docs, duplicate_of)
+            ]
+            with self.pg_pool.connection() as pc, pc.transaction() as cur:
+                if rows:
+                    cur.execute(LOCK_INGEST_SQL)
+                    execute_values(cur, UPSERT_DOCUMENTS_SQL, rows, page_size=len(rows))
+                    cur.execute(ADVANCE_WATERMARKS_SQL, (ids,))
+                graph_accounts = sorted({edge["account_id"] for edge in edges})
+                if graph_accounts:
+                    execute_values(cur, TOUCH_GRAPH_VERSIONS_SQL, [(a,) for a in graph_accounts])
+            if self.chunk_loader is not None and unique:
+                self.chunk_loader.load(
+                    (doc_id, acc, document_pieces(d))
+                    for doc_id, acc, d, canonical in zip(ids, account_ids, docs, duplicate_of)
+                    if canonical is None
+                )
+        if self.dedup is not None:
+            # Remembered only once every write succeeded: later copies must not point at a document that wasn't stored
+            self.dedup.commit(kept_signatures)
+            self.dedup.record(received, duplicates, bytes_saved)
+        return {"documents": received, "duplicates": duplicates, "edges": len(edges)}
+
+    def _bytes_saved(
+        self, docs: List[Dict[str, Any]], payloads: List[Dict[str, Any]], duplicate_of: List[Optional[str]]
+    ) -> int:
+        """Vector and payload bytes not stored for the duplicates (plus their SQL text when dropped)."""
+        saved = 0
+        for d, payload, canonical in zip(docs, payloads, duplicate_of):
+            if canonical is None:
+                continue
+            saved += self.embedder.dim * 4 + len(json.dumps(payload))
+            if self.dedup_mode == "drop":
+                saved += len((d.get("text") or "").encode("utf-8"))
+        return saved
+
+
+def build_chunk_loader(
+    pg_pool: Optional[PgConnectionPool], embedder: EmbeddingService
+) -> Optional[ChunkLoader]:
+    """Loader configured from Settings; None without PostgreSQL or when CHUNK_INGEST_ENABLED is off."""
+    if pg_pool is None or not settings.chunk_ingest_enabled:
+        return None
+    # Imported here: src.context is otherwise only needed by the API
+    from src.context import token_counter
+
+    return ChunkLoader(
+        pg_pool,
+        embedder,
+        token_counter(settings.groq_model),
+        max_tokens=settings.chunk_max_tokens,
+        overlap_tokens=settings.chunk_overlap_tokens,
+        batch_rows=settings.chunk_load_batch_rows,
+        statement_timeout_ms=settings.chunk_load_statement_timeout_ms,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load a large text file (e.g. a 10-K) as one chunked document")
+    parser.add_argument("path")
+    parser.add_argument("--id", required=True, help="document id")
+    parser.add_argument("--account-id", required=True)
+    parser.add_argument("--title", default="")
+    parser.add_argument("--source", default="file")
+    parser.add_argument("--url")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not settings.chunk_ingest_enabled:
+        parser.error("CHUNK_INGEST_ENABLED is off")
+    embedder = build_embedding_service()
+    pool = PgConnectionPool(pg_dsn(), **pg_pool_options())
+    loader = build_chunk_loader(pool, embedder)
+    # The documents row carries only the head of the text; the full text lives in the chunks
+    with open(args.path, encoding="utf-8", errors="replace") as f:
+        head = f.read(EMBED_TEXT_CHARS)
+    with pool.connection() as pc, pc.transaction() as cur:
+        cur.execute(DOCUMENTS_SCHEMA_SQL)
+        cur.execute(LOCK_INGEST_SQL)
+        execute_values(cur, UPSERT_DOCUMENTS_SQL, [(
+            args.id, args.account_id, args.title or None, args.source, args.url, head,
+            datetime.now(timezone.utc).isoformat(), None,
+        )])
+        cur.execute(ADVANCE_WATERMARKS_SQL, ([args.id],))
+    pieces = itertools.chain(document_pieces({"title": args.title}), iter_file(args.path))
+    result = loader.load([(args.id, args.account_id, pieces)])
+    print(json.dumps(result, indent=2))
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
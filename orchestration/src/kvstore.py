@@ -0,0 +1,197 @@
+"""
+Embedded on-disk key-value store (SQLite) for caches that must survive restarts.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Expired rows are swept after this many writes (reads already skip them)
+PURGE_EVERY_WRITES = 1000
+
+
+class SqliteKVStore:
+    """
+    Small thread-safe bytes->bytes store backed by a single SQLite file in WAL mode.
+
+    Optional `ttl_seconds` expires entries (per-put override via `ttl`), and
+    `max_bytes` caps the total value size by deleting the oldest writes first.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "kv",
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        # Tables created before expiry/eviction existed lack these columns
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if "expires_at" not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN expires_at REAL")
+        if "written_at" not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN written_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_written_idx ON {table} (written_at)")
+        # Approximate (replaced values are counted twice); recomputed before evicting
+        self._bytes = self._total_bytes() if max_bytes else 0
+        self._writes = 0
+        self.evictions = 0
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute(f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_with_expiry(self, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        """The value and its expiry (epoch seconds, None for never), if present."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders}) "
+                    f"AND (expires_at IS NULL OR expires_at > ?)",
+                    [*chunk, time.time()],
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def items(self, batch: int = 1000) -> Iterator[Tuple[str, bytes]]:
+        """Every live (key, value), in key order, read in batches so the lock isn't held throughout."""
+        after = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key > ? AND (expires_at IS NULL OR expires_at > ?) "
+                    f"ORDER BY key LIMIT ?",
+                    (after, time.time(), batch),
+                ).fetchall()
+            yield from rows
+            if len(rows) < batch:
+                return
+            after = rows[-1][0]
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.put_many([(key, value)], ttl=ttl)
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]], ttl: Optional[float] = None) -> None:
+        items = list(items)
+        if not items:
+            return
+        now = time.time()
+        ttl = self.ttl_seconds if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, written_at) VALUES (?, ?, ?, ?)",
+                    [(key, value, expires_at, now) for key, value in items],
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._writes += len(items)
+            if self._writes >= PURGE_EVERY_WRITES:
+                self._writes = 0
+                self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            if self.max_bytes:
+                self._bytes += sum(len(value) for _, value in items)
+                if self._bytes > self.max_bytes:
+                    self._evict(now)
+
+    def put_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """
+        Write `key` only if it is missing or expired, atomically across processes
+        sharing the file. Returns whether this call wrote it.
+        """
+        now = time.time()
+        ttl = self.ttl_seconds if ttl is None else ttl
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so check-and-insert can't interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ? AND expires_at <= ?", (key, now))
+                cursor = self._conn.execute(
+                    f"INSERT OR IGNORE INTO {self.table} (key, value, expires_at, written_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now + ttl if ttl is not None else None, now),
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return cursor.rowcount == 1
+
+    def _evict(self, now: float) -> None:
+        """Drop expired rows, then the oldest writes until ~90% of `max_bytes`. Caller holds the lock."""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        self._bytes = self._total_bytes()
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                f"SELECT key, LENGTH(value) FROM {self.table} ORDER BY written_at LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            keys = []
+            for key, size in rows:
+                keys.append(key)
+                self._bytes -= size
+                if self._bytes <= target:
+                    break
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ({','.join('?' * len(keys))})", keys
+            )
+            self.evictions += len(keys)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every key starting with `prefix` (all keys for an empty prefix). Returns the count."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
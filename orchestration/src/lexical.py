@@ -0,0 +1,304 @@
+"""
+Embedded BM25 keyword index over document text: exact matches on tickers, product and people names.
+
+Run `python -m src.lexical` to print the size of the persisted index.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.filelock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Words, keeping tickers and names like "brk.b" or "at&t" whole
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.&][a-z0-9]+)*")
+
+# Too common to help ranking, and the longest posting lists
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have in into is it its of on or over "
+    "that the their this to was were which will with".split()
+)
+
+# Term counts are stored as uint16
+MAX_TERM_COUNT = 65535
+
+# Dead rows (replaced documents) tolerated before postings are compacted
+MIN_DEAD_FOR_COMPACTION = 1000
+
+# First line of a rewritten log; its random id tells readers the log was replaced even if the inode is reused
+_COMPACTION_HEADER = b'{"compaction":'
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    Embedded BM25 index persisted under `path`.
+
+    Each document is one line of an append-only `docs.jsonl` (term counts,
+    length, account and payload); the last line per id wins, so re-adding a
+    document replaces it. Document line i is row i in memory, where each term's
+    postings are two parallel arrays of uint32 rows and uint16 term counts.
+    A replaced document leaves a dead row that searches skip; once dead rows
+    outnumber live ones, the log is rewritten without them and replaced
+    atomically, and the postings are renumbered to match. Appends and
+    rewrites hold an flock on `lock`; other processes pick up appended lines,
+    or reload a rewritten log, on their next search.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        os.makedirs(path, exist_ok=True)
+        self._log_path = os.path.join(path, "docs.jsonl")
+        self._lock_path = os.path.join(path, "lock")
+        self._lock = threading.RLock()
+        self._reset()
+        self._load_log()
+
+    def _reset(self) -> None:
+        # Identity (inode, compaction header) of the log the in-memory state was read from, and how far
+        self._log_identity: Optional[Tuple[int, bytes]] = None
+        self._log_offset = 0
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._lengths = array("I")
+        self._accounts = array("i")
+        self._alive = bytearray()
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._account_code_of: Dict[str, int] = {}
+        self._account_names: List[str] = []
+        self._live = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def _account_code(self, account_id: str) -> int:
+        code = self._account_code_of.get(account_id)
+        if code is None:
+            code = self._account_code_of[account_id] = len(self._account_names)
+            self._account_names.append(account_id)
+        return code
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        old = self._row_of.get(record["id"])
+        if old is not None:
+            self._alive[old] = 0
+            self._payloads[old] = None
+            self._live -= 1
+            self._total_length -= self._lengths[old]
+        row = len(self._ids)
+        self._ids.append(record["id"])
+        self._row_of[record["id"]] = row
+        self._lengths.append(record["len"])
+        self._accounts.append(self._account_code(record.get("account_id") or ""))
+        self._alive.append(1)
+        self._payloads.append(record.get("payload") or {})
+        self._live += 1
+        self._total_length += record["len"]
+        for term, count in record["tf"].items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = (array("I"), array("H"))
+            posting[0].append(row)
+            posting[1].append(min(count, MAX_TERM_COUNT))
+
+    def _read_log(self) -> None:
+        """Apply log lines written since the last read (by us or another process)."""
+        try:
+            f = open(self._log_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            first = f.readline()
+            identity = (os.fstat(f.fileno()).st_ino, first if first.startswith(_COMPACTION_HEADER) else b"")
+            if identity != self._log_identity:
+                # Rewritten by a compaction (here or in another process): start over
+                if self._log_identity is not None:
+                    self._reset()
+                self._log_identity = identity
+            f.seek(self._log_offset)
+            data = f.read()
+        # Ignore a trailing partial line from a concurrent writer
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if line.strip() and not line.startswith(_COMPACTION_HEADER):
+                self._apply(json.loads(line))
+        self._log_offset += len(complete)
+
+    def _needs_compaction(self) -> bool:
+        dead = len(self._ids) - self._live
+        return dead >= MIN_DEAD_FOR_COMPACTION and dead > self._live
+
+    def _load_log(self) -> None:
+        self._read_log()
+        if self._needs_compaction():
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the log without dead rows, then drop them from the postings and renumber the live ones."""
+        with file_lock(self._lock_path):
+            # Another process may have appended, or compacted already
+            self._read_log()
+            if not self._needs_compaction():
+                return
+            self._rewrite_log()
+        alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        new_row = np.cumsum(alive, dtype=np.int64) - 1
+        postings: Dict[str, Tuple[array, array]] = {}
+        for term, (rows, counts) in self._postings.items():
+            rows_np = np.frombuffer(rows, dtype=np.uint32)
+            keep = alive[rows_np]
+            if not keep.any():
+                continue
+            new_rows, new_counts = array("I"), array("H")
+            new_rows.frombytes(new_row[rows_np[keep]].astype(np.uint32).tobytes())
+            new_counts.frombytes(np.frombuffer(counts, dtype=np.uint16)[keep].tobytes())
+            postings[term] = (new_rows, new_counts)
+        live_rows = np.flatnonzero(alive).tolist()
+        self._postings = postings
+        self._ids = [self._ids[r] for r in live_rows]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._lengths = array("I", (self._lengths[r] for r in live_rows))
+        self._accounts = array("i", (self._accounts[r] for r in live_rows))
+        self._payloads = [self._payloads[r] for r in live_rows]
+        self._alive = bytearray(b"\x01" * len(live_rows))
+        logger.info(f"Compacted lexical index to {len(live_rows)} documents, {len(postings)} terms")
+
+    def _rewrite_log(self) -> None:
+        """Replace the log with its live lines (line i is row i), atomically."""
+        tmp_path = self._log_path + ".tmp"
+        header = _COMPACTION_HEADER + json.dumps(os.urandom(8).hex()).encode() + b"}\n"
+        row = 0
+        with open(self._log_path, "rb") as src, open(tmp_path, "wb") as dst:
+            dst.write(header)
+            for line in src.read(self._log_offset).splitlines(keepends=True):
+                if not line.strip() or line.startswith(_COMPACTION_HEADER):
+                    continue
+                if self._alive[row]:
+                    dst.write(line)
+                row += 1
+            dst.flush()
+            os.fsync(dst.fileno())
+            size = dst.tell()
+            inode = os.fstat(dst.fileno()).st_ino
+        os.replace(tmp_path, self._log_path)
+        self._log_identity = (inode, header)
+        self._log_offset = size
+
+    def add(
+        self,
+        ids: List[str],
+        texts: List[str],
+        account_ids: List[str],
+        payloads: List[Dict[str, Any]],
+    ) -> None:
+        lines = []
+        for doc_id, text, account_id, payload in zip(ids, texts, account_ids, payloads):
+            tokens = tokenize(text)
+            record = {
+                "id": doc_id,
+                "account_id": account_id,
+                "len": len(tokens),
+                "tf": dict(Counter(tokens)),
+                "payload": {k: v for k, v in payload.items() if v is not None},
+            }
+            lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+        with self._lock:
+            # Held so the lines can't land in a log that is being rewritten
+            with file_lock(self._lock_path):
+                with open(self._log_path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+            self._load_log()
+
+    def search(self, query: str, top_k: int = 5, account_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            self._load_log()
+            if not terms or not self._live or top_k <= 0:
+                return []
+            account_code = self._account_code_of.get(account_id) if account_id else None
+            if account_id and account_code is None:
+                return []
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+            accounts = np.frombuffer(self._accounts, dtype=np.int32)
+            avgdl = self._total_length / self._live or 1.0
+            matched_rows, matched_scores = [], []
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                rows = np.frombuffer(posting[0], dtype=np.uint32)
+                live = alive[rows]
+                df = int(np.count_nonzero(live))
+                if account_code is not None:
+                    live &= accounts[rows] == account_code
+                if not live.any():
+                    continue
+                rows = rows[live]
+                tf = np.frombuffer(posting[1], dtype=np.uint16)[live].astype(np.float32)
+                idf = math.log(1.0 + (self._live - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[rows] / avgdl)
+                matched_rows.append(rows)
+                matched_scores.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+            if not matched_rows:
+                return []
+            rows, inverse = np.unique(np.concatenate(matched_rows), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [
+                {
+                    "id": self._ids[rows[i]],
+                    "score": round(float(scores[i]), 4),
+                    "account_id": self._account_names[accounts[rows[i]]],
+                    **self._payloads[rows[i]],
+                }
+                for i in best
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_log()
+            postings = sum(len(rows) for rows, _ in self._postings.values())
+            return {
+                "documents": self._live,
+                "dead_rows": len(self._ids) - self._live,
+                "accounts": len(self._account_names),
+                "terms": len(self._postings),
+                "postings": postings,
+                "postings_bytes": postings * 6,
+                "avg_document_terms": round(self._total_length / self._live, 1) if self._live else 0.0,
+            }
+
+    def close(self) -> None:
+        pass
+
+
+def build_lexical_index() -> Optional[LexicalIndex]:
+    """Index configured from Settings; None when LEXICAL_INDEX_ENABLED is off."""
+    if not settings.lexical_index_enabled:
+        return None
+    return LexicalIndex(settings.lexical_index_path, k1=settings.bm25_k1, b=settings.bm25_b)
+
+
+if __name__ == "__main__":
+    index = build_lexical_index()
+    print(json.dumps(index.stats() if index else {"enabled": False}, indent=2))
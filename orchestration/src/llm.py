@@ -1,19 +1,145 @@
 """
 GROQ LLM integration using Groq SDK directly.
 """
+import asyncio
 import os
-from groq import Groq
+import re
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from src.admission import INTERACTIVE, AdmissionController, build_admission_controller, call_with_admission
 from src.config import settings
+from src.context import token_counter
+from src.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_HEDGES, LLM_PARSE, LLM_REQUEST_SECONDS, record_llm_usage, stage
+from src.router import ModelRouter, RouteDecision, build_model_router
 import json
 import logging
 
 
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
 logger = logging.getLogger(__name__)
 
-async def query_groq_for_synthesis(context: str, question: str) -> dict:
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY", settings.groq_api_key))
-    
-    prompt = f"""You are a sales intelligence analyst. 
+GROQ_COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+# Process-wide client, created in the app startup hook and closed on shutdown.
+_client: Optional["AsyncGroq"] = None
+# Every completion waits here for rate-limit capacity, most urgent first
+_admission: Optional[AdmissionController] = None
+# Picks the model per call and keeps per-model latency/quality stats
+_router: Optional[ModelRouter] = None
+_count_tokens = None
+
+
+def _groq_base_url() -> str:
+    """Derive the SDK base URL from the configured chat-completions URL."""
+    url = settings.groq_api_url.rstrip("/")
+    if url.endswith(GROQ_COMPLETIONS_PATH):
+        url = url[: -len(GROQ_COMPLETIONS_PATH)]
+    return url
+
+
+def init_llm_client() -> "AsyncGroq":
+    """Create the shared async GROQ client with a pooled keep-alive transport."""
+    global _client
+    if _client is None:
+        # The SDK is imported here rather than at module load to keep app startup fast
+        import httpx
+        from groq import AsyncGroq
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.groq_max_connections,
+                max_keepalive_connections=settings.groq_max_keepalive_connections,
+                keepalive_expiry=settings.groq_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.groq_read_timeout,
+                connect=settings.groq_connect_timeout,
+            ),
+        )
+        _client = AsyncGroq(
+            api_key=os.environ.get("GROQ_API_KEY", settings.groq_api_key),
+            base_url=_groq_base_url(),
+            # Retries go back through admission control instead (see _create_completion)
+            max_retries=0,
+            http_client=http_client,
+        )
+        logger.info(
+            f"GROQ client initialized (max_connections={settings.groq_max_connections}, "
+            f"keepalive={settings.groq_max_keepalive_connections})"
+        )
+    return _client
+
+
+def get_llm_client() -> "AsyncGroq":
+    """Return the shared client, creating it on first use outside the app lifecycle."""
+    return _client if _client is not None else init_llm_client()
+
+
+async def close_llm_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+        logger.info("GROQ client closed")
+
+
+def get_admission_controller() -> AdmissionController:
+    global _admission
+    if _admission is None:
+        _admission = build_admission_controller()
+    return _admission
+
+
+def get_model_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        _router = build_model_router()
+    return _router
+
+
+def default_route() -> RouteDecision:
+    """GROQ_MODEL without hedging, for callers that don't route."""
+    return RouteDecision(settings.groq_model, "deep", "default")
+
+
+def _estimate_tokens(prompt: str) -> int:
+    """Tokens a call may use against the per-minute budget: the prompt plus the full completion allowance."""
+    global _count_tokens
+    if _count_tokens is None:
+        _count_tokens = token_counter(settings.groq_model)
+    return _count_tokens(prompt) + settings.llm_max_tokens
+
+
+async def _create_completion(
+    prompt: str, model: str, priority: int, needed_by: Optional[float], estimate: int, **kwargs
+):
+    """chat.completions.create once admitted, retried with jittered backoff on 429/5xx/connection errors."""
+    client = get_llm_client()
+    return await call_with_admission(
+        get_admission_controller(),
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=settings.llm_max_tokens,
+            **kwargs,
+        ),
+        priority,
+        estimate,
+        needed_by=needed_by,
+        max_retries=settings.groq_max_retries,
+        backoff_base=settings.llm_retry_backoff_base,
+        backoff_cap=settings.llm_retry_backoff_cap,
+    )
+
+
+def build_synthesis_prompt(context: str, question: str) -> str:
+    return f"""You are a sales intelligence analyst. 
             Based on the following context, provide a concise, actionable insight.
 
             Context:
@@ -32,52 +158,236 @@ async def query_groq_for_synthesis(context: str, question: str) -> dict:
             }}
 
             Be factual. Confidence should be 0.5-0.95."""
+
+
+def parse_synthesis_output(response_text: str, model: Optional[str] = None) -> dict:
+    """
+    Parse the model's JSON answer, tolerating markdown fences and stray
+    prose. How it parsed is recorded as a quality signal for `model`.
+    """
+    model = model or settings.groq_model
     try:
-        response = client.chat.completions.create(
-            model=settings.groq_model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1024,
-        )
-        
-        # print(response)
-        
-        response_text = response.choices[0].message.content
-        # print(response_text)
-        
-        # Parse JSON response
+        result = json.loads(response_text)
+        _record_parse(model, "json", result)
+        return result
+    except json.JSONDecodeError:
+        pass
+    # If response contains markdown code blocks, extract JSON
+    json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+    if json_match:
         try:
-            result = json.loads(response_text)
-            # print(result)
+            result = json.loads(json_match.group())
+            _record_parse(model, "extracted", result)
+            return result
         except json.JSONDecodeError:
-            # If response contains markdown code blocks, extract JSON
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
+            pass
+    _record_parse(model, "raw", {})
+    return {
+        "insight": response_text[:200],
+        "confidence": 0.6,
+        "reasoning": "Parsed from GROQ response",
+        "sources": [],
+        "Action": "Review insight and action accordingly"
+    }
+
+
+def _record_parse(model: str, outcome: str, result) -> None:
+    LLM_PARSE.labels(model, outcome).inc()
+    confidence = result.get("confidence") if isinstance(result, dict) else None
+    get_model_router().record_quality(model, outcome, confidence)
+
+
+def fallback_synthesis(question: str) -> dict:
+    """Stub result used when GROQ is unreachable; flagged so it isn't cached."""
+    return {
+        "insight": f"Analysis for: {question[:50]}",
+        "confidence": 0.5,
+        "reasoning": "Default response (GROQ unavailable)",
+        "sources": [],
+        "Action": "Review insight and action accordingly",
+        "fallback": True,
+    }
+
+
+async def query_groq_for_synthesis(
+    context: str,
+    question: str,
+    priority: int = INTERACTIVE,
+    needed_by: Optional[float] = None,
+    route: Optional[RouteDecision] = None,
+) -> dict:
+    """
+    Synthesize an insight with the routed model. `priority` (admission class)
+    and `needed_by` (time.monotonic() deadline) decide the call's place in the
+    admission queue. Hedged routes are streamed internally so the race is
+    decided on the first token.
+    """
+    route = route or default_route()
+    with stage("prompt_build"):
+        prompt = build_synthesis_prompt(context, question)
+        estimate = _estimate_tokens(prompt)
+    start = time.perf_counter()
+    try:
+        with stage("llm"):
+            if route.hedge_model:
+                response_text = "".join([delta async for delta in _stream_completion(prompt, route, priority, needed_by, estimate)])
             else:
-                result = {
-                    "insight": response_text[:200],
-                    "confidence": 0.6,
-                    "reasoning": "Parsed from GROQ response",
-                    "sources": [],
-                    "Action": "Review insight and action accordingly"
-                }
+                try:
+                    response = await _create_completion(prompt, route.model, priority, needed_by, estimate)
+                except Exception:
+                    get_model_router().record_call(route.model, time.perf_counter() - start, ok=False)
+                    raise
+                elapsed = time.perf_counter() - start
+                LLM_REQUEST_SECONDS.labels(route.model, "complete", "ok").observe(elapsed)
+                get_model_router().record_call(route.model, elapsed)
+                record_llm_usage(route.model, response.usage)
+                get_admission_controller().settle(estimate, getattr(response.usage, "total_tokens", None))
+                response_text = response.choices[0].message.content
+
+        with stage("parse"):
+            result = parse_synthesis_output(response_text, route.served_by)
+        result["model"] = route.served_by
         
-        logger.info(f"GROQ synthesis complete: confidence={result.get('confidence')}")
+        logger.info(f"GROQ synthesis complete ({route.served_by}): confidence={result.get('confidence')}")
         return result
         
     except Exception as e:
+        if not route.hedge_model:
+            LLM_REQUEST_SECONDS.labels(route.model, "complete", "error").observe(time.perf_counter() - start)
         logger.error(f"GROQ query error: {e}")
-        result = {
-            "insight": f"Analysis for: {question[:50]}",
-            "confidence": 0.5,
-            "reasoning": "Default response (GROQ unavailable)",
-            "sources": [],
-            "Action": "Review insight and action accordingly"
-            
-        }
-        return result
+        return fallback_synthesis(question)
+
+
+async def stream_groq_for_synthesis(
+    context: str,
+    question: str,
+    priority: int = INTERACTIVE,
+    needed_by: Optional[float] = None,
+    route: Optional[RouteDecision] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield completion text deltas as GROQ produces them (retried only before
+    the stream opens). `route.served_by` names the model that answered.
+    """
+    route = route or default_route()
+    with stage("prompt_build"):
+        prompt = build_synthesis_prompt(context, question)
+        estimate = _estimate_tokens(prompt)
+    async for delta in _stream_completion(prompt, route, priority, needed_by, estimate):
+        yield delta
+
+
+class _OpenStream:
+    """A streamed completion that has produced its first content delta (or ended without one)."""
+
+    def __init__(self, model: str, stream, chunks, first_delta: str, start: float):
+        self.model = model
+        self.stream = stream
+        self.chunks = chunks
+        self.first_delta = first_delta
+        self.start = start
+        self.first_token_seconds = time.perf_counter() - start
+
+
+def _content_delta(model: str, chunk, estimate: int) -> str:
+    """Record usage carried by a stream chunk and return its text delta."""
+    # Groq reports usage on the final chunk under x_groq
+    x_groq = getattr(chunk, "x_groq", None)
+    usage = getattr(chunk, "usage", None) or getattr(x_groq, "usage", None)
+    record_llm_usage(model, usage)
+    if usage is not None:
+        get_admission_controller().settle(estimate, getattr(usage, "total_tokens", None))
+    if chunk.choices and chunk.choices[0].delta.content:
+        return chunk.choices[0].delta.content
+    return ""
 
+
+async def _open_stream(prompt: str, model: str, priority: int, needed_by: Optional[float], estimate: int) -> _OpenStream:
+    start = time.perf_counter()
+    stream = await _create_completion(prompt, model, priority, needed_by, estimate, stream=True)
+    chunks = stream.__aiter__()
+    try:
+        async for chunk in chunks:
+            delta = _content_delta(model, chunk, estimate)
+            if delta:
+                LLM_FIRST_TOKEN_SECONDS.labels(model).observe(time.perf_counter() - start)
+                return _OpenStream(model, stream, chunks, delta, start)
+    except BaseException:
+        await stream.close()
+        raise
+    return _OpenStream(model, stream, chunks, "", start)
+
+
+async def _race(prompt: str, route: RouteDecision, priority: int, needed_by: Optional[float], estimate: int) -> _OpenStream:
+    """
+    Open the routed model's stream; if it has no first token after
+    `route.hedge_after`, or fails before then, also open the hedge model's
+    and keep whichever produces one first (the other is cancelled). A
+    failure of one just leaves the race to the other.
+    """
+    start = time.perf_counter()
+    tasks = {asyncio.create_task(_open_stream(prompt, route.model, priority, needed_by, estimate)): route.model}
+    hedged = False
+    try:
+        if route.hedge_model:
+            done, _ = await asyncio.wait(tasks, timeout=route.hedge_after)
+            # A quick failure (rate limit, 5xx) hedges right away rather than falling back
+            failed = any(task.exception() is not None for task in done)
+            if not done or failed:
+                hedged = True
+                if failed:
+                    logger.info(f"{route.model} failed before its first token; hedging with {route.hedge_model}")
+                else:
+                    logger.info(f"No first token from {route.model} after {route.hedge_after * 1000:.0f}ms; hedging with {route.hedge_model}")
+                tasks[asyncio.create_task(_open_stream(prompt, route.hedge_model, priority, needed_by, estimate))] = route.hedge_model
+        pending = set(tasks)
+        errors = {}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    model = tasks[task]
+                    errors[model] = task.exception()
+                    logger.warning(f"GROQ stream from {model} failed before its first token: {errors[model]}")
+                    LLM_REQUEST_SECONDS.labels(model, "stream", "error").observe(time.perf_counter() - start)
+                    get_model_router().record_call(model, time.perf_counter() - start, ok=False)
+            winners = [task for task in done if task.exception() is None]
+            if winners:
+                winner = winners[0].result()
+                if hedged:
+                    won = winner.model == route.hedge_model
+                    get_model_router().record_hedge(route.hedge_model, won)
+                    LLM_HEDGES.labels("hedge" if won else "primary").inc()
+                    if won and route.model not in errors:
+                        # The abandoned primary took at least this long; keep the router's view of it honest
+                        get_model_router().record_call(route.model, time.perf_counter() - start)
+                for task in winners[1:]:
+                    await task.result().stream.close()
+                return winner
+        raise errors.get(route.model) or next(iter(errors.values()))
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _stream_completion(
+    prompt: str, route: RouteDecision, priority: int, needed_by: Optional[float], estimate: int
+) -> AsyncIterator[str]:
+    opened = await _race(prompt, route, priority, needed_by, estimate)
+    route.served_by = opened.model
+    outcome = "error"
+    try:
+        if opened.first_delta:
+            yield opened.first_delta
+        async for chunk in opened.chunks:
+            delta = _content_delta(opened.model, chunk, estimate)
+            if delta:
+                yield delta
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - opened.start
+        LLM_REQUEST_SECONDS.labels(opened.model, "stream", outcome).observe(elapsed)
+        get_model_router().record_call(opened.model, elapsed, opened.first_token_seconds, ok=outcome == "ok")
+        if outcome != "ok":
+            await opened.stream.close()
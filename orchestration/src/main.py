@@ -1,230 +1,1314 @@
 import asyncio
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+import os
+import tempfile
+import time
+from importlib import import_module
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, List, Optional
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
+import numpy as np
+
 from src.config import settings
-from src.retriever import HybridRetriever
-from src.llm import query_groq_for_synthesis
-from src.models import Briefing, BriefingMetadata, Insight, Citation, DrillDownRequest, DrillDownResponse
+from src.retriever import SOURCE_OK, SOURCE_SKIPPED, HybridRetriever
+from src.graph_cache import MAX_DEPTH as MAX_GRAPH_DEPTH
+from src.db import pg_dsn, pg_pool_options
+from src.llm import (
+    build_synthesis_prompt,
+    query_groq_for_synthesis,
+    stream_groq_for_synthesis,
+    parse_synthesis_output,
+    init_llm_client,
+    close_llm_client,
+    get_admission_controller,
+    get_model_router,
+)
+from src.admission import BATCH, INTERACTIVE, PREWARM
+from src.streaming import IncrementalJSONFieldParser, sse_event
+from src.models import (
+    Briefing,
+    BriefingMetadata,
+    Insight,
+    Citation,
+    DrillDownRequest,
+    DrillDownResponse,
+    BatchBriefingItem,
+    BatchBriefingRequest,
+    UpcomingMeeting,
+)
+from src.embeddings import build_embedding_service
+from src.vector_index import build_vector_store
+from src.lexical import build_lexical_index
+from src.context import AssembledContext, pack_context, token_counter
+from src.provenance import build_provenance_store, insight_id
+from src.responses import FastJSONResponse, dump_json
+from src.health import CONNECTING, DISABLED, FAILED, READY, BackendStatus
+from src.metrics import (
+    HTTP_REQUEST_SECONDS,
+    RequestProfiler,
+    cache_collector,
+    render_metrics,
+    server_timing,
+    stage,
+    start_trace,
+)
+from src.cache import BriefingCache, SharedCacheTier, UncacheableResult, briefing_cache_key
+from src.semantic_cache import SemanticHit, account_context_version, build_semantic_cache, cosine_similarity
+from src.prewarm import FileMeetingSource, PrewarmScheduler, QueueMeetingSource
+from src.watermarks import AccountWatermarks, build_briefing_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="SalesAI Orchestration")
+# Routes are registered on a router so every app built by create_app() shares
+# them; services below are per process (each worker builds its own)
+router = APIRouter()
 
-# Add CORS middleware to allow frontend requests
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# The model itself loads in the background after startup (see _connect_backends)
+embedding_service = build_embedding_service()
 
-# Initialize retriever (with graceful fallback)
+# Constructing the retriever opens no connections; the vector store and each
+# backend connect in the background after startup (see _connect_backends)
 try:
-    pg_conn_str = f"postgresql://{settings.pg_user}:{settings.pg_password}@{settings.pg_host}:{settings.pg_port}/{settings.pg_database}"
     retriever = HybridRetriever(
-        pg_conn_str,
+        pg_dsn(),
         settings.milvus_host,
         settings.milvus_port,
         settings.neo4j_uri,
         settings.neo4j_user,
         settings.neo4j_password,
+        source_timeouts={
+            "vector": settings.retrieval_vector_timeout,
+            "lexical": settings.retrieval_lexical_timeout,
+            "graph": settings.retrieval_graph_timeout,
+            "sql": settings.retrieval_sql_timeout,
+        },
+        pg_pool_options=pg_pool_options(),
+        neo4j_enabled=settings.neo4j_enabled,
+        graph_cache_options={
+            "load_depth": settings.graph_cache_load_depth,
+            "max_accounts": settings.graph_cache_max_accounts,
+            "ttl_seconds": settings.graph_cache_ttl_seconds,
+        },
+        lexical_top_k=settings.lexical_top_k,
+        rrf_k=settings.rrf_k,
+        search_workers=settings.retrieval_search_workers,
     )
-    logger.info("HybridRetriever initialized successfully")
 except Exception as e:
     logger.warning(f"HybridRetriever initialization failed (expected in dev): {e}")
     retriever = None
 
+backends = BackendStatus(["llm", "embeddings", "vector", "postgres", "neo4j"])
+readiness_required = [name.strip() for name in settings.readiness_required_backends.split(",") if name.strip()]
+
+count_tokens = token_counter(settings.groq_model)
+provenance_store = build_provenance_store()
+
+# A single worker has nothing to share with; `uvicorn --workers` needs the path set explicitly
+briefing_cache_shared_path = settings.briefing_cache_shared_path or (
+    ".cache/briefings.sqlite" if settings.workers > 1 else ""
+)
+briefing_cache = BriefingCache(
+    ttl_seconds=settings.briefing_cache_ttl_seconds,
+    max_entries=settings.briefing_cache_max_entries,
+    shared=SharedCacheTier(
+        briefing_cache_shared_path,
+        dumps=dump_json,
+        loads=Briefing.model_validate_json,
+        lease_seconds=settings.briefing_cache_lease_seconds,
+        max_bytes=settings.briefing_cache_shared_max_bytes,
+    ) if briefing_cache_shared_path else None,
+)
+
+semantic_cache = build_semantic_cache(embedding_service.dim)
+# Background re-syntheses of sampled semantic cache hits (referenced until done)
+_semantic_audits: set = set()
+
+# Latest briefing per (account, role, query) and the document watermark it reflects
+briefing_store = build_briefing_store(dump_json, Briefing.model_validate_json)
+account_watermarks = AccountWatermarks()
+
+profiler = RequestProfiler(
+    settings.profiling_enabled,
+    settings.profile_dir,
+    sample_rate=settings.profile_sample_rate,
+    max_per_minute=settings.profile_max_per_minute,
+)
+
+cache_collector.register("briefing", briefing_cache.stats)
+if semantic_cache:
+    cache_collector.register("semantic", semantic_cache.stats)
+if briefing_store:
+    cache_collector.register("watermark", lambda: (lambda s: {
+        "hits": s["outcomes"]["unchanged"],
+        "misses": sum(s["outcomes"].values()) - s["outcomes"]["unchanged"],
+        "entries": s["stored"],
+    })(briefing_store.stats()))
+cache_collector.register("embedding", lambda: (lambda s: {
+    "hits": s["memory_hits"] + s["disk_hits"], "misses": s["misses"], "entries": s["memory_entries"],
+})(embedding_service.stats()))
+cache_collector.register("provenance", lambda: (lambda s: {
+    "hits": s["reads"] - s["misses"], "misses": s["misses"], "entries": s["records"],
+})(provenance_store.stats()))
+if retriever:
+    cache_collector.register("graph", lambda: (lambda s: {**s, "entries": s["accounts"]})(retriever.graph_cache.stats()))
+
+
+async def observe_requests(request: Request, call_next):
+    """
+    Request latency histogram per route, a Server-Timing header with the
+    pipeline stages, and a profile dump when `X-Profile: 1` is sent (or the
+    request is sampled) and profiling is enabled.
+    """
+    trace = start_trace()
+    start = time.perf_counter()
+    status = 500
+    try:
+        if profiler.should_profile(request.headers.get("x-profile", "").lower() in ("1", "true")):
+            with profiler.profile(request.url.path.strip("/").replace("/", "_") or "root") as dump:
+                response = await call_next(request)
+            response.headers["X-Profile-Path"] = dump["path"]
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        if trace:
+            response.headers["Server-Timing"] = server_timing(trace)
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(request.method, getattr(route, "path", "unmatched"), str(status)).observe(
+            time.perf_counter() - start
+        )
+
+
+# Interactive briefing requests currently being served; pre-warming yields to them
+_interactive_inflight = 0
+
+
+async def track_interactive_requests(request: Request, call_next):
+    global _interactive_inflight
+    if not request.url.path.startswith("/api/briefing/"):
+        return await call_next(request)
+    _interactive_inflight += 1
+    try:
+        return await call_next(request)
+    finally:
+        _interactive_inflight -= 1
+
+
+async def _connect_llm():
+    # Import the SDK off the event loop; the client itself is created on it
+    await asyncio.to_thread(import_module, "groq")
+    init_llm_client()
+
+
+def _connect_vector_store():
+    if retriever.vector_store is None:
+        retriever.vector_store = build_vector_store(embedding_service.dim)
+    retriever.vector_store.connect()
+    # The keyword index lives beside the embedded vector index and loads with it
+    if retriever.lexical_index is None:
+        retriever.lexical_index = build_lexical_index()
+
 
-@app.on_event("shutdown")
-async def shutdown():
+async def _connect_backend(name: str) -> None:
+    retrying = backends.state(name) == FAILED
+    backends.set(name, CONNECTING)
+    try:
+        if name == "llm":
+            await _connect_llm()
+        elif name == "embeddings":
+            # Imports torch and reads the model weights; until then the first embedding would load it
+            await asyncio.to_thread(embedding_service.load)
+        elif name == "vector":
+            await asyncio.to_thread(_connect_vector_store)
+        elif name == "postgres":
+            # Pre-opens pooled connections so the first briefing doesn't pay for them
+            await asyncio.to_thread(retriever.warm_up)
+        elif name == "neo4j":
+            await asyncio.to_thread(retriever.connect_graph)
+    except Exception as e:
+        backends.set(name, FAILED, str(e))
+        if not retrying:
+            logger.warning(f"Backend {name} failed to connect (retrying every {settings.backend_retry_seconds}s): {e}")
+        return
+    backends.set(name, READY)
+    logger.info(f"Backend {name} connected")
+
+
+async def _connect_backends():
+    """
+    Connect every backend concurrently once the server is accepting requests,
+    then keep retrying the ones that failed. Until a backend is ready the
+    endpoints degrade as they would if it were down.
+    """
+    pending = ["llm", "embeddings"]
+    for name in ("vector", "postgres", "neo4j"):
+        if not retriever or (name == "neo4j" and not settings.neo4j_enabled):
+            backends.set(name, DISABLED)
+        else:
+            pending.append(name)
+    while pending:
+        await asyncio.gather(*(_connect_backend(name) for name in pending))
+        pending = backends.failed()
+        if pending:
+            await asyncio.sleep(settings.backend_retry_seconds)
+
+
+async def _watch_graph_invalidations():
+    """Drop cached subgraphs of accounts the ingestion pipeline has written new edges for."""
+    since = datetime.now(timezone.utc)
+    failing = False
+    while True:
+        await asyncio.sleep(settings.graph_invalidation_poll_seconds)
+        try:
+            accounts, since = await asyncio.to_thread(retriever.graph_changes_since, since)
+        except Exception as e:
+            if not failing:
+                logger.warning(f"Graph invalidation poll failed (will keep retrying): {e}")
+            failing = True
+            continue
+        failing = False
+        for account_id in accounts:
+            retriever.graph_cache.invalidate(account_id)
+        if accounts:
+            logger.info(f"Invalidated cached subgraphs for {len(accounts)} accounts")
+
+
+async def _watch_watermarks():
+    """Mirror the per-account document watermarks the ingestion pipeline advances."""
+    failing = False
+    while True:
+        try:
+            rows = await asyncio.to_thread(retriever.watermarks_since, account_watermarks.poll_since())
+        except Exception as e:
+            if not failing:
+                logger.warning(f"Watermark poll failed (will keep retrying): {e}")
+            failing = True
+        else:
+            failing = False
+            advanced = account_watermarks.apply(rows)
+            if advanced:
+                logger.info(f"Document watermarks advanced for {advanced} accounts")
+        await asyncio.sleep(settings.watermark_poll_seconds)
+
+
+async def startup(app: FastAPI):
+    # Runs in the background so slow or unreachable backends don't delay boot
+    app.state.connect_task = asyncio.create_task(_connect_backends())
+    if retriever:
+        app.state.graph_watch_task = asyncio.create_task(_watch_graph_invalidations())
+    if retriever and briefing_store:
+        app.state.watermark_watch_task = asyncio.create_task(_watch_watermarks())
+    if settings.prewarm_enabled:
+        prewarm_scheduler.start()
+
+
+async def shutdown(app: FastAPI):
+    await prewarm_scheduler.stop()
+    app.state.connect_task.cancel()
+    if retriever:
+        app.state.graph_watch_task.cancel()
+    if retriever and briefing_store:
+        app.state.watermark_watch_task.cancel()
+    await close_llm_client()
+    await embedding_service.stop()
+    provenance_store.close()
+    briefing_cache.close()
+    if briefing_store:
+        briefing_store.close()
     if retriever:
         retriever.close()
         logger.info("Retriever closed")
 
 
-@app.get("/health")
+@router.get("/health")
 async def health():
-    return {"status": "ok", "retriever": "connected" if retriever else "disconnected"}
+    return FastJSONResponse({
+        "status": "ok",
+        "retriever": "connected" if retriever and backends.state("postgres") == READY else "disconnected",
+        "backends": {name: entry["state"] for name, entry in backends.snapshot().items()},
+    })
+
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and its event loop is serving requests; backends aren't checked."""
+    return FastJSONResponse({"status": "alive", "uptime_seconds": round(time.time() - backends.started_at, 3)})
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    503 until every backend has been attempted and the ones named in
+    READINESS_REQUIRED_BACKENDS are connected ("starting" while some are
+    still being attempted, "unavailable" once a required one has failed);
+    reports each backend's state.
+    """
+    ready = backends.is_ready(readiness_required)
+    status = "ready" if ready else "unavailable" if backends.settled() else "starting"
+    return FastJSONResponse(
+        {"status": status, "required": readiness_required, "backends": backends.snapshot()},
+        status_code=200 if ready else 503,
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss/eviction counters for the briefing cache."""
+    return FastJSONResponse(briefing_cache.stats())
 
 
-@app.post("/api/briefing/{account_id}")
-async def generate_briefing(account_id: str, role: str = "ae", query: str = ""):
+@router.get("/api/cache/semantic/stats")
+async def semantic_cache_stats():
+    """Semantic answer cache hit rate, miss reasons, nearest-query similarity histogram and audit results."""
+    if semantic_cache is None:
+        return FastJSONResponse({"enabled": False})
+    return FastJSONResponse({"enabled": True, **semantic_cache.stats()})
 
+
+@router.get("/api/cache/watermarks/stats")
+async def watermark_stats():
+    """Stored briefings and how watermark lookups went: unchanged, delta, or why a full synthesis ran."""
+    if briefing_store is None:
+        return FastJSONResponse({"enabled": False})
+    return FastJSONResponse({
+        "enabled": True,
+        "watermarks_loaded": account_watermarks.loaded,
+        "accounts": len(account_watermarks),
+        **briefing_store.stats(),
+    })
+
+
+@router.get("/api/llm/admission/stats")
+async def admission_stats():
+    """LLM admission queue depth per priority, admissions, timeouts and 429 throttling."""
+    return FastJSONResponse(get_admission_controller().stats())
+
+
+@router.get("/api/llm/models/stats")
+async def model_stats():
+    """Routing table plus per-model latency (total, first token), errors, parse quality and hedge wins."""
+    return FastJSONResponse(get_model_router().stats())
+
+
+@router.get("/api/cache/graph/stats")
+async def graph_cache_stats():
+    """Hit/miss/load counters for the account subgraph cache."""
+    if not retriever:
+        raise HTTPException(status_code=503, detail="retriever unavailable")
+    return FastJSONResponse(retriever.graph_cache.stats())
+
+
+def _citations(llm_output: dict, context: Optional[AssembledContext]) -> list:
+    """
+    Cite the context items the model referenced (by URL or "[n]"), else the
+    top-ranked items that were actually in the prompt. Without retrieved
+    context, fall back to the model's own source list.
+    """
+    if not context or not context.items:
+        return [
+            Citation(
+                source_url=src if src.startswith("http") else f"https://example.com/source-{i}",
+                title=f"Source {i+1}",
+                text_snippet="...",
+                retrieval_method="vector",
+                confidence=0.9
+            )
+            for i, src in enumerate(llm_output.get("sources", ["NewsAPI", "SEC EDGAR"])[:3])
+        ]
+    refs = {}
+    for item in context.items:
+        for ref in (item.url, f"[{item.number}]", str(item.number)):
+            if ref:
+                refs.setdefault(ref, item)
+    cited = []
+    for src in llm_output.get("sources") or []:
+        item = refs.get(str(src).strip())
+        if item is not None and item not in cited:
+            cited.append(item)
+    if not cited:
+        cited = sorted(context.items, key=lambda i: i.score, reverse=True)
+    return [
+        Citation(
+            source_url=item.citation_url,
+            title=item.title,
+            text_snippet=(item.data.get("text") or item.text)[:200],
+            retrieval_method=item.source,
+            confidence=round(min(item.score, 1.0), 4),
+        )
+        for item in cited[:3]
+    ]
+
+
+def _build_briefing(
+    account_id: str,
+    role: str,
+    llm_output: dict,
+    trigger_type: str = "manual",
+    context: Optional[AssembledContext] = None,
+    query: str = "",
+) -> Briefing:
+    """Turn parsed LLM output into the role-specific Briefing model."""
+    text = llm_output.get("insight", "Account analysis generated via GROQ")
+    # Parse into structured Insight
+    insight = Insight(
+        id=insight_id(account_id, role, query, context.text if context else "", text),
+        text=text,
+        category="opportunity",
+        confidence=llm_output.get("confidence", 0.75),
+        citations=_citations(llm_output, context),
+        reasoning=llm_output.get("reasoning", "Analyzed based on available data sources"),
+        action =llm_output.get("Action", "Engage with tailored messaging")
+    )
+    logger.debug(f"Generated insight {insight.id}: {insight.text}")
+
+    # Build role-specific briefing
+    metadata = BriefingMetadata(
+        account_id=account_id,
+        account_name="Sample Account",
+        trigger_type=trigger_type,
+        generated_at=__import__('datetime').datetime.now().isoformat(),
+        role=role,
+        model=llm_output.get("model"),
+        fallback=bool(llm_output.get("fallback")),
+    )
+
+    briefing = Briefing(
+        metadata=metadata,
+        insights=[insight],
+        ice_breakers=["What's your take on sustainable manufacturing?", "How are you approaching digital transformation?"] if role == "sdr" else None,
+        financial_metrics={"roe": "12%", "fcf_growth": "+15%", "debt_to_equity": "0.45"} if role == "ae" else None,
+    )
+    return briefing
+
+
+def _reasoning_trace(insight: Insight, context: AssembledContext, model: Optional[str] = None) -> list:
+    """Human-readable steps that produced the insight, for drill-down."""
+    trace = []
+    for source, status in context.retrieval_status.items():
+        trace.append(f"Retrieved {source}: {status.get('status')} in {status.get('latency_ms')}ms")
+    dropped = context.dropped
+    trace.append(
+        f"Packed {len(context.items)} items into {context.tokens} context tokens "
+        f"(dropped {dropped.get('duplicate', 0)} near-duplicates, {dropped.get('budget', 0)} over budget)"
+    )
+    trace.append(f"Synthesized with {model or settings.groq_model}: confidence {insight.confidence}")
+    if insight.reasoning:
+        trace.append(f"Reasoning: {insight.reasoning}")
+    if insight.citations:
+        trace.append("Cited: " + "; ".join(c.title for c in insight.citations))
+    return trace
+
+
+async def _record_provenance(briefing: Briefing, query: str, context: AssembledContext) -> None:
+    """Persist what went into each insight so drill-down is a lookup rather than a recompute."""
+    for insight in briefing.insights:
+        graph_items = [item.data for item in context.items if item.source == "graph"]
+        record = {
+            "account_id": briefing.metadata.account_id,
+            "role": briefing.metadata.role,
+            "query": query,
+            "generated_at": briefing.metadata.generated_at,
+            "insight": insight,
+            "full_context": context.text,
+            "reasoning_trace": _reasoning_trace(insight, context, briefing.metadata.model),
+            "related_graph_paths": graph_items or context.graph_paths,
+        }
+        try:
+            with stage("provenance"):
+                await asyncio.to_thread(provenance_store.put, insight.id, record)
+        except Exception as e:
+            logger.warning(f"Could not persist provenance for {insight.id}: {e}")
+
+
+async def _synthesize_briefing(
+    account_id: str,
+    role: str,
+    query: str,
+    context: AssembledContext,
+    trigger_type: str = "manual",
+    priority: int = INTERACTIVE,
+    needed_by: Optional[float] = None,
+    latency_budget_ms: Optional[float] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Briefing:
+    """
+    Run LLM synthesis over the assembled context and build the role-specific
+    briefing. `priority`/`needed_by` place the LLM call in the admission queue;
+    role, trigger and `latency_budget_ms` pick the model. With `on_token` the
+    completion is streamed and each text delta passed to it as it arrives.
+    """
+    route = get_model_router().route(role, trigger_type, latency_budget_ms, priority)
     try:
-        logger.info(f"Generating briefing for account {account_id} (role={role})")
+        if on_token is None:
+            llm_output = await query_groq_for_synthesis(context.text, query, priority, needed_by, route)
+        else:
+            parts = []
+            async for delta in stream_groq_for_synthesis(context.text, query, priority, needed_by, route):
+                on_token(delta)
+                parts.append(delta)
+            llm_output = parse_synthesis_output("".join(parts), route.served_by)
+            llm_output["model"] = route.served_by
 
-        context_text = ""
-    
-        # Hybrid retrieval (use stub if retriever unavailable)
-        # if retriever:
-        #     placeholder_embedding = [0.1] * 768  # Replace with actual embedding
-        #     retrieval_results = retriever.hybrid_search(placeholder_embedding, account_id, query)
-        #     context_text = f"""
-        #                     Vector Results:
-        #                     {retrieval_results['vector_results']}
-
-        #                     Graph Context:
-        #                     {retrieval_results['graph_context']}
-
-        #                     SQL Metadata:
-        #                     {retrieval_results['sql_metadata']}
-        #                     """
-        # if context_text.strip() == "":
-        #     # Stub data for development
-        #     context_text = f"""
-        #                     Stub context for account {account_id}.
-        #                     Query: {query or "General account analysis"}
-
-        #                     This is placeholder data returned in development mode (no database connected).
-        #                     In production, this would contain:
-        #                     - Recent news articles
-        #                     - SEC filings
-        #                     - Social media sentiment
-        #                     - Historical CRM interactions
-        #                     """
-        
-        # context_text = f"""
-        #                     EXECUTIVE DOSSIER: {account_id}
-        #                     Primary Focus: {query or "Comprehensive Account Strategy"}
-                            
-        #                     CRITICAL BUSINESS SIGNALS:
-        #                     - Recent News: {account_id} is undergoing a 'Digital-First' transformation, focusing on AI-integrated workflows and cloud scalability.
-        #                     - Financial Performance: Latest quarterly filings show a 12% increase in R&D spend, specifically targeting operational efficiency and automation.
-        #                     - SEC Insights: Management's recent 10-K highlights "Geopolitical supply chain diversification" as a top 2026 priority.
-                            
-        #                     SOCIAL & MARKET SENTIMENT:
-        #                     - LinkedIn Trends: Massive hiring surge in {account_id}'s DevOps and Sustainable Infrastructure teams.
-        #                     - Industry Positioning: Moving from a hardware-centric model to a recurring 'as-a-service' revenue model.
-                            
-        #                     HISTORICAL CRM CONTEXT:
-        #                     - Previous Engagement: Evaluated our platform in 2024; project stalled due to budget cycles. 
-        #                     - Current Status: Contract for their legacy provider is up for renewal in 6 months.
-                            
-        #                     OBJECTIVE: Identify high-impact entry points for a {role.upper()} to start a conversation.
-        #                 """
-        context_text = f"""
-                        EXECUTIVE DOSSIER: {account_id}
-                        Primary Focus: Comprehensive Account Strategy
-
-                        CRITICAL BUSINESS SIGNALS:
-                        - Recent News: Recent news regarding {account_id}.
-                        - Financial Performance: Latest quarterly filings, for {account_id}.
-                        - SEC Insights: 2026 priorities from recent 10-K.
-                        SOCIAL & MARKET SENTIMENT:
-                        - LinkedIn Trends: Massive social news or develpopments regarding {account_id}.
-                        - Industry Positioning: Shifts in business model for {account_id}.
-                        COMPANY RIVAL:
-                        - Key Competitors: Main competitors for {account_id} in the market.
-                        HISTORICAL CRM CONTEXT:
-                        - Previous Engagement: What we know from prior sales cycles with {account_id}.
-                        - Current Status: What is their current vendor landscape.
-                        OBJECTIVE: Identify high-impact entry points for {role.upper()} to start a conversation with {account_id}.
-                        
-                        """
-    
+    except Exception as groq_err:
+        logger.error(f"GROQ Synthesis failed: {groq_err}")
+        llm_output = {"insight": "Fallback: Market signals strong", "confidence": 0.7, "fallback": True}
+
+    with stage("build"):
+        briefing = _build_briefing(account_id, role, llm_output, trigger_type, context, query)
+    await _record_provenance(briefing, query, context)
+    if llm_output.get("fallback"):
+        # Don't pin a degraded briefing in the cache past the GROQ outage
+        raise UncacheableResult(briefing)
+    return briefing
+
+
+def _query_text(account_id: str, query: str) -> str:
+    """What gets embedded for a query (an empty one asks for an account overview)."""
+    return query or f"{account_id} account overview"
+
+
+async def _embed_query(account_id: str, query: str) -> Optional[np.ndarray]:
+    """
+    The query's embedding, or None when the embedding backend is unavailable
+    (model not installed or not loaded yet): callers then skip vector search
+    and the semantic cache rather than failing the request.
+    """
+    try:
+        return await embedding_service.embed(_query_text(account_id, query))
+    except Exception as e:
+        logger.warning(f"Embedding unavailable, skipping vector search and semantic cache: {e}")
+        return None
+
+
+async def _reuse_answer(
+    account_id: str, role: str, query: str, context: AssembledContext, trigger_type: str = "manual"
+) -> Optional[Briefing]:
+    """
+    The briefing answering a semantically similar earlier query, if the
+    semantic cache has one for this account's current context. A sampled
+    fraction of reuses is audited in the background.
+    """
+    if semantic_cache is None:
+        return None
+    with stage("semantic_cache"):
+        embedding = await _embed_query(account_id, query)
+        if embedding is None:
+            return None
+        hit = semantic_cache.lookup(account_id, role, context.account_version, embedding)
+    if hit is None:
+        return None
+    logger.info(f"Reusing answer to {hit.query!r} for {query!r} ({account_id}, similarity {hit.similarity:.3f})")
+    if semantic_cache.should_audit():
+        task = asyncio.create_task(_audit_reuse(account_id, role, query, context, hit))
+        _semantic_audits.add(task)
+        task.add_done_callback(_semantic_audits.discard)
+    metadata = hit.value.metadata.model_copy(update={"trigger_type": trigger_type, "reused_from_query": hit.query})
+    return hit.value.model_copy(update={"metadata": metadata})
+
+
+async def _remember_answer(account_id: str, role: str, query: str, context: AssembledContext, briefing: Briefing) -> None:
+    if semantic_cache is None:
+        return
+    embedding = await _embed_query(account_id, query)
+    if embedding is not None:
+        semantic_cache.put(account_id, role, context.account_version, query, embedding, briefing)
+
+
+async def _audit_reuse(account_id: str, role: str, query: str, context: AssembledContext, hit: SemanticHit) -> None:
+    """
+    Answer the query afresh at pre-warm priority and compare it with the
+    reused answer (cosine similarity of the insight texts). On a false hit
+    the fresh answer replaces the reused one for this query.
+    """
+    agreement = None
+    fresh = None
+    try:
+        fresh = await _synthesize_briefing(account_id, role, query, context, priority=PREWARM)
+        vectors = await embedding_service.embed_many([hit.value.insights[0].text, fresh.insights[0].text])
+        agreement = cosine_similarity(vectors[0], vectors[1])
+    except UncacheableResult:
+        # LLM fell back; nothing to compare against
+        pass
+    except Exception as e:
+        logger.warning(f"Semantic cache audit for {account_id} failed: {e}")
+    if semantic_cache.record_audit(query, hit, agreement) == "false_hit":
+        await _remember_answer(account_id, role, query, context, fresh)
+        await briefing_cache.set(briefing_cache_key(account_id, role, query, context.text), fresh)
+
+
+async def _answer_briefing(
+    account_id: str,
+    role: str,
+    query: str,
+    context: AssembledContext,
+    trigger_type: str = "manual",
+    priority: int = INTERACTIVE,
+    needed_by: Optional[float] = None,
+    latency_budget_ms: Optional[float] = None,
+    reuse: bool = True,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Briefing:
+    """
+    The reused answer to a similar earlier query (unless `reuse` is False),
+    else a new synthesis, which is remembered for later similar queries.
+    """
+    if reuse:
+        briefing = await _reuse_answer(account_id, role, query, context, trigger_type)
+        if briefing is not None:
+            return briefing
+    briefing = await _synthesize_briefing(
+        account_id, role, query, context, trigger_type, priority, needed_by, latency_budget_ms, on_token
+    )
+    await _remember_answer(account_id, role, query, context, briefing)
+    return briefing
+
+
+async def _store_briefing(
+    account_id: str,
+    role: str,
+    query: str,
+    context: AssembledContext,
+    briefing: Briefing,
+    deltas: int = 0,
+    origin: Optional[str] = None,
+) -> None:
+    """
+    Keep a briefing as the latest for (account, role, query) at the watermark
+    its context reflects, with who generated it (`origin`, else the briefing
+    cache entry's). Skipped for fallback briefings (GROQ unavailable) and for
+    contexts with no known watermark.
+    """
+    if briefing_store is None or context.watermark is None or briefing.metadata.fallback:
+        return
+    origin = origin or briefing_cache.origin(briefing_cache_key(account_id, role, query, context.text)) or "request"
+    try:
+        await asyncio.to_thread(
+            briefing_store.put, account_id, role, query, context.watermark, briefing, deltas, origin
+        )
+    except Exception as e:
+        logger.warning(f"Could not store briefing for {account_id}: {e}")
+
+
+def _render_delta_context(
+    account_id: str, role: str, query: str, previous: Briefing, documents: List[dict], watermark: int
+) -> AssembledContext:
+    """The previous briefing's insight plus the documents that arrived since, as the LLM dossier."""
+    insight = previous.insights[0]
+    context_text = f"""
+                    DELTA UPDATE: {account_id}
+                    PREVIOUS BRIEFING ({previous.metadata.generated_at}):
+                    - Insight: {insight.text}
+                    - Reasoning: {insight.reasoning}
+                    - Action: {insight.action}
+                    OBJECTIVE: Update the previous briefing for {role.upper()} with what the new documents below change
+                    for {account_id}; keep what still holds.
+
+                    """
+    with stage("context_assembly"):
+        budget = settings.context_token_budget - settings.llm_max_tokens - count_tokens(build_synthesis_prompt("", query))
+        context = pack_context(
+            context_text,
+            {"delta_documents": documents},
+            query,
+            budget_tokens=budget,
+            count_tokens=count_tokens,
+            dedup_threshold=settings.context_dedup_threshold,
+        )
+        context.watermark = watermark
+        return context
+
+
+def _with_previous_citations(briefing: Briefing, previous: Briefing) -> Briefing:
+    """A delta briefing citing the new documents first, then what the previous one cited."""
+    insight = briefing.insights[0]
+    cited = {c.source_url for c in insight.citations}
+    citations = insight.citations + [c for c in previous.insights[0].citations if c.source_url not in cited]
+    metadata = briefing.metadata.model_copy(update={"delta_from": previous.metadata.generated_at})
+    return briefing.model_copy(update={
+        "metadata": metadata,
+        "insights": [insight.model_copy(update={"citations": citations})] + briefing.insights[1:],
+    })
+
+
+async def _watermark_briefing(
+    account_id: str,
+    role: str,
+    query: str,
+    trigger_type: str = "manual",
+    priority: int = INTERACTIVE,
+    needed_by: Optional[float] = None,
+    latency_budget_ms: Optional[float] = None,
+) -> Optional[Briefing]:
+    """
+    The stored briefing for (account, role, query) when no documents arrived
+    for the account since it was generated, without retrieval or an LLM call.
+    When some did, a delta synthesis over just those documents and the
+    previous insight, stored in its place. None when a full synthesis is
+    needed (see watermarks.OUTCOMES for why).
+    """
+    if briefing_store is None or not retriever:
+        return None
+    watermark = account_watermarks.get(account_id)
+    if watermark is None:
+        briefing_store.record("unknown")
+        return None
+    with stage("watermark_lookup"):
+        stored = await asyncio.to_thread(briefing_store.get, account_id, role, query)
+    if stored is None:
+        briefing_store.record("missing")
+        return None
+    if stored.watermark < watermark and stored.deltas >= settings.delta_max_chain:
+        briefing_store.record("chain_limit")
+        return None
+    documents = []
+    if stored.watermark < watermark:
         try:
-            llm_output = await query_groq_for_synthesis(context_text, query)
-        
-        except Exception as groq_err:
-            logger.error(f"GROQ Synthesis failed: {groq_err}")
-            llm_output = {"insight": "Fallback: Market signals strong", "confidence": 0.7}
-        
-        # Parse into structured Insight
-        insight = Insight(
-            id="insight_1",
-            text=llm_output.get("insight", "Account analysis generated via GROQ"),
-            category="opportunity",
-            confidence=llm_output.get("confidence", 0.75),
-            citations=[
-                Citation(
-                    source_url=src if src.startswith("http") else f"https://example.com/source-{i}",
-                    title=f"Source {i+1}",
-                    text_snippet="...",
-                    retrieval_method="vector",
-                    confidence=0.9
+            with stage("retrieval"):
+                documents = await asyncio.to_thread(
+                    retriever.documents_since,
+                    account_id,
+                    stored.watermark,
+                    settings.delta_max_documents + 1,
+                    settings.delta_document_chars,
                 )
-                for i, src in enumerate(llm_output.get("sources", ["NewsAPI", "SEC EDGAR"])[:3])
-            ],
-            reasoning=llm_output.get("reasoning", "Analyzed based on available data sources"),
-            action =llm_output.get("Action", "Engage with tailored messaging")
+        except Exception as e:
+            logger.warning(f"Could not read new documents for {account_id}: {e}")
+            briefing_store.record("error")
+            return None
+        if len(documents) > settings.delta_max_documents:
+            briefing_store.record("backlog")
+            return None
+        if not documents:
+            # Only near-duplicates arrived: the stored briefing still holds at the new watermark
+            await asyncio.to_thread(
+                briefing_store.put, account_id, role, query, watermark, stored.briefing, stored.deltas, stored.origin
+            )
+    previous = stored.briefing
+    if not documents:
+        briefing_store.record("unchanged", stored.origin)
+        return previous.model_copy(
+            update={"metadata": previous.metadata.model_copy(update={"trigger_type": trigger_type})}
         )
-        print("Generated Insight:", insight)
-        
-        # Build role-specific briefing
-        metadata = BriefingMetadata(
-            account_id=account_id,
-            account_name="Sample Account",
-            trigger_type="manual",
-            generated_at=__import__('datetime').datetime.now().isoformat(),
-            role=role,
+
+    briefing_store.record("delta")
+    newest = max([watermark] + [doc.pop("ingest_seq") or 0 for doc in documents])
+    context = _render_delta_context(account_id, role, query, previous, documents, newest)
+    logger.info(
+        f"Delta briefing for {account_id}: {len(documents)} new documents since {previous.metadata.generated_at}"
+    )
+
+    async def synthesize() -> Briefing:
+        briefing = await _synthesize_briefing(
+            account_id, role, query, context, trigger_type, priority, needed_by, latency_budget_ms
         )
-        
-        briefing = Briefing(
-            metadata=metadata,
-            insights=[insight],
-            ice_breakers=["What's your take on sustainable manufacturing?", "How are you approaching digital transformation?"] if role == "sdr" else None,
-            financial_metrics={"roe": "12%", "fcf_growth": "+15%", "debt_to_equity": "0.45"} if role == "ae" else None,
+        return _with_previous_citations(briefing, previous)
+
+    key = briefing_cache_key(account_id, role, query, context.text)
+    briefing = await briefing_cache.get_or_compute(key, synthesize)
+    if briefing.metadata.fallback:
+        # Synthesis fell back; the previous briefing is better than a placeholder
+        return previous
+    await _store_briefing(account_id, role, query, context, briefing, stored.deltas + 1)
+    return briefing
+
+
+async def _retrieve(account_id: str, query: str, account_results: Optional[dict] = None) -> Optional[dict]:
+    """
+    Hybrid retrieval: backends run concurrently under per-source deadlines;
+    a slow or unavailable one just contributes nothing to the context.
+    With `account_results` (graph + SQL already fetched for the account) only
+    the query-specific vector and keyword searches run. The results carry the
+    account's document watermark from before the searches started.
+    """
+    if not retriever:
+        return None
+    # Read before searching: documents up to it are already in every store
+    watermark = account_watermarks.get(account_id)
+    with stage("embedding"):
+        query_embedding = await _embed_query(account_id, query)
+    if account_results is None:
+        with stage("retrieval"):
+            retrieval_results = await retriever.hybrid_search(query_embedding, account_id, query)
+        retrieval_results["watermark"] = watermark
+    else:
+        with stage("retrieval"):
+            found = await retriever.hybrid_search(query_embedding, account_id, query, sources=("vector", "lexical"))
+        retrieval_results = {
+            **account_results,
+            "vector_results": found["vector_results"],
+            "lexical_results": found["lexical_results"],
+            "status": {
+                **account_results["status"], "vector": found["status"]["vector"], "lexical": found["status"]["lexical"],
+            },
+        }
+        retrieval_results["fused_results"] = retriever.fuse(retrieval_results)
+    logger.info(f"Hybrid retrieval status: {retrieval_results['status']}")
+    return retrieval_results
+
+
+async def _assemble_context(account_id: str, role: str, query: str) -> AssembledContext:
+    """Retrieve account context and render it as the LLM dossier."""
+    return _render_context(account_id, role, query, await _retrieve(account_id, query))
+
+
+def _render_context(account_id: str, role: str, query: str, retrieval_results: Optional[dict]) -> AssembledContext:
+    """
+    The dossier plus the most relevant retrieved items that fit the prompt
+    token budget (CONTEXT_TOKEN_BUDGET minus the answer's LLM_MAX_TOKENS and
+    the prompt template).
+    """
+    
+    # context_text = f"""
+    #                     EXECUTIVE DOSSIER: {account_id}
+    #                     Primary Focus: {query or "Comprehensive Account Strategy"}
+                        
+    #                     CRITICAL BUSINESS SIGNALS:
+    #                     - Recent News: {account_id} is undergoing a 'Digital-First' transformation, focusing on AI-integrated workflows and cloud scalability.
+    #                     - Financial Performance: Latest quarterly filings show a 12% increase in R&D spend, specifically targeting operational efficiency and automation.
+    #                     - SEC Insights: Management's recent 10-K highlights "Geopolitical supply chain diversification" as a top 2026 priority.
+                        
+    #                     SOCIAL & MARKET SENTIMENT:
+    #                     - LinkedIn Trends: Massive hiring surge in {account_id}'s DevOps and Sustainable Infrastructure teams.
+    #                     - Industry Positioning: Moving from a hardware-centric model to a recurring 'as-a-service' revenue model.
+                        
+    #                     HISTORICAL CRM CONTEXT:
+    #                     - Previous Engagement: Evaluated our platform in 2024; project stalled due to budget cycles. 
+    #                     - Current Status: Contract for their legacy provider is up for renewal in 6 months.
+                        
+    #                     OBJECTIVE: Identify high-impact entry points for a {role.upper()} to start a conversation.
+    #                 """
+    context_text = f"""
+                    EXECUTIVE DOSSIER: {account_id}
+                    Primary Focus: Comprehensive Account Strategy
+
+                    CRITICAL BUSINESS SIGNALS:
+                    - Recent News: Recent news regarding {account_id}.
+                    - Financial Performance: Latest quarterly filings, for {account_id}.
+                    - SEC Insights: 2026 priorities from recent 10-K.
+                    SOCIAL & MARKET SENTIMENT:
+                    - LinkedIn Trends: Massive social news or develpopments regarding {account_id}.
+                    - Industry Positioning: Shifts in business model for {account_id}.
+                    COMPANY RIVAL:
+                    - Key Competitors: Main competitors for {account_id} in the market.
+                    HISTORICAL CRM CONTEXT:
+                    - Previous Engagement: What we know from prior sales cycles with {account_id}.
+                    - Current Status: What is their current vendor landscape.
+                    OBJECTIVE: Identify high-impact entry points for {role.upper()} to start a conversation with {account_id}.
+                    
+                    """
+    with stage("context_assembly"):
+        budget = settings.context_token_budget - settings.llm_max_tokens - count_tokens(build_synthesis_prompt("", query))
+        context = pack_context(
+            context_text,
+            retrieval_results,
+            query,
+            budget_tokens=budget,
+            count_tokens=count_tokens,
+            dedup_threshold=settings.context_dedup_threshold,
+        )
+        context.account_version = account_context_version(retrieval_results)
+        status = (retrieval_results or {}).get("status") or {}
+        if all(s.get("status") in (SOURCE_OK, SOURCE_SKIPPED) for s in status.values()):
+            context.watermark = (retrieval_results or {}).get("watermark")
+        return context
+
+
+async def _prewarm_meeting(meeting: UpcomingMeeting) -> None:
+    """Generate a calendar-triggered briefing and cache it until after the meeting starts."""
+    context = await _assemble_context(meeting.account_id, meeting.role, meeting.query)
+    key = briefing_cache_key(meeting.account_id, meeting.role, meeting.query, context.text)
+    start_time = meeting.start_time if meeting.start_time.tzinfo else meeting.start_time.replace(tzinfo=timezone.utc)
+    starts_in = (start_time - datetime.now(timezone.utc)).total_seconds()
+    ttl = starts_in + settings.briefing_cache_ttl_seconds
+    # Background work, unless the meeting is about to start
+    priority = INTERACTIVE if starts_in <= settings.llm_admission_imminent_minutes * 60 else PREWARM
+    briefing = await briefing_cache.get_or_compute(
+        key,
+        lambda: _answer_briefing(
+            meeting.account_id, meeting.role, meeting.query, context, "calendar", priority, time.monotonic() + starts_in
+        ),
+        ttl=ttl,
+        origin="prewarm",
+    )
+    if briefing.metadata.fallback:
+        # LLM fell back, so nothing was cached; leave the meeting for the next cycle
+        raise RuntimeError("synthesis fell back, briefing not cached")
+    await _store_briefing(meeting.account_id, meeting.role, meeting.query, context, briefing, origin="prewarm")
+    logger.info(f"Pre-warmed briefing for meeting {meeting.meeting_id} ({meeting.account_id})")
+
+
+meeting_queue = QueueMeetingSource()
+prewarm_scheduler = PrewarmScheduler(
+    [meeting_queue] + ([FileMeetingSource(settings.prewarm_meetings_path)] if settings.prewarm_meetings_path else []),
+    _prewarm_meeting,
+    lead_time=timedelta(minutes=settings.prewarm_lead_time_minutes),
+    poll_interval_seconds=settings.prewarm_poll_interval_seconds,
+    max_per_minute=settings.prewarm_max_per_minute,
+    is_busy=lambda: _interactive_inflight >= settings.prewarm_max_interactive_inflight,
+)
+
+
+@router.post("/api/prewarm/meetings")
+async def schedule_meetings(meetings: List[UpcomingMeeting]):
+    """Queue upcoming meetings for pre-warming (stand-in for a calendar feed)."""
+    for meeting in meetings:
+        meeting_queue.push(meeting)
+    return FastJSONResponse({"queued": len(meetings)})
+
+
+@router.get("/api/prewarm/stats")
+async def prewarm_stats():
+    """
+    Scheduler counters plus how many served briefings were pre-warmed versus
+    generated cold. Served from the briefing cache or, unchanged, from the
+    watermarked briefing store.
+    """
+    cache = briefing_cache.stats()
+    stored = briefing_store.unchanged_by_origin if briefing_store else {}
+    return FastJSONResponse({
+        "enabled": settings.prewarm_enabled,
+        "scheduler": prewarm_scheduler.stats(),
+        "served": {
+            "prewarmed": cache["prewarmed_hits"] + stored.get("prewarm", 0),
+            "cached": cache["hits"] - cache["prewarmed_hits"] + stored.get("request", 0),
+            "cold": cache["misses"],
+        },
+    })
+
+
+async def _get_briefing(
+    account_id: str,
+    role: str,
+    query: str,
+    refresh: bool = False,
+    latency_budget_ms: Optional[float] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Briefing:
+    """
+    The stored briefing if the account is unchanged since it, else the cached
+    or reused one, else a new synthesis shared by every identical request
+    running meanwhile. `on_token` receives the synthesis' text deltas when
+    this call is the one that runs it.
+    """
+    briefing = None if refresh else await _watermark_briefing(
+        account_id, role, query, latency_budget_ms=latency_budget_ms
+    )
+    if briefing is None:
+        context = await _assemble_context(account_id, role, query)
+        key = briefing_cache_key(account_id, role, query, context.text)
+        briefing = await briefing_cache.get_or_compute(
+            key,
+            lambda: _answer_briefing(
+                account_id,
+                role,
+                query,
+                context,
+                latency_budget_ms=latency_budget_ms,
+                reuse=not refresh,
+                on_token=on_token,
+            ),
+            bypass=refresh,
         )
+        await _store_briefing(account_id, role, query, context, briefing)
+    return briefing
+
+
+@router.post("/api/briefing/{account_id}")
+async def generate_briefing(
+    account_id: str, role: str = "ae", query: str = "", refresh: bool = False, latency_budget_ms: Optional[float] = None
+):
+    """
+    Generate (or serve a cached) briefing. Pass `refresh=true` to bypass the cache
+    and the stored briefing, `latency_budget_ms` to steer synthesis to a model that
+    usually answers within it.
+    """
+
+    try:
+        logger.info(f"Generating briefing for account {account_id} (role={role})")
+        briefing = await _get_briefing(account_id, role, query, refresh, latency_budget_ms)
         
-        return JSONResponse(briefing.model_dump())
+        with stage("serialization"):
+            return FastJSONResponse(briefing)
     
     except Exception as e:
         logger.error(f"Error generating briefing: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/briefing/{account_id}/drill-down")
-async def drill_down(account_id: str, request: DrillDownRequest):
+async def _stream_briefing_events(
+    account_id: str, role: str, query: str, refresh: bool, latency_budget_ms: Optional[float] = None
+) -> AsyncIterator[bytes]:
     """
-    Expand an insight with full reasoning and sources.
+    SSE event sequence for one briefing:
+      token*     raw LLM text deltas, forwarded as they arrive
+      field*     each top-level insight field (insight, reasoning, Action, ...) once complete
+      briefing   the full Briefing model
+      done       timings: first_token_ms (LLM time-to-first-byte) vs total_ms
     """
+    start = time.perf_counter()
+    first_token_ms = None
+    tokens: asyncio.Queue = asyncio.Queue()
+    # Synthesis goes through the briefing cache like generate_briefing's, so a
+    # concurrent identical request shares it; only the caller running it streams tokens.
+    task = asyncio.create_task(
+        _get_briefing(account_id, role, query, refresh, latency_budget_ms, on_token=tokens.put_nowait)
+    )
+    task.add_done_callback(lambda _: tokens.put_nowait(None))
     try:
-        # Fetch full context for the insight (from DB/cache)
-        # Return reasoning trace and related graph paths
-        response = DrillDownResponse(
-            insight=Insight(
-                id=request.insight_id,
-                text="Sample insight",
-                category="opportunity",
-                confidence=0.85,
-                citations=[],
-                reasoning="Based on recent news about market expansion..."
-            ),
-            full_context="Expanded context here...",
-            reasoning_trace=["Step 1: Retrieved news", "Step 2: Analyzed sentiment", "Step 3: Scored with GROQ"],
-            related_graph_paths=[{"from": "Acme", "to": "TechCorp", "relation": "competitive_threat"}],
+        parser = IncrementalJSONFieldParser()
+        while True:
+            delta = await tokens.get()
+            if delta is None:
+                break
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - start) * 1000, 2)
+            yield sse_event("token", {"delta": delta})
+            for name, value in parser.feed(delta):
+                yield sse_event("field", {"name": name, "value": value})
+        briefing = await task
+        cached = first_token_ms is None and not briefing.metadata.fallback
+        if briefing.metadata.fallback:
+            yield sse_event("error", {"detail": "GROQ unavailable, using fallback insight"})
+        elif cached:
+            insight = briefing.insights[0]
+            for name, value in (("insight", insight.text), ("confidence", insight.confidence),
+                                ("reasoning", insight.reasoning), ("Action", insight.action)):
+                yield sse_event("field", {"name": name, "value": value})
+
+        yield sse_event("briefing", briefing)
+        total_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(
+            f"Streamed briefing for {account_id}: first_token_ms={first_token_ms} total_ms={total_ms} cached={cached}"
         )
-        return JSONResponse(response.model_dump())
+        yield sse_event("done", {"first_token_ms": first_token_ms, "total_ms": total_ms, "cached": cached})
     except Exception as e:
-        logger.error(f"Error in drill-down: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"Error streaming briefing: {e}", exc_info=True)
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        # Client went away: stop waiting (the shared synthesis carries on for the others)
+        task.cancel()
+
+
+@router.api_route("/api/briefing/{account_id}/stream", methods=["GET", "POST"])
+async def stream_briefing(
+    account_id: str, role: str = "ae", query: str = "", refresh: bool = False, latency_budget_ms: Optional[float] = None
+):
+    """
+    Server-sent-events variant of generate_briefing: insight fields arrive as the LLM writes them.
+    """
+    return StreamingResponse(
+        _stream_briefing_events(account_id, role, query, refresh, latency_budget_ms),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-@app.get("/api/graph/{account_id}")
-async def get_graph(account_id: str):
+async def _batch_briefing_lines(request: BatchBriefingRequest) -> AsyncIterator[bytes]:
+    """
+    NDJSON lines, one per item in completion order, then a summary line.
+
+    At most `max_concurrency` items run at once. Graph and SQL retrieval run
+    once per account and are shared by every item for that account; identical
+    (account, role, query) items also share one synthesis through the cache.
+    Accounts with no new documents since their stored briefing skip both.
+    """
+    start = time.perf_counter()
+    concurrency = max(1, min(request.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    account_tasks: dict = {}
+    retrieval_tasks: dict = {}
+
+    async def account_results(account_id: str) -> Optional[dict]:
+        if not retriever:
+            return None
+        if account_id not in account_tasks:
+            account_tasks[account_id] = asyncio.create_task(account_search(account_id))
+        return await account_tasks[account_id]
+
+    async def account_search(account_id: str) -> dict:
+        watermark = account_watermarks.get(account_id)
+        return {**await retriever.hybrid_search(None, account_id, "", sources=("graph", "sql")), "watermark": watermark}
+
+    async def retrieve(account_id: str, query: str) -> Optional[dict]:
+        return await _retrieve(account_id, query, await account_results(account_id))
+
+    async def retrieve_once(account_id: str, query: str) -> Optional[dict]:
+        if (account_id, query) not in retrieval_tasks:
+            retrieval_tasks[(account_id, query)] = asyncio.create_task(retrieve(account_id, query))
+        return await retrieval_tasks[(account_id, query)]
+
+    async def run(index: int, item: BatchBriefingItem) -> dict:
+        result = {"index": index, "account_id": item.account_id, "role": item.role, "query": item.query}
+        async with semaphore:
+            try:
+                briefing = None if request.refresh else await _watermark_briefing(
+                    item.account_id, item.role, item.query, priority=BATCH
+                )
+                if briefing is None:
+                    context = _render_context(
+                        item.account_id, item.role, item.query, await retrieve_once(item.account_id, item.query)
+                    )
+                    key = briefing_cache_key(item.account_id, item.role, item.query, context.text)
+                    briefing = await briefing_cache.get_or_compute(
+                        key,
+                        lambda: _answer_briefing(
+                            item.account_id, item.role, item.query, context, priority=BATCH, reuse=not request.refresh
+                        ),
+                        bypass=request.refresh,
+                    )
+                    await _store_briefing(item.account_id, item.role, item.query, context, briefing)
+                result.update(status="ok", briefing=briefing)
+            except Exception as e:
+                logger.error(f"Batch item {index} ({item.account_id}) failed: {e}", exc_info=True)
+                result.update(status="error", error=str(e))
+        return result
+
+    ok = 0
+    for next_done in asyncio.as_completed([run(i, item) for i, item in enumerate(request.items)]):
+        result = await next_done
+        ok += result["status"] == "ok"
+        yield dump_json(result) + b"\n"
+    yield dump_json({"summary": {
+        "total": len(request.items),
+        "ok": ok,
+        "errors": len(request.items) - ok,
+        "accounts": len({item.account_id for item in request.items}),
+        "total_ms": round((time.perf_counter() - start) * 1000, 2),
+    }}) + b"\n"
+
+
+@router.post("/api/briefings/batch")
+async def batch_briefings(request: BatchBriefingRequest):
+    """
+    Generate briefings for a list of (account_id, role, query) items, e.g. a rep's whole calendar.
+    Results stream back as NDJSON as each briefing finishes; a failed item reports its own error.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(status_code=400, detail=f"at most {settings.batch_max_items} items per batch")
+    return StreamingResponse(_batch_briefing_lines(request), media_type="application/x-ndjson")
+
+
+@router.post("/api/briefing/{account_id}/drill-down")
+async def drill_down(account_id: str, request: DrillDownRequest):
+    """
+    Expand an insight with its full context, reasoning trace and graph paths,
+    as recorded when the insight was generated.
+    """
+    record = provenance_store.get(request.insight_id)
+    if record is None or record["account_id"] != account_id:
+        raise HTTPException(status_code=404, detail=f"No provenance for insight {request.insight_id}")
+    response = DrillDownResponse(
+        insight=Insight(**record["insight"]),
+        full_context=record["full_context"],
+        reasoning_trace=record["reasoning_trace"],
+        related_graph_paths=record["related_graph_paths"],
+    )
+    return FastJSONResponse(response)
+
+
+async def _account_graph(account_id: str, depth: int) -> list:
+    """Account subgraph: answered inline from the cache, off the event loop on a miss."""
+    edges = retriever.graph_cache.lookup(account_id, depth)
+    if edges is None:
+        edges = await asyncio.to_thread(retriever.graph_search, account_id, depth)
+    return edges
+
+
+@router.get("/api/graph/{account_id}")
+async def get_graph(account_id: str, depth: int = Query(2, ge=1, le=MAX_GRAPH_DEPTH)):
     """
     Retrieve relationship map for account.
     """
     try:
-        if retriever:
-            graph_context = retriever.graph_search(account_id, depth=2)
+        if retriever and settings.neo4j_enabled:
+            graph_context = await _account_graph(account_id, depth)
         else:
-            # Stub data
+            # Stub data for the UI; never part of a briefing's context
             graph_context = [
                 {"from": "Acme Corp", "to": "TechVendor X", "relation": "uses"},
                 {"from": "Acme Corp", "to": "John Smith", "relation": "ceo"},
             ]
-        return JSONResponse({"account_id": account_id, "graph": graph_context})
+        return FastJSONResponse({"account_id": account_id, "graph": graph_context})
     except Exception as e:
         logger.error(f"Error fetching graph: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-if __name__ == "__main__":
+@router.post("/api/graph/{account_id}/invalidate")
+async def invalidate_graph(account_id: str):
+    """Drop the cached subgraph for an account (e.g. after a manual graph edit)."""
+    if not retriever:
+        raise HTTPException(status_code=503, detail="retriever unavailable")
+    return FastJSONResponse({"account_id": account_id, "invalidated": retriever.graph_cache.invalidate(account_id)})
+
+
+def create_app() -> FastAPI:
+    """
+    Build the ASGI app around this process's services. Every entry point
+    (`uvicorn src.main:app`, `python -m src.main`, orchestration.py) serves an
+    app from here; multi-worker mode calls it once per worker process.
+    """
+    app = FastAPI(title="SalesAI Orchestration", default_response_class=FastJSONResponse)
+
+    # Add CORS middleware to allow frontend requests
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.middleware("http")(observe_requests)
+    app.middleware("http")(track_interactive_requests)
+    app.include_router(router)
+
+    @app.on_event("startup")
+    async def on_startup():
+        await startup(app)
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await shutdown(app)
+
+    return app
+
+
+app = create_app()
+
+
+def serve() -> None:
+    """
+    Run the service with `settings.workers` processes. Workers share the
+    briefing cache through BRIEFING_CACHE_SHARED_PATH, and their Prometheus
+    metrics through a multiprocess directory created here.
+    """
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=settings.port)
+
+    if settings.workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Must be set before the workers import prometheus_client
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="salesai-metrics-")
+    uvicorn.run(
+        "src.main:create_app",
+        factory=True,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+    )
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,222 @@
+"""
+Prometheus metrics, per-request stage timings and opt-in request profiling.
+"""
+import contextvars
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Sub-millisecond cache hits up to multi-second LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "salesai_http_request_seconds", "HTTP request latency by route", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "salesai_stage_seconds", "Briefing pipeline stage latency", ["stage"], buckets=LATENCY_BUCKETS,
+)
+BACKEND_SECONDS = Histogram(
+    "salesai_retrieval_backend_seconds", "Retrieval backend latency", ["backend", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "salesai_llm_request_seconds", "LLM call latency", ["model", "mode", "outcome"], buckets=LATENCY_BUCKETS,
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "salesai_llm_first_token_seconds", "Time to first streamed LLM token", ["model"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter("salesai_llm_tokens", "LLM tokens used", ["model", "kind"])
+LLM_PARSE = Counter(
+    "salesai_llm_parse", "How LLM output was parsed: json, extracted (JSON inside prose) or raw (gave up)",
+    ["model", "outcome"],
+)
+LLM_HEDGES = Counter("salesai_llm_hedges", "Hedged LLM calls by which model answered first", ["winner"])
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "salesai_llm_admission_queue_depth", "LLM calls waiting for admission", ["priority"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "salesai_llm_admission_wait_seconds", "Time LLM calls waited for admission", ["priority", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_RETRIES = Counter("salesai_llm_retries", "LLM calls retried after backoff", ["reason"])
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "salesai_semantic_cache_lookups", "Semantic answer cache lookups: hit, or the reason for a miss", ["outcome"],
+)
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    "salesai_semantic_cache_similarity", "Cosine similarity of the nearest cached query",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1.0),
+)
+SEMANTIC_CACHE_AUDITS = Counter(
+    "salesai_semantic_cache_audits", "Audited semantic cache hits: agree, false_hit or error", ["verdict"],
+)
+WATERMARK_BRIEFINGS = Counter(
+    "salesai_watermark_briefings",
+    "Briefings on the watermark path: unchanged, delta, or the reason for a full synthesis", ["outcome"],
+)
+
+# Stage timings of the current request, for the Server-Timing header
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace() -> List[Tuple[str, float]]:
+    trace: List[Tuple[str, float]] = []
+    _trace.set(trace)
+    return trace
+
+
+def server_timing(trace: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in trace)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram and the request's trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+def observe_backend(backend: str, status: str, seconds: float) -> None:
+    BACKEND_SECONDS.labels(backend, status).observe(seconds)
+
+
+def record_llm_usage(model: str, usage) -> None:
+    """Count prompt/completion tokens from an OpenAI-style usage object (absent on some responses)."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if prompt:
+        LLM_TOKENS.labels(model, "prompt").inc(prompt)
+    if completion:
+        LLM_TOKENS.labels(model, "completion").inc(completion)
+
+
+class CacheCollector:
+    """Exports hit/miss/size of registered caches, read from their stats() at scrape time."""
+
+    def __init__(self):
+        self._caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def register(self, name: str, stats: Callable[[], Dict[str, float]]) -> None:
+        """`stats` returns `hits`, `misses` and `entries`."""
+        self._caches[name] = stats
+
+    def collect(self):
+        hits = CounterMetricFamily("salesai_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("salesai_cache_misses", "Cache misses", labels=["cache"])
+        entries = GaugeMetricFamily("salesai_cache_entries", "Entries held in the cache", labels=["cache"])
+        for name, stats in self._caches.items():
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"Cache stats for {name} failed: {e}")
+                continue
+            hits.add_metric([name], values.get("hits", 0))
+            misses.add_metric([name], values.get("misses", 0))
+            entries.add_metric([name], values.get("entries", 0))
+        yield hits
+        yield misses
+        yield entries
+
+
+cache_collector = CacheCollector()
+REGISTRY.register(cache_collector)
+
+
+def render_metrics() -> bytes:
+    """
+    Text exposition for /metrics. With several workers (PROMETHEUS_MULTIPROC_DIR
+    set before they start) counters and histograms are summed across all of
+    them; cache stats are those of the worker answering the scrape.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(cache_collector)
+    return generate_latest(registry)
+
+
+class RequestProfiler:
+    """
+    Profiles a request when it sends the opt-in header, or for a random
+    `sample_rate` fraction of requests, at most `max_per_minute` times.
+    Uses pyinstrument (sampling, async-aware, HTML report) when installed,
+    else cProfile (a .prof file for snakeviz/pstats; it also sees other
+    requests running on the event loop meanwhile).
+    """
+
+    def __init__(self, enabled: bool, output_dir: str, sample_rate: float = 0.0, max_per_minute: int = 6):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.max_per_minute = max_per_minute
+        self._window_start = 0.0
+        self._window_count = 0
+        # One profiler at a time: Python allows a single active profiling hook
+        self._active = False
+
+    def should_profile(self, requested: bool) -> bool:
+        if not self.enabled or self._active or not (requested or random.random() < self.sample_rate):
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 60.0:
+            self._window_start, self._window_count = now, 0
+        if self._window_count >= self.max_per_minute:
+            return False
+        self._window_count += 1
+        return True
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[Dict[str, str]]:
+        """Profile the block; the yielded dict gets the dump's `path` afterwards."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{os.getpid()}")
+        result: Dict[str, str] = {}
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        self._active = True
+        try:
+            if Profiler is not None:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    yield result
+                finally:
+                    profiler.stop()
+                    result["path"] = f"{base}.html"
+                    with open(result["path"], "w", encoding="utf-8") as f:
+                        f.write(profiler.output_html())
+            else:
+                import cProfile
+
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield result
+                finally:
+                    profiler.disable()
+                    result["path"] = f"{base}.prof"
+                    profiler.dump_stats(result["path"])
+            logger.info(f"Request profile written to {result['path']}")
+        finally:
+            self._active = False
@@ -1,6 +1,7 @@
 """
 Data models for briefings, citations, and insights.
 """
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 
@@ -29,6 +30,10 @@ class BriefingMetadata(BaseModel):
     trigger_type: str  # "calendar", "intent_spike", "manual"
     generated_at: str
     role: str  # "sdr" or "ae"
+    model: Optional[str] = None  # LLM that wrote the insights
+    reused_from_query: Optional[str] = None  # similar earlier query whose answer was reused
+    delta_from: Optional[str] = None  # generated_at of the briefing this one updated with new documents
+    fallback: bool = False  # placeholder written because GROQ was unavailable; never cached or stored
 
 
 class Briefing(BaseModel):
@@ -52,3 +57,23 @@ class DrillDownResponse(BaseModel):
     full_context: str
     reasoning_trace: List[str]
     related_graph_paths: List[dict]
+
+
+class BatchBriefingItem(BaseModel):
+    account_id: str
+    role: str = "ae"
+    query: str = ""
+
+
+class BatchBriefingRequest(BaseModel):
+    items: List[BatchBriefingItem]
+    max_concurrency: Optional[int] = None
+    refresh: bool = False
+
+
+class UpcomingMeeting(BaseModel):
+    meeting_id: str
+    account_id: str
+    start_time: datetime
+    role: str = "ae"
+    query: str = ""
@@ -0,0 +1,169 @@
+"""
+Calendar pre-warming: generate and cache briefings ahead of upcoming meetings.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.models import UpcomingMeeting
+
+logger = logging.getLogger(__name__)
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class MeetingSource:
+    """Pluggable source of upcoming meetings (calendar sync, queue, file...)."""
+
+    async def upcoming(self, until: datetime) -> List[UpcomingMeeting]:
+        raise NotImplementedError
+
+
+class FileMeetingSource(MeetingSource):
+    """JSON file holding a list of meetings; re-read whenever it changes on disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._meetings: List[UpcomingMeeting] = []
+
+    async def upcoming(self, until: datetime) -> List[UpcomingMeeting]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return []
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as f:
+                self._meetings = [UpcomingMeeting(**m) for m in json.load(f)]
+            self._mtime = mtime
+        return [m for m in self._meetings if _utc(m.start_time) <= until]
+
+
+class QueueMeetingSource(MeetingSource):
+    """In-memory stand-in for a calendar event queue; meetings are pushed via the API."""
+
+    def __init__(self):
+        self._meetings: Dict[str, UpcomingMeeting] = {}
+
+    def push(self, meeting: UpcomingMeeting) -> None:
+        self._meetings[meeting.meeting_id] = meeting
+
+    async def upcoming(self, until: datetime) -> List[UpcomingMeeting]:
+        now = datetime.now(timezone.utc)
+        for meeting_id in [k for k, m in self._meetings.items() if _utc(m.start_time) < now]:
+            del self._meetings[meeting_id]
+        return [m for m in self._meetings.values() if _utc(m.start_time) <= until]
+
+
+class PrewarmScheduler:
+    """
+    Background task that warms briefings `lead_time` before each meeting.
+
+    Warming is paced to at most `max_per_minute` generations and backs off
+    while `is_busy()` reports interactive traffic, so it only uses spare
+    capacity. Each meeting is warmed once.
+    """
+
+    def __init__(
+        self,
+        sources: List[MeetingSource],
+        warm: Callable[[UpcomingMeeting], Awaitable[None]],
+        lead_time: timedelta,
+        poll_interval_seconds: float = 30.0,
+        max_per_minute: int = 6,
+        is_busy: Callable[[], bool] = lambda: False,
+    ):
+        self.sources = sources
+        self.warm = warm
+        self.lead_time = lead_time
+        self.poll_interval_seconds = poll_interval_seconds
+        self.min_interval = 60.0 / max(max_per_minute, 1)
+        self.is_busy = is_busy
+        self._warmed: Dict[str, datetime] = {}
+        self._last_run = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.warmed = 0
+        self.failed = 0
+        self.deferred = 0
+        # Meetings inside the lead-time window still to warm, as of the current cycle
+        self.pending = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Pre-warm scheduler started (lead_time={self.lead_time})")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Pre-warm cycle failed: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval_seconds)
+
+    async def due_meetings(self) -> List[UpcomingMeeting]:
+        now = datetime.now(timezone.utc)
+        due: Dict[str, UpcomingMeeting] = {}
+        for source in self.sources:
+            for meeting in await source.upcoming(now + self.lead_time):
+                if _utc(meeting.start_time) > now and meeting.meeting_id not in self._warmed:
+                    due[meeting.meeting_id] = meeting
+        # Soonest meeting first
+        return sorted(due.values(), key=lambda m: _utc(m.start_time))
+
+    async def run_once(self) -> int:
+        """Warm every meeting that is now inside the lead-time window. Returns the number warmed."""
+        warmed = 0
+        due = await self.due_meetings()
+        self.pending = len(due)
+        for meeting in due:
+            while self.is_busy():
+                self.deferred += 1
+                await asyncio.sleep(1.0)
+            wait = self._last_run + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_run = time.monotonic()
+            try:
+                await self.warm(meeting)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Pre-warm failed for meeting {meeting.meeting_id} ({meeting.account_id}): {e}")
+                continue
+            self._warmed[meeting.meeting_id] = _utc(meeting.start_time)
+            self.warmed += 1
+            self.pending -= 1
+            warmed += 1
+        self._forget_past()
+        return warmed
+
+    def _forget_past(self) -> None:
+        now = datetime.now(timezone.utc)
+        for meeting_id in [k for k, start in self._warmed.items() if start < now]:
+            del self._warmed[meeting_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "deferred_for_interactive": self.deferred,
+            "pending_meetings": self.pending,
+            "warmed_upcoming_meetings": len(self._warmed),
+        }
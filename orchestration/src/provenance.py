@@ -0,0 +1,73 @@
+"""
+Insight provenance: the context, reasoning trace and graph paths behind each generated insight.
+"""
+import hashlib
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional
+
+from src.config import settings
+from src.kvstore import SqliteKVStore
+from src.responses import dump_json
+
+logger = logging.getLogger(__name__)
+
+
+def insight_id(account_id: str, role: str, query: str, context_text: str, text: str, index: int = 0) -> str:
+    """
+    Stable id for an insight: the same account, role, query, context and
+    insight text always hash to the same id, so a cached briefing keeps
+    pointing at its provenance record.
+    """
+    digest = hashlib.sha256(
+        "\x1f".join([account_id, role, query.strip().lower(), context_text, text, str(index)]).encode("utf-8")
+    ).hexdigest()
+    return f"ins_{digest[:20]}"
+
+
+class ProvenanceStore:
+    """
+    Insight id -> provenance record, zlib-compressed JSON in an embedded
+    SQLite store with TTL and size-based eviction (oldest records first).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600.0, max_bytes: int = 256 * 1024 * 1024):
+        self._store = SqliteKVStore(path, table="insight_provenance", ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+        self.writes = 0
+        self.reads = 0
+        self.misses = 0
+
+    def put(self, insight_id: str, record: Dict[str, Any]) -> None:
+        # Values may be pydantic models; they serialize in the same pass
+        self._store.put(insight_id, zlib.compress(dump_json(record), 6))
+        self.writes += 1
+
+    def get(self, insight_id: str) -> Optional[Dict[str, Any]]:
+        blob = self._store.get(insight_id)
+        self.reads += 1
+        if blob is None:
+            self.misses += 1
+            return None
+        return json.loads(zlib.decompress(blob))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": len(self._store),
+            "writes": self.writes,
+            "reads": self.reads,
+            "misses": self.misses,
+            "evictions": self._store.evictions,
+        }
+
+    def close(self) -> None:
+        self._store.close()
+
+
+def build_provenance_store() -> ProvenanceStore:
+    """Provenance store configured from Settings."""
+    return ProvenanceStore(
+        settings.provenance_path,
+        ttl_seconds=settings.provenance_ttl_seconds,
+        max_bytes=settings.provenance_max_bytes,
+    )
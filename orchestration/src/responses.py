@@ -0,0 +1,28 @@
+"""
+Single-pass JSON responses: pydantic models and plain containers go straight to bytes via pydantic-core.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Serialize models, dicts, lists and datetimes to compact UTF-8 JSON in one
+    pass through pydantic-core's Rust serializer (no model_dump() dict, no
+    stdlib json encoder).
+    """
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that accepts pydantic models directly and renders with `dump_json`.
+
+    Return an instance from the route (rather than a dict for FastAPI to wrap)
+    so FastAPI's jsonable_encoder pass is skipped too.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
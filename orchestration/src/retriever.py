@@ -1,24 +1,156 @@
 """
-Hybrid retrieval: vector (Milvus) + graph (Neo4j) + SQL (PostgreSQL).
+Hybrid retrieval: vector (Milvus) + keyword (BM25) + graph (Neo4j) + SQL (PostgreSQL), fused by reciprocal rank.
 """
-from typing import List, Dict, Any
-from pymilvus import Collection
-from neo4j import GraphDatabase
-import psycopg2
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, Sequence
+from src.db import PgConnectionPool
+from src.graph_cache import GraphCache, neo4j_subgraph_loader
+from src.lexical import LexicalIndex
+from src.metrics import observe_backend
+from src.vector_index import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Per-source outcome reported in hybrid_search()["status"]
+SOURCE_OK = "ok"
+SOURCE_TIMEOUT = "timeout"
+SOURCE_ERROR = "error"
+SOURCE_SKIPPED = "skipped"
+
+RECENT_DOCUMENTS_SQL = (
+    "SELECT id, title, source, url FROM documents "
+    "WHERE account_id = $1 AND duplicate_of IS NULL ORDER BY created_at DESC LIMIT $2"
+)
+
+# Result lists merged into hybrid_search()["fused_results"], in tie-break order
+FUSED_SOURCES = (
+    ("vector", "vector_results"),
+    ("lexical", "lexical_results"),
+    ("graph", "graph_context"),
+    ("sql", "sql_metadata"),
+)
+
+# Written by the ingestion pipeline whenever it adds edges for an account
+GRAPH_CHANGES_SQL = (
+    "SELECT account_id, updated_at FROM account_graph_versions "
+    "WHERE updated_at > $1 ORDER BY updated_at"
+)
+
+WATERMARK_CHANGES_SQL = (
+    "SELECT account_id, watermark, updated_at FROM account_watermarks "
+    "WHERE updated_at > $1 ORDER BY updated_at"
+)
+
+# An account's kept documents ingested after a watermark, newest first
+DOCUMENTS_SINCE_SQL = (
+    "SELECT id, title, source, url, left(text, $3), ingest_seq FROM documents "
+    "WHERE account_id = $1 AND ingest_seq > $2 AND duplicate_of IS NULL "
+    "ORDER BY ingest_seq DESC LIMIT $4"
+)
+
+
+def _fusion_key(source: str, item: Dict[str, Any]) -> str:
+    """Identity of a result across sources: vector, lexical and SQL hits of one document share it."""
+    if source == "graph":
+        return f"graph:{item.get('from')}|{item.get('relation')}|{item.get('to')}"
+    return f"doc:{item.get('id')}"
+
+
+def reciprocal_rank_fusion(results: Dict[str, Any], k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merge the per-source result lists of a hybrid search. An item scores the
+    sum of 1 / (k + rank) over the lists it appears in (ranks from 1), so
+    agreement between sources counts more than one source's raw scores,
+    which aren't comparable. A document found by several sources is one
+    entry: its fields merged (the best-ranked source's win), `source` and
+    `rank` its best-ranked source and rank, `sources` all of them.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for source, key in FUSED_SOURCES:
+        for rank, item in enumerate(results.get(key) or [], start=1):
+            identity = _fusion_key(source, item)
+            entry = fused.get(identity)
+            if entry is None:
+                fused[identity] = {
+                    "source": source, "rank": rank, "sources": [source],
+                    "rrf_score": 1.0 / (k + rank), "item": dict(item),
+                }
+                continue
+            entry["rrf_score"] += 1.0 / (k + rank)
+            entry["sources"].append(source)
+            if rank < entry["rank"]:
+                entry.update(source=source, rank=rank, item={**entry["item"], **item})
+            else:
+                entry["item"] = {**item, **entry["item"]}
+    # Stable: ties keep source order
+    return sorted(fused.values(), key=lambda e: e["rrf_score"], reverse=True)
 
 
 class HybridRetriever:
-    def __init__(self, pg_conn_str: str, milvus_host: str, milvus_port: int, neo4j_uri: str, neo4j_user: str, neo4j_password: str):
+    def __init__(
+        self,
+        pg_conn_str: str,
+        milvus_host: str,
+        milvus_port: int,
+        neo4j_uri: str,
+        neo4j_user: str,
+        neo4j_password: str,
+        source_timeouts: Optional[Dict[str, float]] = None,
+        pg_pool_options: Optional[Dict[str, Any]] = None,
+        vector_store: Optional[VectorStore] = None,
+        neo4j_enabled: bool = False,
+        graph_cache_options: Optional[Dict[str, Any]] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        lexical_top_k: int = 5,
+        rrf_k: int = 60,
+        search_workers: int = 16,
+    ):
         self.pg_conn_str = pg_conn_str
+        # Connections are opened lazily; call warm_up() at startup to pre-open them
+        self.pg_pool = PgConnectionPool(pg_conn_str, **(pg_pool_options or {}))
+        # Per-backend deadline (seconds) for hybrid_search; missing sources default to 2s
+        self.source_timeouts = source_timeouts or {}
+        # hybrid_search's blocking calls run on bounded pools of their own rather than the
+        # default executor: SQL gets one thread per pooled connection, the other sources share
+        # `search_workers`. Work still queued when its deadline passes is dropped, not run late.
+        self._sql_executor = ThreadPoolExecutor(self.pg_pool.max_size, thread_name_prefix="retrieval-sql")
+        self._search_executor = ThreadPoolExecutor(search_workers, thread_name_prefix="retrieval")
         self.milvus_host = milvus_host
         self.milvus_port = milvus_port
-        self.neo4j_driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
+        # Milvus or the embedded NumPy index, chosen by settings.vector_backend
+        self.vector_store = vector_store
+        # BM25 keyword index over the same documents (exact names, tickers)
+        self.lexical_index = lexical_index
+        self.lexical_top_k = lexical_top_k
+        self.rrf_k = rrf_k
+        self.neo4j_uri = neo4j_uri
+        self.neo4j_auth = (neo4j_user, neo4j_password)
+        self.neo4j_enabled = neo4j_enabled
+        # Created by connect_graph() (or the first cache miss), so constructing
+        # the retriever neither imports the driver nor touches the network
+        self.neo4j_driver = None
+        self._neo4j_loader: Optional[Callable[[str, int], List[Dict[str, Any]]]] = None
+        self._neo4j_lock = threading.Lock()
+        # Account subgraphs are served from memory; Neo4j is only read on a miss
+        self.graph_cache = GraphCache(self._load_subgraph, **(graph_cache_options or {}))
     
-    def vector_search(self, embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search Milvus for similar documents."""
-        # Placeholder: Initialize Milvus collection and search
-        # In production, use pymilvus Collection to query
-        return []
+    def vector_search(
+        self, embedding: Sequence[float], top_k: int = 5, account_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Search the configured vector store for similar documents, optionally within one account."""
+        if self.vector_store is None:
+            return []
+        return self.vector_store.search(embedding, top_k=top_k, account_id=account_id)
+
+    def lexical_search(self, query: str, top_k: int = 5, account_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """BM25 keyword search over ingested documents, optionally within one account."""
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.search(query, top_k=top_k, account_id=account_id)
     
     # def graph_search(self, account_id: str, depth: int = 2) -> List[Dict[str, Any]]:
     #     """Traverse Neo4j for related accounts, people, signals."""
@@ -36,30 +168,40 @@ class HybridRetriever:
     #         paths = [record["path"] for record in result]
     #         return self._extract_path_context(paths)
     
-    def graph_search(self, account_id: str, depth: int = 2):
-        """
-        Retrieve relationship map for account.
-        MOVED TO STUB: Neo4j connection disabled.
-        """
-        logger.info(f"Graph search requested for {account_id} (Neo4j Bypassed)")
-        
-        # Return mock relationships so the UI still looks good
-        return [
-            {"from": account_id, "to": "Key Stakeholder", "relation": "decision_maker"},
-            {"from": account_id, "to": "CompetitorX", "relation": "competes_with"},
-        ]
+    def graph_search(self, account_id: str, depth: int = 2) -> List[Dict[str, Any]]:
+        """Retrieve the relationship map for an account from the subgraph cache (none while Neo4j is disabled)."""
+        if not self.neo4j_enabled:
+            return []
+        return self.graph_cache.get(account_id, depth)
+    
+    def _get_neo4j_loader(self) -> Callable[[str, int], List[Dict[str, Any]]]:
+        with self._neo4j_lock:
+            if self._neo4j_loader is None:
+                from neo4j import GraphDatabase
+
+                self.neo4j_driver = GraphDatabase.driver(self.neo4j_uri, auth=self.neo4j_auth)
+                self._neo4j_loader = neo4j_subgraph_loader(self.neo4j_driver)
+            return self._neo4j_loader
+    
+    def _load_subgraph(self, account_id: str, depth: int) -> List[Dict[str, Any]]:
+        return self._get_neo4j_loader()(account_id, depth)
+    
+    def connect_graph(self) -> None:
+        """Create the Neo4j driver and check the server is reachable (no-op while disabled)."""
+        if self.neo4j_enabled:
+            self._get_neo4j_loader()
+            self.neo4j_driver.verify_connectivity()
     
     def sql_search(self, account_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Query PostgreSQL for structured metadata."""
-        conn = psycopg2.connect(self.pg_conn_str)
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, title, source, url FROM documents WHERE account_id = %s ORDER BY created_at DESC LIMIT %s",
-            (account_id, limit)
-        )
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        """
+        Query PostgreSQL for structured metadata. The server cancels the query
+        at the SQL source's deadline, so a slow one frees its connection and
+        thread when hybrid_search stops waiting for it.
+        """
+        timeout_ms = int(self.source_timeouts.get("sql", 2.0) * 1000)
+        with self.pg_pool.connection() as pc, pc.transaction() as cur:
+            cur.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+            rows = pc.execute_prepared("recent_documents", (account_id, limit), RECENT_DOCUMENTS_SQL)
         
         return [
             {"id": r[0], "title": r[1], "source": r[2], "url": r[3]}
@@ -74,23 +216,114 @@ class HybridRetriever:
     #         "sql_metadata": self.sql_search(account_id, limit=10),
     #     }
     
-    def hybrid_search(self, embedding, account_id, query):
+    async def hybrid_search(
+        self,
+        embedding: Optional[Sequence[float]],
+        account_id: str,
+        query: str,
+        sources: Sequence[str] = ("vector", "lexical", "graph", "sql"),
+    ) -> Dict[str, Any]:
         """
-        Updated to skip Neo4j during hybrid retrieval
+        Run vector, keyword, graph and SQL search concurrently, each under its
+        own deadline, and merge them into `fused_results` by reciprocal-rank
+        fusion.
+
+        A slow or failing backend doesn't fail the whole search: its results
+        come back empty and `status[source]` records what happened, so the
+        total latency is bounded by the slowest backend within budget.
+        Sources not listed in `sources` are skipped (batch callers share the
+        account-level graph/SQL results across queries), as is the graph while
+        Neo4j is disabled: no placeholder edges reach the prompt.
         """
-        # ... your existing vector/SQL code ...
-        
-        return {
-            "vector_results": [], # or your actual vector results
-            "sql_metadata": {},   # or your actual SQL results
-            "graph_context": []   # Set this to empty to avoid calling Neo4j
+        searches: Dict[str, Optional[Callable[[], Any]]] = {
+            "vector": (lambda: self.vector_search(embedding, top_k=5, account_id=account_id)) if embedding is not None else None,
+            "lexical": (
+                (lambda: self.lexical_search(query, top_k=self.lexical_top_k, account_id=account_id))
+                if query and self.lexical_index is not None else None
+            ),
+            "graph": (lambda: self.graph_search(account_id, depth=2)) if self.neo4j_enabled else None,
+            "sql": lambda: self.sql_search(account_id, limit=10),
+        }
+        searches = {name: (fn if name in sources else None) for name, fn in searches.items()}
+        outcomes = await asyncio.gather(
+            *(self._run_source(name, fn) for name, fn in searches.items())
+        )
+        results = dict(zip(searches, outcomes))
+        merged = {
+            "vector_results": results["vector"][0],
+            "lexical_results": results["lexical"][0],
+            "graph_context": results["graph"][0],
+            "sql_metadata": results["sql"][0],
+            "status": {name: outcome[1] for name, outcome in results.items()},
         }
+        merged["fused_results"] = self.fuse(merged)
+        return merged
+
+    def fuse(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """`fused_results` for a hybrid search result (or one assembled from several partial searches)."""
+        return reciprocal_rank_fusion(results, self.rrf_k)
+
+    async def _run_source(self, name: str, fn: Optional[Callable[[], Any]]) -> tuple:
+        """Run one blocking backend call on the source's executor under its deadline."""
+        if fn is None:
+            return [], {"status": SOURCE_SKIPPED, "latency_ms": 0.0}
+        timeout = self.source_timeouts.get(name, 2.0)
+        executor = self._sql_executor if name == "sql" else self._search_executor
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(executor, fn), timeout=timeout
+            )
+            status = {"status": SOURCE_OK}
+        except asyncio.TimeoutError:
+            logger.warning(f"{name} search exceeded {timeout}s deadline")
+            result, status = [], {"status": SOURCE_TIMEOUT}
+        except Exception as e:
+            logger.warning(f"{name} search failed: {e}")
+            result, status = [], {"status": SOURCE_ERROR, "error": str(e)}
+        elapsed = time.perf_counter() - start
+        observe_backend(name, status["status"], elapsed)
+        status["latency_ms"] = round(elapsed * 1000, 2)
+        return result, status
+    
+    def graph_changes_since(self, since: Any) -> tuple:
+        """Accounts whose graph edges changed after `since`, and the newest change time seen."""
+        with self.pg_pool.connection() as pc:
+            rows = pc.execute_prepared("graph_changes", (since,), GRAPH_CHANGES_SQL)
+        return [r[0] for r in rows], (rows[-1][1] if rows else since)
+
+    def watermarks_since(self, since: Any) -> List[tuple]:
+        """(account_id, watermark, updated_at) of the accounts whose watermark moved after `since`."""
+        with self.pg_pool.connection() as pc:
+            return pc.execute_prepared("watermark_changes", (since,), WATERMARK_CHANGES_SQL)
+
+    def documents_since(self, account_id: str, watermark: int, limit: int, text_chars: int) -> List[Dict[str, Any]]:
+        """Up to `limit` of an account's documents ingested after `watermark`, newest first, text truncated."""
+        with self.pg_pool.connection() as pc:
+            rows = pc.execute_prepared(
+                "documents_since", (account_id, watermark, text_chars, limit), DOCUMENTS_SINCE_SQL
+            )
+        return [
+            {"id": r[0], "title": r[1], "source": r[2], "url": r[3], "text": r[4], "ingest_seq": r[5]}
+            for r in rows
+        ]
     
     def _extract_path_context(self, paths: List) -> List[Dict[str, Any]]:
         """Convert Neo4j paths to readable context."""
         # Placeholder implementation
         return []
     
+    def warm_up(self):
+        """Pre-open pooled PostgreSQL connections so the first briefing doesn't pay for them."""
+        self.pg_pool.warm_up()
+    
     def close(self):
+        self._sql_executor.shutdown(wait=False, cancel_futures=True)
+        self._search_executor.shutdown(wait=False, cancel_futures=True)
+        self.pg_pool.close()
+        if self.vector_store:
+            self.vector_store.close()
+        if self.lexical_index:
+            self.lexical_index.close()
         if self.neo4j_driver:
             self.neo4j_driver.close()
@@ -0,0 +1,225 @@
+"""
+Model routing: pick a GROQ model per role, trigger and latency budget, and track how each model performs.
+"""
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from src.admission import INTERACTIVE
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per model for percentiles
+STATS_WINDOW = 500
+
+
+class RouteDecision:
+    """
+    The model chosen for one call, plus the smaller model to hedge with if
+    the first hasn't started answering after `hedge_after` seconds.
+    `served_by` is filled in with whichever model's answer was used.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        tier: str,
+        reason: str,
+        hedge_model: Optional[str] = None,
+        hedge_after: Optional[float] = None,
+    ):
+        self.model = model
+        self.tier = tier
+        self.reason = reason
+        self.hedge_model = hedge_model
+        self.hedge_after = hedge_after
+        self.served_by = model
+
+    def __repr__(self) -> str:
+        return f"RouteDecision({self.model!r}, tier={self.tier!r}, reason={self.reason!r}, hedge={self.hedge_model!r})"
+
+
+def _percentile(values: Deque[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelStats:
+    """Observed latency (total and time to first token), failures and output quality for one model."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latencies: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self.first_token: Deque[float] = deque(maxlen=STATS_WINDOW)
+        # How answers parsed: "json", "extracted" (JSON inside prose) or "raw"
+        self.parse: Dict[str, int] = {}
+        self.confidence_sum = 0.0
+        self.rated = 0
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+    def snapshot(self) -> dict:
+        parsed = sum(self.parse.values())
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+            "latency_p50_ms": _ms(_percentile(self.latencies, 0.5)),
+            "latency_p90_ms": _ms(_percentile(self.latencies, 0.9)),
+            "first_token_p50_ms": _ms(_percentile(self.first_token, 0.5)),
+            "first_token_p90_ms": _ms(_percentile(self.first_token, 0.9)),
+            "parse": dict(self.parse),
+            "json_rate": round(self.parse.get("json", 0) / parsed, 4) if parsed else None,
+            "mean_confidence": round(self.confidence_sum / self.rated, 4) if self.rated else None,
+            "hedges_started": self.hedges_started,
+            "hedges_won": self.hedges_won,
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class ModelRouter:
+    """
+    Routes each call to a model tier.
+
+    `routes` maps "role:trigger", "role", "*:trigger" or "*" (most specific
+    wins) to a tier name in `tiers`. With a latency budget, a tier whose
+    observed p90 latency exceeds it is swapped for the slowest (largest)
+    tier that still fits. Interactive calls to any tier other than
+    `hedge_tier` are hedged with it after `hedge_after_ms`.
+    """
+
+    def __init__(
+        self,
+        tiers: Dict[str, str],
+        routes: Dict[str, str],
+        default_tier: str,
+        hedge_tier: Optional[str] = None,
+        hedge_after_ms: float = 0.0,
+        min_samples: int = 20,
+    ):
+        unknown = {tier for tier in list(routes.values()) + [default_tier] if tier not in tiers}
+        if unknown:
+            raise ValueError(f"Routes refer to unknown model tiers: {sorted(unknown)}")
+        self.tiers = tiers
+        self.routes = routes
+        self.default_tier = default_tier
+        self.hedge_tier = hedge_tier if hedge_tier in tiers else None
+        self.hedge_after = hedge_after_ms / 1000 if hedge_after_ms > 0 else None
+        self.min_samples = min_samples
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def _model_stats(self, model: str) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats.setdefault(model, ModelStats())
+        return stats
+
+    def _observed_p90(self, model: str) -> Optional[float]:
+        stats = self._stats.get(model)
+        if stats is None or len(stats.latencies) < self.min_samples:
+            return None
+        return _percentile(stats.latencies, 0.9)
+
+    def route(
+        self,
+        role: str,
+        trigger_type: str = "manual",
+        latency_budget_ms: Optional[float] = None,
+        priority: int = INTERACTIVE,
+    ) -> RouteDecision:
+        for key in (f"{role}:{trigger_type}", role, f"*:{trigger_type}", "*"):
+            if key in self.routes:
+                tier, reason = self.routes[key], f"route {key}"
+                break
+        else:
+            tier, reason = self.default_tier, "default"
+
+        if latency_budget_ms is not None:
+            budget = latency_budget_ms / 1000
+            p90 = self._observed_p90(self.tiers[tier])
+            if p90 is not None and p90 > budget:
+                # Slowest observed tier within budget, else the fastest observed
+                observed = sorted(
+                    (p, name) for name, model in self.tiers.items()
+                    if (p := self._observed_p90(model)) is not None
+                )
+                fits = [name for p, name in observed if p <= budget]
+                new_tier = fits[-1] if fits else observed[0][1]
+                if new_tier != tier:
+                    reason = f"p90 {p90 * 1000:.0f}ms over {latency_budget_ms:.0f}ms budget"
+                    tier = new_tier
+
+        model = self.tiers[tier]
+        hedge_model = None
+        if priority == INTERACTIVE and self.hedge_after is not None and self.hedge_tier not in (None, tier):
+            hedge_model = self.tiers[self.hedge_tier]
+            if hedge_model == model:
+                hedge_model = None
+        return RouteDecision(model, tier, reason, hedge_model, self.hedge_after if hedge_model else None)
+
+    def record_call(self, model: str, seconds: float, first_token_seconds: Optional[float] = None, ok: bool = True) -> None:
+        with self._lock:
+            stats = self._model_stats(model)
+            stats.calls += 1
+            if not ok:
+                stats.errors += 1
+                return
+            stats.latencies.append(seconds)
+            if first_token_seconds is not None:
+                stats.first_token.append(first_token_seconds)
+
+    def record_quality(self, model: str, parse_outcome: str, confidence: Optional[float] = None) -> None:
+        with self._lock:
+            stats = self._model_stats(model)
+            stats.parse[parse_outcome] = stats.parse.get(parse_outcome, 0) + 1
+            if isinstance(confidence, (int, float)):
+                stats.confidence_sum += float(confidence)
+                stats.rated += 1
+
+    def record_hedge(self, hedge_model: str, won: bool) -> None:
+        with self._lock:
+            stats = self._model_stats(hedge_model)
+            stats.hedges_started += 1
+            stats.hedges_won += won
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tiers": dict(self.tiers),
+                "routes": dict(self.routes),
+                "default_tier": self.default_tier,
+                "hedge_tier": self.hedge_tier,
+                "hedge_after_ms": self.hedge_after * 1000 if self.hedge_after is not None else None,
+                "models": {model: stats.snapshot() for model, stats in self._stats.items()},
+            }
+
+
+def parse_routes(spec: str) -> Dict[str, str]:
+    """"sdr=fast,ae=deep,*:calendar=deep" -> {"sdr": "fast", "ae": "deep", "*:calendar": "deep"}."""
+    routes = {}
+    for part in spec.split(","):
+        if part.strip():
+            key, _, tier = part.partition("=")
+            routes[key.strip()] = tier.strip()
+    return routes
+
+
+def build_model_router() -> ModelRouter:
+    """Router configured from Settings: a "deep" tier (GROQ_MODEL) and a "fast" tier (LLM_FAST_MODEL)."""
+    return ModelRouter(
+        tiers={"deep": settings.groq_model, "fast": settings.llm_fast_model},
+        routes=parse_routes(settings.llm_routes),
+        default_tier="deep",
+        hedge_tier="fast",
+        hedge_after_ms=settings.llm_hedge_after_ms,
+        min_samples=settings.llm_route_min_samples,
+    )
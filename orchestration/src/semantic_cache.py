@@ -0,0 +1,281 @@
+"""
+Semantic answer cache: reuse a briefing generated for a similarly worded query about the same account.
+"""
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.metrics import SEMANTIC_CACHE_AUDITS, SEMANTIC_CACHE_LOOKUPS, SEMANTIC_CACHE_SIMILARITY
+from src.retriever import SOURCE_OK, SOURCE_SKIPPED
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the nearest-neighbour similarity histogram in stats()
+SIMILARITY_BINS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+# Retrieval sources that don't depend on the query; together they are the account's context
+ACCOUNT_SOURCES = (("graph", "graph_context"), ("sql", "sql_metadata"))
+
+
+def account_context_version(retrieval_results: Optional[dict]) -> Optional[str]:
+    """
+    Fingerprint of the query-independent part of an account's retrieval (its
+    graph neighbourhood and recent documents). It changes when ingestion adds
+    documents or edges for the account. None if either source failed, since
+    then the context can't be compared; a skipped source (Neo4j disabled)
+    just contributes nothing.
+    """
+    results = retrieval_results or {}
+    status = results.get("status") or {}
+    parts = []
+    for source, key in ACCOUNT_SOURCES:
+        if status.get(source, {}).get("status", SOURCE_OK) not in (SOURCE_OK, SOURCE_SKIPPED):
+            return None
+        parts.append(results.get(key) or [])
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    norms = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / norms if norms else 0.0
+
+
+class SemanticHit:
+    """A cached answer whose query was similar enough to the incoming one."""
+
+    def __init__(self, value: Any, query: str, similarity: float):
+        self.value = value
+        self.query = query
+        self.similarity = similarity
+
+
+class _Bucket:
+    """
+    Answers for one (account, role), all generated from the same account
+    context version. Query embeddings are rows of one matrix so a lookup is a
+    single matrix-vector product. The matrix grows by doubling up to
+    `capacity` rows; once full, the oldest slot is overwritten.
+    """
+
+    def __init__(self, version: str, dim: int, capacity: int):
+        self.version = version
+        self.capacity = capacity
+        self.vectors = np.zeros((min(8, capacity), dim), dtype=np.float32)
+        self.expires = np.zeros(len(self.vectors), dtype=np.float64)
+        self.entries: List[Tuple[str, Any]] = []
+        self._next = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.entries)
+
+    def nearest(self, query: np.ndarray, now: float) -> Tuple[int, float]:
+        """Row and cosine similarity of the closest unexpired entry (-inf if none)."""
+        similarities = self.vectors[:self.size] @ query
+        similarities[self.expires[:self.size] <= now] = -np.inf
+        row = int(np.argmax(similarities))
+        return row, float(similarities[row])
+
+    def put(self, query_text: str, query: np.ndarray, value: Any, expires: float) -> None:
+        # The same wording again replaces its own entry rather than taking a slot
+        row = next((i for i, (text, _) in enumerate(self.entries) if text == query_text), None)
+        if row is None and self.size < self.capacity:
+            row = self.size
+            if row == len(self.vectors):
+                grown = min(self.capacity, 2 * len(self.vectors))
+                self.vectors = np.resize(self.vectors, (grown, self.vectors.shape[1]))
+                self.expires = np.resize(self.expires, grown)
+            self.entries.append((query_text, value))
+        elif row is None:
+            row = self._next
+            self._next = (self._next + 1) % self.capacity
+        self.vectors[row] = query
+        self.expires[row] = expires
+        self.entries[row] = (query_text, value)
+
+
+class SemanticAnswerCache:
+    """
+    Per-account cache of answers keyed by query embedding.
+
+    A lookup finds the most similar earlier query for the same account and
+    role and returns its answer when cosine similarity reaches `threshold`
+    and the account's context version is unchanged; a new version drops the
+    account's answers. Answers expire after `ttl_seconds`; each (account,
+    role) keeps at most `max_per_account` and the least recently used
+    buckets beyond `max_accounts` are dropped.
+
+    A sampled `audit_rate` fraction of hits should be re-synthesized by the
+    caller and reported to `record_audit`, which counts a hit as false when
+    the fresh answer's agreement with the reused one is below
+    `audit_min_agreement`.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        threshold: float = 0.9,
+        ttl_seconds: float = 1800.0,
+        max_per_account: int = 256,
+        max_accounts: int = 2048,
+        audit_rate: float = 0.0,
+        audit_min_agreement: float = 0.8,
+    ):
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_per_account = max_per_account
+        self.max_accounts = max_accounts
+        self.audit_rate = audit_rate
+        self.audit_min_agreement = audit_min_agreement
+        self._buckets: "OrderedDict[Tuple[str, str], _Bucket]" = OrderedDict()
+        self.hits = 0
+        # Misses by reason: "empty" (nothing cached), "stale" (context changed),
+        # "unversioned" (context unknown), "below_threshold"
+        self.misses: Dict[str, int] = {"empty": 0, "stale": 0, "unversioned": 0, "below_threshold": 0}
+        self.similarity_bins = [0] * len(SIMILARITY_BINS)
+        self.audits = {"agree": 0, "false_hit": 0, "error": 0}
+        self.recent_false_hits: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _miss(self, reason: str) -> None:
+        self.misses[reason] += 1
+        SEMANTIC_CACHE_LOOKUPS.labels(reason).inc()
+
+    def _observe_similarity(self, similarity: float) -> None:
+        SEMANTIC_CACHE_SIMILARITY.observe(max(similarity, 0.0))
+        for i, edge in enumerate(SIMILARITY_BINS):
+            if similarity <= edge or i == len(SIMILARITY_BINS) - 1:
+                self.similarity_bins[i] += 1
+                break
+
+    def lookup(self, account_id: str, role: str, version: Optional[str], embedding: np.ndarray) -> Optional[SemanticHit]:
+        if version is None:
+            self._miss("unversioned")
+            return None
+        key = (account_id, role)
+        bucket = self._buckets.get(key)
+        if bucket is not None and bucket.version != version:
+            del self._buckets[key]
+            self._miss("stale")
+            return None
+        if bucket is None or bucket.size == 0:
+            self._miss("empty")
+            return None
+        self._buckets.move_to_end(key)
+        row, similarity = bucket.nearest(self._normalize(embedding), time.monotonic())
+        if similarity == -np.inf:
+            # Everything in the bucket has expired
+            self._miss("empty")
+            return None
+        self._observe_similarity(similarity)
+        if similarity < self.threshold:
+            self._miss("below_threshold")
+            return None
+        self.hits += 1
+        SEMANTIC_CACHE_LOOKUPS.labels("hit").inc()
+        query, value = bucket.entries[row]
+        return SemanticHit(value, query, similarity)
+
+    def put(self, account_id: str, role: str, version: Optional[str], query: str, embedding: np.ndarray, value: Any) -> None:
+        if version is None:
+            return
+        key = (account_id, role)
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.version != version:
+            bucket = self._buckets[key] = _Bucket(version, self.dim, self.max_per_account)
+        self._buckets.move_to_end(key)
+        bucket.put(query, self._normalize(embedding), value, time.monotonic() + self.ttl_seconds)
+        while len(self._buckets) > self.max_accounts:
+            self._buckets.popitem(last=False)
+
+    def invalidate(self, account_id: Optional[str] = None) -> int:
+        """Drop every answer, or one account's. Returns the number of (account, role) buckets dropped."""
+        stale = [key for key in self._buckets if account_id is None or key[0] == account_id]
+        for key in stale:
+            del self._buckets[key]
+        return len(stale)
+
+    def should_audit(self) -> bool:
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def record_audit(self, query: str, hit: SemanticHit, agreement: Optional[float]) -> str:
+        """
+        Record the outcome of re-answering an audited hit: "agree", "false_hit",
+        or "error" (agreement None: the fresh synthesis failed).
+        """
+        if agreement is None:
+            verdict = "error"
+        elif agreement >= self.audit_min_agreement:
+            verdict = "agree"
+        else:
+            verdict = "false_hit"
+            self.recent_false_hits.append({
+                "query": query,
+                "cached_query": hit.query,
+                "similarity": round(hit.similarity, 4),
+                "agreement": round(agreement, 4),
+                "at": time.time(),
+            })
+            logger.warning(
+                f"Semantic cache false hit: {query!r} reused the answer to {hit.query!r} "
+                f"(similarity {hit.similarity:.3f}, answer agreement {agreement:.3f})"
+            )
+        self.audits[verdict] += 1
+        SEMANTIC_CACHE_AUDITS.labels(verdict).inc()
+        return verdict
+
+    def __len__(self) -> int:
+        return sum(bucket.size for bucket in self._buckets.values())
+
+    def stats(self) -> Dict[str, Any]:
+        misses = sum(self.misses.values())
+        lookups = self.hits + misses
+        audited = self.audits["agree"] + self.audits["false_hit"]
+        lower = 0.0
+        histogram = {}
+        for edge, count in zip(SIMILARITY_BINS, self.similarity_bins):
+            histogram[f"{lower:.2f}-{edge:.2f}"] = count
+            lower = edge
+        return {
+            "entries": len(self),
+            "buckets": len(self._buckets),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": misses,
+            "miss_reasons": dict(self.misses),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "nearest_similarity": histogram,
+            "audit_rate": self.audit_rate,
+            "audits": dict(self.audits),
+            "false_hit_rate": round(self.audits["false_hit"] / audited, 4) if audited else None,
+            "recent_false_hits": list(self.recent_false_hits),
+        }
+
+
+def build_semantic_cache(dim: int) -> Optional[SemanticAnswerCache]:
+    """Cache configured from Settings for embeddings of size `dim`; None when disabled."""
+    if not settings.semantic_cache_enabled:
+        return None
+    return SemanticAnswerCache(
+        dim,
+        threshold=settings.semantic_cache_threshold,
+        ttl_seconds=settings.semantic_cache_ttl_seconds,
+        max_per_account=settings.semantic_cache_max_per_account,
+        max_accounts=settings.semantic_cache_max_accounts,
+        audit_rate=settings.semantic_cache_audit_rate,
+        audit_min_agreement=settings.semantic_cache_audit_min_agreement,
+    )
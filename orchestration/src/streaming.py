@@ -0,0 +1,78 @@
+"""
+Server-sent events helpers and an incremental parser for streamed JSON insights.
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+from src.responses import dump_json
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Encode one SSE frame with a JSON payload (dicts or pydantic models)."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dump_json(data) + b"\n\n"
+
+
+class IncrementalJSONFieldParser:
+    """
+    Emits top-level fields of a JSON object as soon as each value is complete.
+
+    Feed it text deltas as they stream in; `feed` returns the (key, value) pairs
+    that became complete with that delta. Anything before the first `{` (e.g. a
+    markdown fence) is skipped, and a field that doesn't parse on its own is
+    dropped here and left to the final full-text parse.
+    """
+
+    def __init__(self):
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._segment_start: Optional[int] = None
+        self._text = ""
+        self.done = False
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        if self.done or not delta:
+            return []
+        self._text += delta
+        fields: List[Tuple[str, Any]] = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                if self._depth >= 1:
+                    self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._segment_start = i + 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    self._emit(text[self._segment_start:i], fields)
+                    self.done = True
+                    self._pos = i + 1
+                    return fields
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._emit(text[self._segment_start:i], fields)
+                self._segment_start = i + 1
+        self._pos = len(text)
+        return fields
+
+    @staticmethod
+    def _emit(segment: str, fields: List[Tuple[str, Any]]) -> None:
+        if not segment.strip():
+            return
+        try:
+            parsed = json.loads("{" + segment + "}")
+        except json.JSONDecodeError:
+            return
+        fields.extend(parsed.items())
@@ -0,0 +1,480 @@
+"""
+Vector stores behind HybridRetriever.vector_search: Milvus, or an embedded NumPy index.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.config import settings
+from src.filelock import file_lock
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = ["title", "url", "source", "text"]
+
+
+def milvus_string_literal(value: str) -> str:
+    """
+    `value` as a double-quoted Milvus expression string, with quotes and
+    backslashes escaped so it can't close the literal and extend the filter.
+    Control characters, which no account id contains, are rejected.
+    """
+    if any(ord(c) < 0x20 or c == "\x7f" for c in value):
+        raise ValueError(f"control character in filter value {value!r}")
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class VectorStore:
+    """Common interface so the retriever can switch backends by config."""
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        account_ids: List[str],
+        payloads: List[Dict[str, Any]],
+    ) -> None:
+        raise NotImplementedError
+
+    def search(
+        self, embedding: Sequence[float], top_k: int = 5, account_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def connect(self) -> None:
+        """Open connections ahead of the first search (embedded stores have none)."""
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MilvusVectorStore(VectorStore):
+    """Milvus collection with `id`, `account_id`, `embedding` and payload fields (inner-product metric)."""
+
+    def __init__(self, host: str, port: int, collection: str, nprobe: int = 16):
+        self.host = host
+        self.port = port
+        self.collection_name = collection
+        self.nprobe = nprobe
+        self._collection = None
+
+    def _get_collection(self):
+        if self._collection is None:
+            from pymilvus import Collection, connections
+
+            connections.connect(alias="default", host=self.host, port=str(self.port))
+            self._collection = Collection(self.collection_name)
+            self._collection.load()
+        return self._collection
+
+    def connect(self):
+        self._get_collection()
+
+    def add(self, ids, embeddings, account_ids, payloads):
+        rows = [
+            {"id": doc_id, "account_id": acc, "embedding": vec.tolist(),
+             **{f: (p.get(f) or "") for f in PAYLOAD_FIELDS}}
+            for doc_id, vec, acc, p in zip(ids, embeddings, account_ids, payloads)
+        ]
+        self._get_collection().upsert(rows)
+
+    def search(self, embedding, top_k=5, account_id=None):
+        # account_id comes from the request path: escaped, never spliced in raw
+        expr = f"account_id == {milvus_string_literal(account_id)}" if account_id else None
+        hits = self._get_collection().search(
+            data=[list(map(float, embedding))],
+            anns_field="embedding",
+            param={"metric_type": "IP", "params": {"nprobe": self.nprobe}},
+            limit=top_k,
+            expr=expr,
+            output_fields=["account_id"] + PAYLOAD_FIELDS,
+        )[0]
+        return [
+            {"id": hit.id, "score": float(hit.distance), **{f: hit.entity.get(f) for f in ["account_id"] + PAYLOAD_FIELDS}}
+            for hit in hits
+        ]
+
+    def flush(self):
+        if self._collection is not None:
+            self._collection.flush()
+
+    def close(self):
+        if self._collection is not None:
+            from pymilvus import connections
+
+            connections.disconnect("default")
+            self._collection = None
+
+
+class NumpyVectorIndex(VectorStore):
+    """
+    Embedded vector index persisted under `path`.
+
+    Vectors live in a memory-mapped float32 matrix (`vectors.f32`) that grows by
+    doubling; row metadata is an append-only `meta.jsonl` (last line per row
+    wins, so re-adding an id updates it in place). Search is an exact
+    vectorized dot product, or in "ivf" mode an inverted-file lookup over
+    int8-quantized rows that is re-ranked exactly.
+
+    Writers in every process hold an flock on `lock` while they allocate rows
+    and append, and other processes' rows are picked up on the next search.
+    Once IVF centroids are trained, each row's list and int8 code go to
+    `ivf-<n>.rows` together with its vector, before the meta line that makes
+    it visible; `ivf.json` names the current centroids and is replaced
+    atomically when they are retrained.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        mode: str = "exact",
+        nlist: int = 256,
+        nprobe: int = 16,
+        ivf_min_size: int = 20000,
+    ):
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown vector index mode: {mode}")
+        self.path = path
+        self.dim = dim
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._meta_path = os.path.join(path, "meta.jsonl")
+        self._ivf_path = os.path.join(path, "ivf.json")
+        self._lock_path = os.path.join(path, "lock")
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.memmap] = None
+        self._count = 0
+        self._meta_offset = 0
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._payloads: List[Dict[str, Any]] = []
+        self._account_codes = np.zeros(0, dtype=np.int32)
+        self._account_code_of: Dict[str, int] = {}
+        self._account_names: List[str] = []
+        # One record per row: IVF list, int8 scale and codes
+        self._ivf_row_dtype = np.dtype([("assign", "<i4"), ("scale", "<f4"), ("code", "i1", (dim,))])
+        self._centroids: Optional[np.ndarray] = None
+        self._ivf_rows: Optional[np.memmap] = None
+        self._ivf_trained_at = 0
+        self._ivf_version: Optional[int] = None
+        self._ivf_lists: Optional[List[np.ndarray]] = None
+        with file_lock(self._lock_path):
+            if not os.path.exists(self._vectors_path):
+                open(self._vectors_path, "wb").close()
+        self._open_matrix()
+        self._load_meta()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # -- storage ---------------------------------------------------------
+
+    def _capacity(self) -> int:
+        return os.path.getsize(self._vectors_path) // (4 * self.dim)
+
+    def _open_matrix(self) -> None:
+        capacity = self._capacity()
+        self._matrix = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            if capacity else None
+        )
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = self._capacity()
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(new_capacity * 4 * self.dim)
+        self._open_matrix()
+
+    def _account_code(self, account_id: str) -> int:
+        code = self._account_code_of.get(account_id)
+        if code is None:
+            code = self._account_code_of[account_id] = len(self._account_names)
+            self._account_names.append(account_id)
+        return code
+
+    def _apply_meta(self, record: Dict[str, Any]) -> None:
+        row = record["row"]
+        if row >= len(self._account_codes):
+            grown = np.full(max(row + 1, len(self._account_codes) * 2, 1024), -1, dtype=np.int32)
+            grown[: len(self._account_codes)] = self._account_codes
+            self._account_codes = grown
+        while len(self._ids) <= row:
+            self._ids.append("")
+            self._payloads.append({})
+        self._ids[row] = record["id"]
+        self._payloads[row] = record.get("payload", {})
+        self._row_of[record["id"]] = row
+        self._account_codes[row] = self._account_code(record.get("account_id") or "")
+        self._count = max(self._count, row + 1)
+
+    def _load_meta(self) -> None:
+        """Apply meta lines and IVF retraining written since the last load (by us or another process)."""
+        size = os.path.getsize(self._meta_path) if os.path.exists(self._meta_path) else 0
+        if size != self._meta_offset:
+            with open(self._meta_path, "rb") as f:
+                f.seek(self._meta_offset)
+                data = f.read()
+            # Ignore a trailing partial line from a concurrent writer
+            complete = data[: data.rfind(b"\n") + 1]
+            for line in complete.splitlines():
+                if line.strip():
+                    self._apply_meta(json.loads(line))
+            self._meta_offset += len(complete)
+            self._ivf_lists = None
+            if self._count > (0 if self._matrix is None else self._matrix.shape[0]):
+                self._open_matrix()
+        # After the meta lines: centroids trained later cover every row already read
+        self._load_ivf()
+        if self._ivf_rows is not None and self._count > self._ivf_rows.shape[0]:
+            self._open_ivf_rows()
+
+    def add(self, ids, embeddings, account_ids, payloads):
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+        with self._lock, file_lock(self._lock_path):
+            self._load_meta()
+            rows, next_row = [], self._count
+            for doc_id in ids:
+                row = self._row_of.get(doc_id)
+                if row is None:
+                    row, next_row = next_row, next_row + 1
+                rows.append(row)
+            self._ensure_capacity(next_row)
+            self._matrix[rows] = vectors
+            self._matrix.flush()
+            if self._centroids is not None:
+                self._ensure_ivf_capacity(next_row)
+                self._quantize(np.asarray(rows))
+                self._ivf_rows.flush()
+            # Vectors and their IVF codes are durable before the meta lines that make them visible
+            lines = []
+            for doc_id, row, acc, payload in zip(ids, rows, account_ids, payloads):
+                record = {"row": row, "id": doc_id, "account_id": acc,
+                          "payload": {f: payload.get(f) for f in PAYLOAD_FIELDS if payload.get(f) is not None}}
+                lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            self._load_meta()
+            if self.mode == "ivf":
+                self._maybe_train_ivf()
+
+    # -- IVF -------------------------------------------------------------
+
+    def _ivf_file(self, trained_at: int, suffix: str) -> str:
+        return os.path.join(self.path, f"ivf-{trained_at}.{suffix}")
+
+    def _load_ivf(self) -> None:
+        """Switch to the centroids `ivf.json` points at, if another process retrained them."""
+        try:
+            version = os.stat(self._ivf_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if version == self._ivf_version:
+            return
+        with open(self._ivf_path, encoding="utf-8") as f:
+            trained_at = json.load(f)["trained_at"]
+        if self._centroids is None or trained_at != self._ivf_trained_at:
+            self._centroids = np.load(self._ivf_file(trained_at, "npy"))
+            self._ivf_trained_at = trained_at
+            self._open_ivf_rows()
+        self._ivf_version = version
+
+    def _open_ivf_rows(self) -> None:
+        path = self._ivf_file(self._ivf_trained_at, "rows")
+        capacity = os.path.getsize(path) // self._ivf_row_dtype.itemsize
+        self._ivf_rows = np.memmap(path, dtype=self._ivf_row_dtype, mode="r+", shape=(capacity,))
+        self._ivf_lists = None
+
+    def _ensure_ivf_capacity(self, rows: int) -> None:
+        capacity = self._ivf_rows.shape[0]
+        if rows <= capacity:
+            return
+        self._ivf_rows.flush()
+        self._ivf_rows = None
+        with open(self._ivf_file(self._ivf_trained_at, "rows"), "r+b") as f:
+            f.truncate(max(rows, capacity * 2, 1024) * self._ivf_row_dtype.itemsize)
+        self._open_ivf_rows()
+
+    def _maybe_train_ivf(self) -> None:
+        if self._count < max(self.ivf_min_size, 1):
+            return
+        if self._centroids is None or self._count >= 4 * self._ivf_trained_at:
+            self._train_ivf()
+
+    def _train_ivf(self, iterations: int = 10) -> None:
+        """Spherical k-means on a sample, then assign and int8-quantize every row into new IVF files."""
+        n = self._count
+        rng = np.random.default_rng(0)
+        sample = np.asarray(self._matrix[np.sort(rng.choice(n, size=min(n, 50000), replace=False))])
+        nlist = min(self.nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        previous = self._ivf_trained_at if self._centroids is not None else None
+        np.save(self._ivf_file(n, "npy"), centroids.astype(np.float32))
+        with open(self._ivf_file(n, "rows"), "wb") as f:
+            f.truncate(self._matrix.shape[0] * self._ivf_row_dtype.itemsize)
+        self._centroids = centroids.astype(np.float32)
+        self._ivf_trained_at = n
+        self._open_ivf_rows()
+        self._quantize(np.arange(n))
+        self._ivf_rows.flush()
+        # Readers switch over only once every row is quantized
+        tmp_path = self._ivf_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"trained_at": n, "nlist": nlist}, f)
+        os.replace(tmp_path, self._ivf_path)
+        self._ivf_version = os.stat(self._ivf_path).st_mtime_ns
+        if previous is not None:
+            for suffix in ("npy", "rows"):
+                try:
+                    os.remove(self._ivf_file(previous, suffix))
+                except FileNotFoundError:
+                    pass
+        logger.info(f"Trained IVF index: {nlist} lists over {n} vectors")
+
+    def _quantize(self, rows: np.ndarray, block: int = 65536) -> None:
+        """Assign rows to their nearest centroid and store their int8 codes."""
+        for lo in range(0, len(rows), block):
+            chunk_rows = rows[lo:lo + block]
+            chunk = np.asarray(self._matrix[chunk_rows])
+            scale = np.abs(chunk).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            self._ivf_rows["assign"][chunk_rows] = np.argmax(chunk @ self._centroids.T, axis=1)
+            self._ivf_rows["scale"][chunk_rows] = scale
+            self._ivf_rows["code"][chunk_rows] = np.round(chunk / scale[:, None]).astype(np.int8)
+        self._ivf_lists = None
+
+    def _candidate_rows(self, query: np.ndarray) -> np.ndarray:
+        if self._ivf_lists is None:
+            assign = np.asarray(self._ivf_rows["assign"][: self._count])
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+            self._ivf_lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+        probe = np.argsort(-(self._centroids @ query))[: self.nprobe]
+        return np.concatenate([self._ivf_lists[c] for c in probe])
+
+    # -- search ----------------------------------------------------------
+
+    def search(self, embedding, top_k=5, account_id=None):
+        query = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            self._load_meta()
+            n = self._count
+            if n == 0 or top_k <= 0:
+                return []
+            codes = self._account_codes[:n]
+            account_code = self._account_code_of.get(account_id) if account_id else None
+            if account_id and account_code is None:
+                return []
+
+            if self._centroids is not None and self.mode == "ivf":
+                rows = self._candidate_rows(query)
+                if account_code is not None:
+                    rows = rows[codes[rows] == account_code]
+                quantized = self._ivf_rows[rows]
+                approx = (quantized["code"].astype(np.float32) @ query) * quantized["scale"]
+                keep = min(len(rows), top_k * 4)
+                rows = rows[np.argpartition(-approx, keep - 1)[:keep]] if keep else rows[:0]
+                rows.sort()
+            elif account_code is not None:
+                rows = np.flatnonzero(codes == account_code)
+            else:
+                rows = None
+
+            matrix = self._matrix[:n] if rows is None else self._matrix[rows]
+            scores = np.asarray(matrix) @ query
+            k = min(top_k, len(scores))
+            if k == 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            results = []
+            for i in best:
+                row = int(i if rows is None else rows[i])
+                results.append({
+                    "id": self._ids[row],
+                    "score": float(scores[i]),
+                    "account_id": self._account_names[self._account_codes[row]],
+                    **self._payloads[row],
+                })
+            return results
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            if self._ivf_rows is not None:
+                self._ivf_rows.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._matrix = None
+        self._ivf_rows = None
+
+
+def create_vector_store(
+    backend: str,
+    dim: int,
+    index_path: str,
+    index_mode: str = "exact",
+    nlist: int = 256,
+    nprobe: int = 16,
+    ivf_min_size: int = 20000,
+    milvus_host: str = "localhost",
+    milvus_port: int = 19530,
+    milvus_collection: str = "documents",
+) -> VectorStore:
+    """Pick the vector backend by name; "milvus" falls back to the embedded index without pymilvus."""
+    if backend == "milvus":
+        try:
+            import pymilvus  # noqa: F401
+
+            return MilvusVectorStore(milvus_host, milvus_port, milvus_collection, nprobe=nprobe)
+        except ImportError:
+            logger.warning("pymilvus not installed; using embedded NumPy vector index")
+    elif backend != "numpy":
+        raise ValueError(f"Unknown vector backend: {backend}")
+    return NumpyVectorIndex(index_path, dim, mode=index_mode, nlist=nlist, nprobe=nprobe, ivf_min_size=ivf_min_size)
+
+
+def build_vector_store(dim: int) -> VectorStore:
+    """Vector store configured from Settings."""
+    return create_vector_store(
+        settings.vector_backend,
+        dim,
+        settings.vector_index_path,
+        index_mode=settings.vector_index_mode,
+        nlist=settings.vector_ivf_nlist,
+        nprobe=settings.vector_ivf_nprobe,
+        ivf_min_size=settings.vector_ivf_min_size,
+        milvus_host=settings.milvus_host,
+        milvus_port=settings.milvus_port,
+        milvus_collection=settings.milvus_collection,
+    )
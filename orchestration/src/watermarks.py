@@ -0,0 +1,170 @@
+"""
+Per-account document watermarks, and the latest briefing per (account, role, query) with the watermark it reflects.
+"""
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.kvstore import SqliteKVStore
+from src.metrics import WATERMARK_BRIEFINGS
+
+logger = logging.getLogger(__name__)
+
+# How a briefing request went on the watermark path: served the stored briefing
+# ("unchanged"), a delta synthesis ("delta"), or a full synthesis because the
+# watermarks aren't loaded yet ("unknown"), nothing was stored ("missing"), the
+# stored briefing has been delta-updated too often ("chain_limit"), more new
+# documents arrived than a delta takes ("backlog") or they couldn't be read ("error")
+OUTCOMES = ("unchanged", "delta", "unknown", "missing", "chain_limit", "backlog", "error")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# updated_at is the writing transaction's start time, so a row can commit with
+# an updated_at older than rows already seen; polls look back this far
+POLL_OVERLAP = timedelta(seconds=30)
+
+# Joins account, role and query in store keys
+KEY_SEPARATOR = "\x1f"
+
+
+class AccountWatermarks:
+    """
+    The ingest sequence number of each account's newest document, mirrored
+    from the `account_watermarks` table by polling. Watermarks only go up.
+    Until the first poll has succeeded get() returns None (unknown); after
+    that an account without documents is at 0.
+    """
+
+    def __init__(self):
+        self._marks: Dict[str, int] = {}
+        self.loaded = False
+        # updated_at of the newest row applied
+        self.since = EPOCH
+
+    def get(self, account_id: str) -> Optional[int]:
+        if not self.loaded:
+            return None
+        return self._marks.get(account_id, 0)
+
+    def poll_since(self) -> datetime:
+        return self.since - POLL_OVERLAP
+
+    def apply(self, rows: List[Tuple[str, int, datetime]]) -> int:
+        """Apply (account_id, watermark, updated_at) rows; returns how many accounts moved forward."""
+        advanced = 0
+        for account_id, watermark, updated_at in rows:
+            if watermark > self._marks.get(account_id, 0):
+                self._marks[account_id] = watermark
+                advanced += 1
+            self.since = max(self.since, updated_at)
+        self.loaded = True
+        return advanced
+
+    def __len__(self) -> int:
+        return len(self._marks)
+
+
+class StoredBriefing:
+    """
+    A briefing, the account watermark it reflects, how many delta syntheses
+    led to it since a full one, and who generated it ("request" or "prewarm").
+    """
+
+    def __init__(self, briefing: Any, watermark: int, deltas: int = 0, origin: str = "request"):
+        self.briefing = briefing
+        self.watermark = watermark
+        self.deltas = deltas
+        self.origin = origin
+
+
+class BriefingStore:
+    """
+    Latest briefing per (account, role, query) in SQLite, shared by all
+    worker processes, expiring after `ttl_seconds`. Values are a JSON header
+    line ({"watermark", "deltas", "origin"}) followed by the briefing as
+    serialized by `dumps`. Stored briefings served unchanged are counted by
+    origin, so pre-warmed ones show up in the pre-warm hit stats.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        ttl_seconds: Optional[float] = None,
+    ):
+        self._store = SqliteKVStore(path, table="watermarked_briefings", ttl_seconds=ttl_seconds)
+        self.dumps = dumps
+        self.loads = loads
+        self.outcomes: Dict[str, int] = {outcome: 0 for outcome in OUTCOMES}
+        self.unchanged_by_origin: Dict[str, int] = {"request": 0, "prewarm": 0}
+
+    @staticmethod
+    def _key(account_id: str, role: str, query: str) -> str:
+        return KEY_SEPARATOR.join((account_id, role, query.strip()))
+
+    def get(self, account_id: str, role: str, query: str) -> Optional[StoredBriefing]:
+        blob = self._store.get(self._key(account_id, role, query))
+        if blob is None:
+            return None
+        header, _, body = blob.partition(b"\n")
+        try:
+            meta = json.loads(header)
+            return StoredBriefing(
+                self.loads(body), meta["watermark"], meta.get("deltas", 0), meta.get("origin", "request")
+            )
+        except Exception as e:
+            logger.warning(f"Dropping unreadable stored briefing for {account_id}: {e}")
+            self._store.delete(self._key(account_id, role, query))
+            return None
+
+    def put(
+        self,
+        account_id: str,
+        role: str,
+        query: str,
+        watermark: int,
+        briefing: Any,
+        deltas: int = 0,
+        origin: str = "request",
+    ) -> None:
+        header = json.dumps({"watermark": watermark, "deltas": deltas, "origin": origin}).encode()
+        self._store.put(self._key(account_id, role, query), header + b"\n" + self.dumps(briefing))
+
+    def invalidate(self, account_id: str) -> int:
+        """Forget an account's stored briefings (every role and query)."""
+        return self._store.delete_prefix(account_id + KEY_SEPARATOR)
+
+    def record(self, outcome: str, origin: Optional[str] = None) -> None:
+        """Count a request's outcome; `origin` is the stored briefing's, for "unchanged"."""
+        self.outcomes[outcome] += 1
+        WATERMARK_BRIEFINGS.labels(outcome).inc()
+        if outcome == "unchanged" and origin is not None:
+            self.unchanged_by_origin[origin] = self.unchanged_by_origin.get(origin, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        requests = sum(self.outcomes.values())
+        return {
+            "stored": len(self._store),
+            "outcomes": dict(self.outcomes),
+            "unchanged_by_origin": dict(self.unchanged_by_origin),
+            "unchanged_rate": round(self.outcomes["unchanged"] / requests, 4) if requests else 0.0,
+            "delta_rate": round(self.outcomes["delta"] / requests, 4) if requests else 0.0,
+        }
+
+    def close(self) -> None:
+        self._store.close()
+
+
+def build_briefing_store(dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]) -> Optional[BriefingStore]:
+    """Store configured from Settings; None when WATERMARK_BRIEFINGS_ENABLED is off."""
+    if not settings.watermark_briefings_enabled:
+        return None
+    return BriefingStore(
+        settings.watermark_briefing_path,
+        dumps,
+        loads,
+        ttl_seconds=settings.watermark_briefing_ttl_seconds or None,
+    )
@@ -0,0 +1,22 @@
+"""
+Keep the on-disk state the services create (caches, indexes, provenance) out of
+the working tree: settings are read once, when src.config is first imported.
+"""
+import os
+import tempfile
+
+_state_dir = tempfile.mkdtemp(prefix="salesai-tests-")
+
+for name, path in {
+    "EMBEDDING_CACHE_PATH": "embeddings.sqlite",
+    "VECTOR_INDEX_PATH": "vector_index",
+    "LEXICAL_INDEX_PATH": "lexical",
+    "PROVENANCE_PATH": "provenance.sqlite",
+    "BRIEFING_CACHE_SHARED_PATH": "briefings.sqlite",
+    "WATERMARK_BRIEFING_PATH": "watermarked_briefings.sqlite",
+    "DEDUP_INDEX_PATH": "dedup.sqlite",
+}.items():
+    os.environ.setdefault(name, os.path.join(_state_dir, path))
+os.environ.setdefault("PREWARM_ENABLED", "false")
+# No model download in unit tests; tests that need the default backend set it themselves
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
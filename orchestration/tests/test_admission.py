@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from src.admission import (
+    BATCH,
+    INTERACTIVE,
+    PREWARM,
+    AdmissionController,
+    AdmissionTimeout,
+    TokenBucket,
+    call_with_admission,
+    retry_reason,
+)
+
+
+class APIError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+def test_token_bucket_refills_at_rate_up_to_capacity():
+    bucket = TokenBucket(per_minute=60)
+    bucket._updated = 0.0
+    assert bucket.delay(60, now=0.0) == 0.0
+    bucket.take(60, now=0.0)
+    assert bucket.delay(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.delay(1, now=0.5) == pytest.approx(0.5)
+    assert bucket.delay(1, now=1000.0) == 0.0
+    assert bucket.tokens == 60
+
+
+def test_token_bucket_admits_oversized_requests_once_full_and_settles():
+    bucket = TokenBucket(per_minute=600)
+    bucket._updated = 0.0
+    assert bucket.delay(5000, now=0.0) == 0.0
+    bucket.take(5000, now=0.0)
+    assert bucket.tokens == -4400
+    bucket.adjust(10000)
+    assert bucket.tokens == 600
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(per_minute=0)
+    bucket.take(1e9, now=0.0)
+    assert bucket.delay(1e9, now=0.0) == 0.0
+
+
+def test_admits_by_class_then_deadline():
+    controller = AdmissionController(requests_per_minute=6000)
+    controller.requests.tokens = 0.0
+    admitted = []
+
+    async def call(name, priority, needed_by=None):
+        await controller.admit(priority, tokens=10, needed_by=needed_by)
+        admitted.append(name)
+
+    async def run():
+        await asyncio.gather(
+            call("prewarm", PREWARM),
+            call("batch-late", BATCH, needed_by=200.0),
+            call("batch-soon", BATCH, needed_by=100.0),
+            call("interactive", INTERACTIVE),
+        )
+
+    asyncio.run(run())
+    assert admitted == ["interactive", "batch-soon", "batch-late", "prewarm"]
+    assert controller.admitted == 4
+
+
+def test_waits_beyond_the_class_limit_time_out():
+    controller = AdmissionController(requests_per_minute=1, max_wait_seconds={PREWARM: 0.05})
+    controller.requests.tokens = 0.0
+
+    async def run():
+        with pytest.raises(AdmissionTimeout):
+            await controller.admit(PREWARM, tokens=10)
+        # The timed-out entry no longer holds up the queue
+        await asyncio.sleep(0)
+        return controller.stats()
+
+    stats = asyncio.run(run())
+    assert controller.timeouts == 1
+    assert stats["queued"]["prewarm"] == 0
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(requests_per_minute=1, max_queue=1)
+    controller.requests.tokens = 0.0
+
+    async def run():
+        waiting = asyncio.create_task(controller.admit(INTERACTIVE, tokens=1))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionTimeout):
+            await controller.admit(INTERACTIVE, tokens=1)
+        waiting.cancel()
+
+    asyncio.run(run())
+
+
+def test_rate_limited_calls_are_retried_after_retry_after():
+    controller = AdmissionController()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise APIError(429, retry_after="0.01")
+        return "ok"
+
+    assert asyncio.run(call_with_admission(controller, call, INTERACTIVE, tokens=10)) == "ok"
+    assert len(attempts) == 2
+    assert controller.throttled == 1
+    assert controller.admitted == 2
+
+
+def test_client_errors_are_not_retried():
+    controller = AdmissionController()
+
+    async def call():
+        raise APIError(400)
+
+    with pytest.raises(APIError):
+        asyncio.run(call_with_admission(controller, call, INTERACTIVE, tokens=10, backoff_base=0.001))
+    assert controller.admitted == 1
+
+
+def test_retry_reason():
+    assert retry_reason(APIError(429)) == "rate_limited"
+    assert retry_reason(APIError(503)) == "server_error"
+    assert retry_reason(APIError(404)) is None
+    assert retry_reason(type("APITimeoutError", (Exception,), {})()) == "connection"
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main
+from src.config import settings
+from src.models import BatchBriefingItem, BatchBriefingRequest
+from src.retriever import SOURCE_OK, reciprocal_rank_fusion
+
+SOURCES = ("vector", "lexical", "graph", "sql")
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.searches = []
+
+    async def hybrid_search(self, embedding, account_id, query, sources=SOURCES):
+        self.searches.append((account_id, query, tuple(sources)))
+        if account_id == "broken":
+            raise ConnectionError("postgres down")
+        return {
+            "vector_results": [{"id": f"{account_id}-{query}", "score": 0.9, "text": f"{query} news"}],
+            "lexical_results": [],
+            "graph_context": [{"from": account_id, "relation": "competes_with", "to": "Initech"}],
+            "sql_metadata": [],
+            "status": {source: {"status": SOURCE_OK} for source in SOURCES},
+        }
+
+    def fuse(self, results):
+        return reciprocal_rank_fusion(results)
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    retriever = FakeRetriever()
+    questions = []
+
+    async def synthesis(context, question, *args):
+        questions.append(question)
+        return {"insight": f"Answer to {question}", "confidence": 0.8, "sources": []}
+
+    monkeypatch.setattr(main, "retriever", retriever)
+    monkeypatch.setattr(main, "semantic_cache", None)
+    monkeypatch.setattr(main, "query_groq_for_synthesis", synthesis)
+    main.briefing_cache.invalidate()
+
+    def run(items, **kwargs):
+        request = BatchBriefingRequest(items=[BatchBriefingItem(**item) for item in items], **kwargs)
+
+        async def collect():
+            return [json.loads(line) async for line in main._batch_briefing_lines(request)]
+
+        return asyncio.run(collect())
+
+    return run, retriever, questions
+
+
+def test_batch_shares_retrieval_per_account_and_synthesis_per_query(batch):
+    run, retriever, questions = batch
+    lines = run([
+        {"account_id": "acme", "query": "renewal"},
+        {"account_id": "acme", "query": "renewal"},
+        {"account_id": "acme", "query": "hiring"},
+        {"account_id": "globex", "query": "renewal"},
+    ])
+    summary = lines.pop()["summary"]
+    assert (summary["total"], summary["ok"], summary["errors"], summary["accounts"]) == (4, 4, 0, 2)
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert sorted(search[:2] for search in retriever.searches if search[2] == ("graph", "sql")) == [("acme", ""), ("globex", "")]
+    assert len([search for search in retriever.searches if search[2] == ("vector", "lexical")]) == 3
+    assert sorted(questions) == ["hiring", "renewal", "renewal"]
+    by_index = {line["index"]: line for line in lines}
+    assert by_index[0]["briefing"]["insights"] == by_index[1]["briefing"]["insights"]
+
+
+def test_failed_items_report_their_own_error(batch):
+    run, _, _ = batch
+    lines = run([{"account_id": "broken"}, {"account_id": "acme"}], max_concurrency=1)
+    summary = lines.pop()["summary"]
+    assert (summary["ok"], summary["errors"]) == (1, 1)
+    errors = [line for line in lines if line["status"] == "error"]
+    assert errors == [{"index": 0, "account_id": "broken", "role": "ae", "query": "", "status": "error",
+                       "error": "postgres down"}]
+
+
+def test_batch_endpoint_validates_the_item_count(monkeypatch):
+    client = TestClient(main.app)
+    assert client.post("/api/briefings/batch", json={"items": []}).status_code == 400
+    monkeypatch.setattr(settings, "batch_max_items", 1)
+    items = [{"account_id": "acme"}, {"account_id": "globex"}]
+    assert client.post("/api/briefings/batch", json={"items": items}).status_code == 400
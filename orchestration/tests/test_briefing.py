@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main
+from src.embeddings import EmbeddingCache, EmbeddingService, LazyEmbeddingModel
+from src.retriever import SOURCE_OK, SOURCE_SKIPPED, reciprocal_rank_fusion
+
+SOURCES = ("vector", "lexical", "graph", "sql")
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.embeddings = []
+
+    async def hybrid_search(self, embedding, account_id, query, sources=SOURCES):
+        self.embeddings.append(embedding)
+        status = {source: {"status": SOURCE_OK} for source in SOURCES}
+        if embedding is None:
+            status["vector"] = {"status": SOURCE_SKIPPED}
+        return {
+            "vector_results": [],
+            "lexical_results": [],
+            "graph_context": [],
+            "sql_metadata": [{"id": "d1", "title": "Acme renews early", "url": "https://news/1"}],
+            "status": status,
+        }
+
+    def fuse(self, results):
+        return reciprocal_rank_fusion(results)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    retriever = FakeRetriever()
+
+    async def synthesis(context, question, *args):
+        return {"insight": f"Answer to {question}", "confidence": 0.8, "sources": []}
+
+    monkeypatch.setattr(main, "retriever", retriever)
+    monkeypatch.setattr(main, "query_groq_for_synthesis", synthesis)
+    main.briefing_cache.invalidate()
+    return TestClient(main.app), retriever
+
+
+def test_briefings_are_answered_without_the_embedding_model(app, monkeypatch):
+    client, retriever = app
+
+    def missing_model():
+        raise RuntimeError("EMBEDDING_BACKEND=sentence-transformers but sentence-transformers is not installed")
+
+    service = EmbeddingService(LazyEmbeddingModel(missing_model, "missing", main.embedding_service.dim), EmbeddingCache())
+    monkeypatch.setattr(main, "embedding_service", service)
+    response = client.post("/api/briefing/acme", params={"query": "renewal risk"})
+    assert response.status_code == 200
+    assert response.json()["insights"][0]["text"] == "Answer to renewal risk"
+    assert retriever.embeddings == [None]
+
+
+def test_concurrent_stream_and_post_share_one_synthesis(app, monkeypatch):
+    calls = []
+
+    async def streamed(context, question, *args, **kwargs):
+        calls.append("stream")
+        for delta in ('{"insight": "Acme ', 'renews early", "confidence": 0.8}'):
+            await asyncio.sleep(0.05)
+            yield delta
+
+    async def completed(context, question, *args):
+        calls.append("complete")
+        return {"insight": "Acme renews early", "confidence": 0.8}
+
+    monkeypatch.setattr(main, "stream_groq_for_synthesis", streamed)
+    monkeypatch.setattr(main, "query_groq_for_synthesis", completed)
+    misses = main.briefing_cache.misses
+
+    async def run():
+        events = []
+
+        async def stream():
+            async for event in main._stream_briefing_events("acme", "ae", "renewal", False):
+                events.append(event.decode())
+
+        streaming = asyncio.create_task(stream())
+        await asyncio.sleep(0.02)
+        response = await main.generate_briefing("acme", query="renewal")
+        await streaming
+        return json.loads(response.body), events
+
+    posted, events = asyncio.run(run())
+    assert calls == ["stream"]
+    assert main.briefing_cache.misses == misses + 1
+    assert posted["insights"][0]["text"] == "Acme renews early"
+    assert sum(event.startswith("event: token") for event in events) == 2
+    assert json.loads(events[-1].split("data: ", 1)[1])["cached"] is False
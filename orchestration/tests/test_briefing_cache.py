@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from src.cache import BriefingCache, UncacheableResult
+
+KEY = ("a", "ae", "q", "ctx")
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = BriefingCache(ttl_seconds=10)
+    now = [100.0]
+    monkeypatch.setattr("src.cache.time.monotonic", lambda: now[0])
+
+    async def run():
+        await cache.set(KEY, "briefing")
+        assert await cache.get(KEY) == "briefing"
+        now[0] += 11
+        assert await cache.get(KEY) is None
+
+    asyncio.run(run())
+    assert cache.expirations == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = BriefingCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "briefing"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute(KEY, compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["briefing"] * 5
+    assert len(calls) == 1
+    assert cache.misses == 1
+    assert cache.coalesced == 4
+
+
+def test_uncacheable_results_are_shared_but_not_stored():
+    cache = BriefingCache()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise UncacheableResult("fallback")
+
+    async def run():
+        results = await asyncio.gather(cache.get_or_compute(KEY, compute), cache.get_or_compute(KEY, compute))
+        return results, await cache.get(KEY)
+
+    assert asyncio.run(run()) == (["fallback", "fallback"], None)
+
+
+def test_failures_propagate_to_every_waiter_and_are_not_cached():
+    cache = BriefingCache()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("llm down")
+
+    async def run():
+        results = await asyncio.gather(
+            cache.get_or_compute(KEY, compute), cache.get_or_compute(KEY, compute), return_exceptions=True
+        )
+        return results, await cache.get(KEY)
+
+    results, cached = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cached is None
+
+
+def test_a_cancelled_caller_does_not_fail_the_others():
+    cache = BriefingCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "briefing"
+
+    async def run():
+        # The first caller computes; its client disconnects while the others wait
+        leader = asyncio.create_task(cache.get_or_compute(KEY, compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_compute(KEY, compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results, await cache.get(KEY)
+
+    assert asyncio.run(run()) == (["briefing"] * 3, "briefing")
+    assert len(calls) == 1
+
+
+def test_lru_eviction():
+    cache = BriefingCache(max_entries=2)
+
+    async def run():
+        await cache.set(("a",), 1)
+        await cache.set(("b",), 2)
+        await cache.get(("a",))
+        await cache.set(("c",), 3)
+        return [await cache.get((k,)) for k in "abc"]
+
+    assert asyncio.run(run()) == [1, None, 3]
+    assert cache.evictions == 1
+
+
+@pytest.mark.parametrize("bypass", [False, True])
+def test_bypass_recomputes(bypass):
+    cache = BriefingCache()
+    values = iter(["old", "new"])
+
+    async def compute():
+        return next(values)
+
+    async def run():
+        await cache.get_or_compute(KEY, compute)
+        return await cache.get_or_compute(KEY, compute, bypass=bypass)
+
+    assert asyncio.run(run()) == ("new" if bypass else "old")
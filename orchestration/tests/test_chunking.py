@@ -0,0 +1,66 @@
+from src.chunking import chunk_text, document_pieces, iter_units
+
+
+def words(text):
+    return len(text.split())
+
+
+SENTENCES = [f"Sentence {i} has exactly six words." for i in range(10)]
+TEXT = " ".join(SENTENCES)
+
+
+def chunks(pieces, max_tokens=15, overlap_tokens=6):
+    return list(chunk_text(pieces, max_tokens, overlap_tokens, words))
+
+
+def test_units_concatenate_back_to_the_input():
+    pieces = [TEXT[i:i + 17] for i in range(0, len(TEXT), 17)]
+    units = list(iter_units(pieces))
+    assert "".join(units) == TEXT
+    assert units[0] == SENTENCES[0] + " "
+
+
+def test_chunks_are_bounded_and_overlap_by_whole_sentences():
+    result = chunks([TEXT])
+    assert [c.index for c in result] == list(range(len(result)))
+    assert all(c.tokens <= 15 for c in result)
+    for previous, chunk in zip(result, result[1:]):
+        last_sentence = previous.text.split(". ")[-1]
+        assert chunk.text.startswith(last_sentence)
+    covered = " ".join(c.text for c in result)
+    assert all(sentence in covered for sentence in SENTENCES)
+    assert result[-1].text.endswith(SENTENCES[-1])
+    for c in result:
+        assert TEXT[c.char_start:].startswith(c.text)
+
+
+def test_no_overlap():
+    result = chunks([TEXT], max_tokens=12, overlap_tokens=0)
+    assert [c.text for c in result] == [" ".join(SENTENCES[i:i + 2]) for i in range(0, 10, 2)]
+
+
+def test_chunking_does_not_depend_on_how_the_text_is_streamed():
+    whole = [(c.text, c.char_start) for c in chunks([TEXT])]
+    streamed = [(c.text, c.char_start) for c in chunks(TEXT[i:i + 5] for i in range(0, len(TEXT), 5))]
+    assert streamed == whole
+
+
+def test_overlong_sentences_and_words_are_split():
+    long_sentence = " ".join(f"w{i}" for i in range(40)) + "."
+    result = chunks([long_sentence])
+    assert all(c.tokens <= 15 for c in result)
+    assert " ".join(c.text for c in result).split()[-1] == "w39."
+
+    def chars(text):
+        return len(text)
+
+    table_row = "x" * 100
+    pieces = list(chunk_text([table_row], 30, 0, chars))
+    assert "".join(c.text for c in pieces) == table_row
+    assert all(c.tokens <= 30 for c in pieces)
+
+
+def test_blank_documents_yield_nothing():
+    assert chunks(["  \n\n  "]) == []
+    assert chunks(document_pieces({"title": "", "text": ""})) == []
+    assert chunks(document_pieces({"title": "Filing", "text": "Body text."}))[0].text == "Filing\n\nBody text."
@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+from src.consumer import IngestionConsumer
+
+
+class FakeChannel:
+    def __init__(self):
+        self.calls = []
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.calls.append(("ack", delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.calls.append(("nack", delivery_tag, multiple))
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        self.calls.append(("reject", delivery_tag, requeue))
+
+
+class FakePipeline:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def process(self, docs):
+        if self.fail:
+            raise ConnectionError("postgres down")
+        self.batches.append([doc["id"] for doc in docs])
+        return {"duplicates": 1}
+
+
+def deliver(consumer, channel, tag, body):
+    consumer._on_message(channel, SimpleNamespace(delivery_tag=tag), None, body)
+
+
+def doc(i):
+    return json.dumps({"id": f"d{i}", "text": "..."}).encode()
+
+
+def test_full_batches_are_processed_then_acked_once():
+    pipeline, channel = FakePipeline(), FakeChannel()
+    consumer = IngestionConsumer(pipeline, "amqp://unused", "docs", batch_size=3, prefetch=1)
+    assert consumer.prefetch == 3
+    for tag in range(1, 5):
+        deliver(consumer, channel, tag, doc(tag))
+    assert pipeline.batches == [["d1", "d2", "d3"]]
+    assert channel.calls == [("ack", 3, True)]
+    assert (consumer.batches, consumer.documents, consumer.duplicates) == (1, 3, 1)
+
+
+def test_partial_batches_flush_after_max_wait(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.consumer.time.monotonic", lambda: now[0])
+    consumer = IngestionConsumer(FakePipeline(), "amqp://unused", "docs", batch_size=10, max_wait_seconds=2)
+    assert not consumer._batch_due()
+    deliver(consumer, FakeChannel(), 1, doc(1))
+    now[0] += 1
+    assert not consumer._batch_due()
+    now[0] += 1
+    assert consumer._batch_due()
+
+
+def test_malformed_messages_are_rejected_alone():
+    pipeline, channel = FakePipeline(), FakeChannel()
+    consumer = IngestionConsumer(pipeline, "amqp://unused", "docs", batch_size=2)
+    deliver(consumer, channel, 1, b"not json")
+    deliver(consumer, channel, 2, b'{"text": "no id"}')
+    deliver(consumer, channel, 3, doc(3))
+    deliver(consumer, channel, 4, doc(4))
+    assert channel.calls == [("reject", 1, False), ("reject", 2, False), ("ack", 4, True)]
+    assert consumer.rejected == 2
+
+
+def test_failed_batches_are_requeued():
+    channel = FakeChannel()
+    consumer = IngestionConsumer(FakePipeline(fail=True), "amqp://unused", "docs", batch_size=2, retry_delay_seconds=0)
+    deliver(consumer, channel, 1, doc(1))
+    deliver(consumer, channel, 2, doc(2))
+    assert channel.calls == [("nack", 2, True)]
+    assert (consumer.failed_batches, consumer.documents) == (1, 0)
@@ -0,0 +1,60 @@
+from src.context import pack_context, rank_items, token_counter
+from src.retriever import reciprocal_rank_fusion
+
+
+def words(text):
+    return len(text.split())
+
+
+RESULTS = {
+    "vector_results": [
+        {"id": "d1", "score": 0.9, "title": "Acme renewal", "url": "https://news/1", "text": "renewal slips to Q3"},
+        {"id": "d2", "score": 0.4, "title": "Acme hiring", "url": "https://news/2", "text": "three new sales roles"},
+    ],
+    "graph_context": [{"from": "Acme", "relation": "competes_with", "to": "Globex"}],
+    "sql_metadata": [
+        {"id": "d1", "title": "Acme renewal", "url": "https://news/1"},
+        {"id": "d3", "title": "Acme renewal update", "url": "https://news/1?ref=rss"},
+    ],
+}
+
+
+def test_rank_items_scores_query_overlap_and_vector_similarity():
+    ranked = rank_items(RESULTS, "acme renewal")
+    assert ranked[0].data["id"] == "d1" and ranked[0].source == "vector"
+    assert [item.score for item in ranked] == sorted((item.score for item in ranked), reverse=True)
+    assert rank_items(None, "q") == []
+
+
+def test_rank_items_follows_fusion_order():
+    fused = dict(RESULTS, fused_results=reciprocal_rank_fusion(RESULTS))
+    ranked = rank_items(fused, "acme")
+    assert [(item.source, item.key) for item in ranked][:2] == [("vector", "d1"), ("graph", None)]
+    # d1 appears once even though vector and SQL both returned it
+    assert [item.key for item in ranked].count("d1") == 1
+
+
+def test_pack_context_drops_duplicates_and_numbers_sections():
+    context = pack_context("Account: Acme", RESULTS, "acme renewal", budget_tokens=500, count_tokens=words)
+    assert context.dropped == {"duplicate": 1, "budget": 0}
+    assert [(item.number, item.source) for item in context.items] == [(1, "vector"), (2, "vector"), (3, "graph"), (4, "sql")]
+    assert context.text.startswith("Account: Acme\nVector Results:\n[1] Acme renewal (https://news/1): renewal slips to Q3")
+    assert "\nGraph Context:\n[3] Acme -[competes_with]-> Globex\n" in context.text
+    assert context.tokens <= 500
+
+
+def test_pack_context_skips_items_over_budget_for_smaller_ones():
+    results = {"vector_results": [
+        {"id": "big", "score": 0.9, "text": "word " * 50},
+        {"id": "small", "score": 0.5, "text": "short note"},
+    ]}
+    context = pack_context("h", results, "", budget_tokens=20, count_tokens=words)
+    assert [item.key for item in context.items] == ["small"]
+    assert context.dropped == {"duplicate": 0, "budget": 1}
+    assert context.tokens <= 20
+
+
+def test_token_counter_without_tiktoken_estimates_four_chars_per_token():
+    count = token_counter("openai/gpt-oss-120b")
+    assert count("") == 0
+    assert 2 <= count("twelve chars") <= 4
@@ -0,0 +1,106 @@
+import pytest
+
+from src.db import PgConnectionPool, PooledConnection, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise ConnectionError("server closed the connection")
+        self.conn.executed.append(sql if params is None else (sql, params))
+        self.description = [("x",)] if sql.startswith("EXECUTE") else None
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+def pool(monkeypatch, now, **kwargs):
+    monkeypatch.setattr("src.db.time.monotonic", lambda: now[0])
+    pg = PgConnectionPool("postgresql://unused", **kwargs)
+    monkeypatch.setattr(pg, "_connect", lambda: PooledConnection(FakeConnection()))
+    return pg
+
+
+def test_connections_are_reused_and_bounded(monkeypatch):
+    pg = pool(monkeypatch, [0.0], max_size=1, acquire_timeout=0.05)
+    with pg.connection() as first:
+        with pytest.raises(PoolTimeout):
+            with pg.connection():
+                pass
+    with pg.connection() as second:
+        assert second is first
+    assert pg.stats()["idle"] == 1
+
+
+def test_idle_connections_are_pinged_and_broken_ones_replaced(monkeypatch):
+    now = [0.0]
+    pg = pool(monkeypatch, now, health_check_interval=30)
+    with pg.connection() as first:
+        pass
+    now[0] += 31
+    with pg.connection() as pinged:
+        assert pinged is first and pinged.conn.executed == ["SELECT 1"]
+    now[0] += 31
+    first.conn.broken = True
+    with pg.connection() as replacement:
+        assert replacement is not first
+    assert first.conn.closed and pg.discarded == 1
+
+
+def test_failed_statements_discard_the_connection(monkeypatch):
+    pg = pool(monkeypatch, [0.0])
+    with pytest.raises(ValueError):
+        with pg.connection():
+            raise ValueError("syntax error")
+    assert (pg.stats()["idle"], pg.discarded) == (0, 1)
+
+
+def test_idle_connections_beyond_the_minimum_are_closed(monkeypatch):
+    now = [0.0]
+    pg = pool(monkeypatch, now, min_size=1, idle_timeout=60)
+    pg.warm_up()
+    with pg.connection(), pg.connection():
+        pass
+    assert pg.stats()["idle"] == 2
+    now[0] += 61
+    with pg.connection():
+        pass
+    assert pg.stats()["idle"] == 1
+    pg.close()
+    with pytest.raises(RuntimeError):
+        with pg.connection():
+            pass
+
+
+def test_statements_are_prepared_once_per_connection():
+    pc = PooledConnection(FakeConnection())
+    assert pc.execute_prepared("docs", ["acme", 5], "SELECT 1 WHERE $1 = $1 LIMIT $2") == [(1,)]
+    pc.execute_prepared("docs", ["globex", 5], "SELECT 1 WHERE $1 = $1 LIMIT $2")
+    assert pc.conn.executed == [
+        "PREPARE docs AS SELECT 1 WHERE $1 = $1 LIMIT $2",
+        ("EXECUTE docs (%s, %s)", ("acme", 5)),
+        ("EXECUTE docs (%s, %s)", ("globex", 5)),
+    ]
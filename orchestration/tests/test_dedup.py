@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.dedup import MinHasher, NearDuplicateIndex, estimated_jaccard, lsh_bands
+from src.embeddings import EmbeddingService, HashingEmbedder
+from src.ingest import IngestionPipeline
+from src.vector_index import NumpyVectorIndex
+
+STORY = (
+    "Acme Corp agreed to acquire Globex for four billion dollars in cash, the companies said on Monday, "
+    "creating the largest supplier of industrial sensors in North America and ending a long bidding war"
+)
+REWRITE = STORY.replace("on Monday", "on Monday morning")
+OTHER = "Initech reported quarterly revenue below expectations and cut its full year outlook for software licenses"
+
+
+def index(tmp_path, **kwargs):
+    return NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), num_perm=64, shingle_words=3, **kwargs)
+
+
+def test_lsh_bands_candidate_threshold_stays_below_target():
+    bands, rows = lsh_bands(128, 0.8)
+    assert bands * rows <= 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
+
+
+def test_signatures_estimate_jaccard_similarity():
+    hasher = MinHasher(num_perm=256, shingle_words=3)
+    assert np.array_equal(hasher.signature(STORY), MinHasher(num_perm=256, shingle_words=3).signature(STORY))
+    assert estimated_jaccard(hasher.signature(STORY), hasher.signature(REWRITE)) > 0.8
+    assert estimated_jaccard(hasher.signature(STORY), hasher.signature(OTHER)) < 0.2
+    assert hasher.signature("  ...  ") is None
+
+
+def test_partition_finds_duplicates_within_and_across_batches(tmp_path):
+    dedup = index(tmp_path)
+    canonical, kept = dedup.partition([("acme", "d1", STORY), ("acme", "d2", REWRITE), ("acme", "d3", OTHER),
+                                       ("globex", "d4", REWRITE)])
+    assert canonical == [None, "d1", None, None]
+    assert [(account, doc_id) for account, doc_id, _ in kept] == [("acme", "d1"), ("acme", "d3"), ("globex", "d4")]
+    dedup.commit(kept)
+    assert dedup.partition([("acme", "d5", REWRITE)])[0] == ["d1"]
+
+
+def test_signatures_are_kept_only_after_commit(tmp_path):
+    dedup = index(tmp_path)
+    canonical, kept = dedup.partition([("acme", "d1", STORY)])
+    assert dedup.partition([("acme", "d2", REWRITE)])[0] == [None]
+    dedup.commit(kept)
+    dedup.close()
+    reloaded = index(tmp_path)
+    assert reloaded.partition([("acme", "d2", REWRITE)])[0] == ["d1"]
+
+
+def test_max_per_account_drops_oldest(tmp_path):
+    dedup = index(tmp_path, max_per_account=1)
+    dedup.commit(dedup.partition([("acme", "d1", STORY)])[1])
+    dedup.commit(dedup.partition([("acme", "d2", OTHER)])[1])
+    assert dedup.partition([("acme", "d3", REWRITE)])[0] == [None]
+
+
+class FailingVectorStore(NumpyVectorIndex):
+    def add(self, *args, **kwargs):
+        raise RuntimeError("vector store down")
+
+
+def test_failed_batch_leaves_no_signatures(tmp_path):
+    dedup = index(tmp_path)
+    embedder = EmbeddingService(HashingEmbedder(dim=16))
+    docs = [{"id": "d1", "account_id": "acme", "title": "Deal", "text": STORY}]
+    failing = IngestionPipeline(embedder, FailingVectorStore(str(tmp_path / "vectors"), 16), dedup=dedup)
+    with pytest.raises(RuntimeError):
+        failing.process(docs)
+    assert dedup.stats()["indexed"] == 0
+
+    pipeline = IngestionPipeline(embedder, NumpyVectorIndex(str(tmp_path / "vectors"), 16), dedup=dedup)
+    assert pipeline.process(docs)["duplicates"] == 0
+    copy = [{"id": "d2", "account_id": "acme", "title": "Deal", "text": REWRITE}]
+    assert pipeline.process(copy)["duplicates"] == 1
@@ -0,0 +1,45 @@
+import sys
+
+import numpy as np
+import pytest
+
+from src.embeddings import EmbeddingCache, EmbeddingService, HashingEmbedder, create_embedding_model
+
+
+def test_missing_sentence_transformers_fails_loudly(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    with pytest.raises(RuntimeError, match="EMBEDDING_BACKEND=hashing"):
+        create_embedding_model("sentence-transformers", "some/model", 768)
+
+
+def test_hashing_backend_and_unknown_backend():
+    assert isinstance(create_embedding_model("hashing", "ignored", 64), HashingEmbedder)
+    with pytest.raises(ValueError):
+        create_embedding_model("word2vec", "ignored", 64)
+
+
+def test_hashing_embeddings_are_unit_length_and_deterministic():
+    model = HashingEmbedder(64)
+    first = model.encode(["ACME raises guidance", ""])
+    assert first.shape == (2, 64)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+    assert np.array_equal(first[:1], model.encode(["ACME raises guidance"]))
+
+
+def test_encode_batch_encodes_each_text_once(tmp_path):
+    service = EmbeddingService(HashingEmbedder(32), EmbeddingCache(disk_path=str(tmp_path / "e.sqlite")))
+    vectors = service.encode_batch(["a b", "c d", "a b"])
+    assert np.array_equal(vectors[0], vectors[2])
+    assert service.encoded == 2
+    service.encode_batch(["c d"])
+    assert service.encoded == 2
+
+
+def test_disk_cache_is_bounded(tmp_path):
+    cache = EmbeddingCache(max_entries=1, disk_path=str(tmp_path / "e.sqlite"), disk_max_bytes=4096)
+    vector = np.ones(64, dtype=np.float32)  # 256 bytes
+    for i in range(100):
+        cache.put_many([(f"k{i}", vector)])
+    assert len(cache._disk) * vector.nbytes <= 4096
+    assert cache.get_many(["k99"])
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+from groq import AsyncGroq
+
+from bench.fake_groq import CANNED_ANSWER, create_app
+
+MESSAGES = [{"role": "user", "content": "Brief me on acme"}]
+
+
+def sdk_client(app):
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return AsyncGroq(api_key="test", base_url="http://fake-groq", max_retries=0, http_client=http_client)
+
+
+def test_sdk_parses_completions_and_streams():
+    app = create_app(latency_ms=0, jitter_ms=0, first_token_ms=0, tokens_per_second=1e6)
+
+    async def run():
+        client = sdk_client(app)
+        response = await client.chat.completions.create(model="m", messages=MESSAGES)
+        stream = await client.chat.completions.create(model="m", messages=MESSAGES, stream=True)
+        chunks = [chunk async for chunk in stream]
+        await client.close()
+        return response, chunks
+
+    response, chunks = asyncio.run(run())
+    assert json.loads(response.choices[0].message.content) == CANNED_ANSWER
+    assert response.usage.total_tokens > 0
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+    assert json.loads(text) == CANNED_ANSWER
+    assert chunks[-1].x_groq.usage.completion_tokens == len(chunks) - 2
+
+
+def test_injected_failures_and_stats():
+    client = TestClient(create_app(latency_ms=0, jitter_ms=0, failure_rate=1.0, failure_status=429))
+    response = client.post("/openai/v1/chat/completions", json={"model": "m", "messages": MESSAGES})
+    assert response.status_code == 429 and response.headers["retry-after"] == "1"
+    assert client.get("/stats").json() == {"requests": 1, "streams": 0, "failures": 1, "models": {}}
@@ -0,0 +1,116 @@
+import pytest
+
+from src.graph_cache import ACCOUNT_SUBGRAPH_CYPHER, AccountSubgraph, GraphCache, neo4j_subgraph_loader
+
+EDGES = [
+    {"from": "acme", "to": "Jane Doe", "relation": "hasExecutive"},
+    {"from": "Globex", "to": "acme", "relation": "competes_with"},
+    {"from": "Jane Doe", "to": "Initech", "relation": "formerlyAt"},
+    {"from": "Initech", "to": "Hooli", "relation": "partner"},
+    {"from": "Jane Doe", "to": "Jane Doe", "relation": "self"},
+]
+
+
+def test_bfs_returns_edges_nearest_first_in_stored_direction():
+    subgraph = AccountSubgraph("acme", EDGES)
+    assert len(subgraph) == 5
+    assert subgraph.bfs(1) == EDGES[:2]
+    assert subgraph.bfs(2) == [EDGES[0], EDGES[1], EDGES[2], EDGES[4]]
+    assert subgraph.bfs(3) == [EDGES[0], EDGES[1], EDGES[2], EDGES[4], EDGES[3]]
+    assert subgraph.bfs(3, limit=2) == EDGES[:2]
+    assert AccountSubgraph("nobody", []).bfs(2) == []
+
+
+def test_loads_once_at_load_depth_and_serves_shallower_depths():
+    calls = []
+
+    def loader(account_id, depth):
+        calls.append((account_id, depth))
+        return EDGES
+
+    cache = GraphCache(loader, load_depth=2)
+    assert cache.get("acme", depth=1) == EDGES[:2]
+    assert cache.get("acme", depth=2) == [EDGES[0], EDGES[1], EDGES[2], EDGES[4]]
+    assert calls == [("acme", 2)]
+    assert cache.get("acme", depth=3)[-1] == EDGES[3]
+    assert calls == [("acme", 2), ("acme", 3)]
+    assert (cache.hits, cache.misses) == (1, 2)
+    with pytest.raises(ValueError):
+        cache.get("acme", depth=4)
+
+
+def test_entries_expire_and_evict_least_recently_used(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.graph_cache.time.monotonic", lambda: now[0])
+    cache = GraphCache(lambda account_id, depth: [], max_accounts=2, ttl_seconds=10)
+    for account in ("a", "b"):
+        cache.get(account)
+    cache.get("a")
+    cache.get("c")
+    assert cache.lookup("b", 2) is None
+    assert cache.lookup("a", 2) == []
+    now[0] += 11
+    assert cache.lookup("a", 2) is None
+
+
+def test_failed_loads_raise_and_cache_nothing():
+    def loader(account_id, depth):
+        raise ConnectionError("neo4j down")
+
+    cache = GraphCache(loader)
+    with pytest.raises(ConnectionError):
+        cache.get("acme")
+    assert cache.load_errors == 1
+    assert cache.lookup("acme", 2) is None
+
+
+class FakeSession:
+    def __init__(self, runs):
+        self.runs = runs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.runs.append((query, params))
+        return [{"source": "acme", "target": "Jane Doe", "relation": "hasExecutive"}]
+
+
+def test_neo4j_loader_binds_the_account_and_depth():
+    runs = []
+    load = neo4j_subgraph_loader(type("Driver", (), {"session": lambda self: FakeSession(runs)})(), limit=50)
+    account_id = 'acme"}) DETACH DELETE acc //'
+    assert load(account_id, 2) == [{"from": "acme", "to": "Jane Doe", "relation": "hasExecutive"}]
+    query, params = runs[0]
+    assert params == {"account_id": account_id, "depth": 2, "limit": 50}
+    assert query == ACCOUNT_SUBGRAPH_CYPHER and account_id not in query
+
+
+def test_invalidation_drops_entries_and_racing_loads():
+    cache = GraphCache(lambda account_id, depth: [])
+
+    def racing_loader(account_id, depth):
+        # Ingestion invalidates the account while this load is in flight
+        cache.invalidate(account_id)
+        return EDGES
+
+    cache.get("globex")
+    cache.loader = racing_loader
+    cache.get("acme")
+    assert cache.lookup("acme", 2) is None
+    assert cache.invalidate() == 1
+    assert cache.stats()["accounts"] == 0
+
+
+def test_graph_endpoint_bounds_the_depth():
+    from fastapi.testclient import TestClient
+
+    from src.main import app
+
+    client = TestClient(app)
+    assert client.get("/api/graph/acme", params={"depth": 50}).status_code == 422
+    assert client.get("/api/graph/acme", params={"depth": 0}).status_code == 422
+    assert client.get("/api/graph/acme", params={"depth": 3}).status_code == 200
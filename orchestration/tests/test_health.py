@@ -0,0 +1,31 @@
+from src.health import CONNECTING, DISABLED, FAILED, PENDING, READY, BackendStatus
+
+
+def test_ready_once_every_backend_settled_and_required_ones_connected():
+    status = BackendStatus(["postgres", "neo4j", "vector"])
+    assert not status.is_ready()
+    status.set("postgres", READY)
+    status.set("neo4j", DISABLED)
+    status.set("vector", CONNECTING)
+    assert not status.is_ready() and not status.settled()
+    status.set("vector", FAILED, error="timeout")
+    assert status.settled()
+    assert status.is_ready(required=["postgres"])
+    assert not status.is_ready(required=["postgres", "vector"])
+    assert status.failed() == ["vector"]
+
+
+def test_attempts_and_transitions_are_tracked(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.health.time.time", lambda: now[0])
+    status = BackendStatus(["neo4j"])
+    assert status.state("neo4j") == PENDING and status.state("unknown") == PENDING
+    for state in (CONNECTING, FAILED, CONNECTING):
+        now[0] += 1
+        status.set("neo4j", state, error="refused" if state == FAILED else None)
+    now[0] += 1
+    status.set("neo4j", CONNECTING)
+    entry = status.snapshot()["neo4j"]
+    assert entry == {"state": CONNECTING, "since": 1003.0, "error": None, "attempts": 3}
+    entry["state"] = READY
+    assert status.state("neo4j") == CONNECTING
@@ -0,0 +1,64 @@
+from src.kvstore import SqliteKVStore
+
+
+def store(tmp_path, **kwargs):
+    return SqliteKVStore(str(tmp_path / "kv.sqlite"), **kwargs)
+
+
+def test_round_trip_and_batches(tmp_path):
+    kv = store(tmp_path)
+    kv.put("a", b"1")
+    kv.put_many([(f"k{i:04d}", str(i).encode()) for i in range(1200)])
+    assert kv.get("a") == b"1"
+    assert kv.get("missing") is None
+    assert kv.get_many(["a", "k0007", "missing"]) == {"a": b"1", "k0007": b"7"}
+    assert len(kv.get_many([f"k{i:04d}" for i in range(1200)])) == 1200
+    keys = [key for key, _ in kv.items(batch=100)]
+    assert keys == sorted(keys) and len(keys) == 1201
+    kv.close()
+    assert SqliteKVStore(str(tmp_path / "kv.sqlite")).get("a") == b"1"
+
+
+def test_expired_entries_are_invisible(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.kvstore.time.time", lambda: now[0])
+    kv = store(tmp_path, ttl_seconds=10)
+    kv.put("a", b"1")
+    kv.put("forever", b"2", ttl=1e9)
+    assert kv.get_with_expiry("a") == (b"1", 1010.0)
+    now[0] += 11
+    assert kv.get("a") is None
+    assert kv.get_many(["a", "forever"]) == {"forever": b"2"}
+    assert [key for key, _ in kv.items()] == ["forever"]
+
+
+def test_put_if_absent_respects_live_entries_only(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.kvstore.time.time", lambda: now[0])
+    first = store(tmp_path, table="leases", ttl_seconds=5)
+    second = store(tmp_path, table="leases", ttl_seconds=5)
+    assert first.put_if_absent("key", b"first")
+    assert not second.put_if_absent("key", b"second")
+    now[0] += 6
+    assert second.put_if_absent("key", b"second")
+    assert first.get("key") == b"second"
+
+
+def test_max_bytes_evicts_oldest_writes(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.kvstore.time.time", lambda: now[0])
+    kv = store(tmp_path, max_bytes=1000)
+    for i in range(20):
+        now[0] += 1
+        kv.put(f"k{i}", b"x" * 100)
+    assert kv.evictions > 0
+    assert kv.get("k0") is None and kv.get("k19") is not None
+    assert sum(len(value) for _, value in kv.items()) <= 1000
+
+
+def test_delete_prefix(tmp_path):
+    kv = store(tmp_path)
+    kv.put_many([("acme\x1fa", b""), ("acme\x1fb", b""), ("acmex\x1fa", b"")])
+    assert kv.delete_prefix("acme\x1f") == 2
+    kv.delete("acmex\x1fa")
+    assert len(kv) == 0
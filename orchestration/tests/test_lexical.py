@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from src import lexical
+from src.lexical import LexicalIndex, tokenize
+
+
+def add(index, docs, account="acme"):
+    ids = list(docs)
+    index.add(ids, [docs[i] for i in ids], [account] * len(ids), [{"title": i} for i in ids])
+
+
+def log_lines(path):
+    with open(os.path.join(path, "docs.jsonl"), "rb") as f:
+        return f.read().splitlines()
+
+
+def test_tokenize_keeps_tickers_and_drops_stopwords():
+    assert tokenize("The BRK.B and AT&T filings of 2024") == ["brk.b", "at&t", "filings", "2024"]
+
+
+def test_bm25_ranks_exact_term_matches(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    add(index, {"d1": "quarterly revenue grew", "d2": "Snowflake renewal pricing", "d3": "revenue revenue outlook"})
+    add(index, {"d4": "Snowflake migration"}, account="globex")
+    assert [hit["id"] for hit in index.search("revenue")] == ["d3", "d1"]
+    assert [hit["id"] for hit in index.search("snowflake", account_id="acme")] == ["d2"]
+    assert index.search("snowflake", account_id="initech") == []
+    assert index.search("the of") == []
+
+
+def test_re_adding_replaces_the_document(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    add(index, {"d1": "old pricing"})
+    add(index, {"d1": "new renewal"})
+    assert len(index) == 1
+    assert index.search("pricing") == []
+    assert [hit["id"] for hit in index.search("renewal")] == ["d1"]
+
+
+@pytest.fixture
+def small_compaction(monkeypatch):
+    monkeypatch.setattr(lexical, "MIN_DEAD_FOR_COMPACTION", 3)
+
+
+def test_compaction_rewrites_the_log(tmp_path, small_compaction):
+    index = LexicalIndex(str(tmp_path))
+    add(index, {"d1": "alpha", "d2": "beta"})
+    for version in range(3):
+        add(index, {"d1": f"alpha v{version}"})
+    assert index.stats()["dead_rows"] == 0
+    lines = log_lines(tmp_path)
+    assert lines[0].startswith(lexical._COMPACTION_HEADER)
+    assert len(lines) == 3
+    assert not os.path.exists(os.path.join(tmp_path, "docs.jsonl.tmp"))
+
+    reopened = LexicalIndex(str(tmp_path))
+    assert len(reopened) == 2
+    assert [hit["id"] for hit in reopened.search("v2")] == ["d1"]
+    assert reopened.search("v1") == []
+
+
+def test_other_processes_reload_a_rewritten_log(tmp_path, small_compaction):
+    writer = LexicalIndex(str(tmp_path))
+    reader = LexicalIndex(str(tmp_path))
+    add(writer, {"d1": "alpha", "d2": "beta"})
+    assert len(reader.search("beta")) == 1
+    for version in range(4):
+        add(writer, {"d1": f"alpha v{version}"})
+    add(writer, {"d3": "gamma"})
+    assert [hit["id"] for hit in reader.search("gamma")] == ["d3"]
+    assert [hit["id"] for hit in reader.search("v3")] == ["d1"]
+    assert len(reader) == 3
+    # Appends by the stale reader land in the rewritten log
+    add(reader, {"d4": "delta"})
+    assert [hit["id"] for hit in writer.search("delta")] == ["d4"]
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src import llm
+from src.router import RouteDecision
+
+ANSWER = {"insight": "Renewal at risk", "confidence": 0.8, "sources": []}
+
+
+class FakeStream:
+    def __init__(self, deltas, delay):
+        self.deltas = deltas
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.delay)
+        for delta in self.deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], usage=None)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    def __init__(self, text, delays=None, error=None, failing=None):
+        self.text = text
+        self.delays = delays or {}
+        self.error = error
+        # Models the error applies to (all of them if None)
+        self.failing = failing
+        self.models = []
+        self.streams = []
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        self.models.append(model)
+        if self.error is not None and (self.failing is None or model in self.failing):
+            raise self.error
+        if stream:
+            self.streams.append(FakeStream([self.text[:10], self.text[10:]], self.delays.get(model, 0)))
+            return self.streams[-1]
+        message = SimpleNamespace(content=self.text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    def install(*args, **kwargs):
+        fake = FakeCompletions(*args, **kwargs)
+        monkeypatch.setattr(llm, "_client", SimpleNamespace(chat=SimpleNamespace(completions=fake)))
+        return fake
+
+    return install
+
+
+def test_parse_tolerates_fences_and_prose():
+    text = json.dumps(ANSWER)
+    assert llm.parse_synthesis_output(text, "m") == ANSWER
+    assert llm.parse_synthesis_output(f"Here you go:\n```json\n{text}\n```", "m") == ANSWER
+    raw = llm.parse_synthesis_output("no json at all", "m")
+    assert raw["insight"] == "no json at all" and raw["confidence"] == 0.6
+
+
+def test_synthesis_returns_the_parsed_answer_with_its_model(completions):
+    fake = completions(json.dumps(ANSWER))
+    result = asyncio.run(llm.query_groq_for_synthesis("ctx", "q?", route=RouteDecision("deep-model", "deep", "test")))
+    assert result == dict(ANSWER, model="deep-model")
+    assert fake.models == ["deep-model"]
+
+
+def test_synthesis_falls_back_when_groq_fails(completions):
+    completions("", error=RuntimeError("invalid api key"))
+    result = asyncio.run(llm.query_groq_for_synthesis("ctx", "q?"))
+    assert result["fallback"] is True
+
+
+def test_hedged_call_keeps_the_first_model_to_answer(completions):
+    fake = completions(json.dumps(ANSWER), delays={"deep-model": 5})
+    route = RouteDecision("deep-model", "deep", "test", hedge_model="fast-model", hedge_after=0.01)
+    result = asyncio.run(llm.query_groq_for_synthesis("ctx", "q?", route=route))
+    assert result == dict(ANSWER, model="fast-model")
+    assert fake.models == ["deep-model", "fast-model"]
+    assert route.served_by == "fast-model"
+
+
+def test_hedge_starts_at_once_when_the_primary_fails_early(completions):
+    fake = completions(json.dumps(ANSWER), error=RuntimeError("rate limited"), failing={"deep-model"})
+    route = RouteDecision("deep-model", "deep", "test", hedge_model="fast-model", hedge_after=5)
+
+    async def timed():
+        start = asyncio.get_running_loop().time()
+        result = await llm.query_groq_for_synthesis("ctx", "q?", route=route)
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(timed())
+    assert result == dict(ANSWER, model="fast-model")
+    assert fake.models == ["deep-model", "fast-model"]
+    assert elapsed < 1
+
+
+def test_stream_yields_deltas_without_hedging(completions):
+    fake = completions(json.dumps(ANSWER))
+
+    async def collect():
+        return [delta async for delta in llm.stream_groq_for_synthesis("ctx", "q?")]
+
+    deltas = asyncio.run(collect())
+    assert len(deltas) == 2 and json.loads("".join(deltas)) == ANSWER
+    assert not fake.streams[0].closed
@@ -0,0 +1,47 @@
+import os
+
+from src.metrics import CacheCollector, RequestProfiler, server_timing, stage, start_trace
+
+
+def test_stages_are_recorded_into_the_request_trace():
+    assert server_timing([]) == ""
+    with stage("outside"):
+        pass
+    trace = start_trace()
+    with stage("retrieval"):
+        pass
+    try:
+        with stage("synthesis"):
+            raise ValueError
+    except ValueError:
+        pass
+    assert [name for name, _ in trace] == ["retrieval", "synthesis"]
+    assert server_timing([("retrieval", 0.0125), ("synthesis", 1.5)]) == "retrieval;dur=12.50, synthesis;dur=1500.00"
+
+
+def test_cache_collector_skips_failing_stats():
+    collector = CacheCollector()
+    collector.register("briefing", lambda: {"hits": 3, "misses": 1, "entries": 2})
+    collector.register("broken", lambda: 1 / 0)
+    families = {family.name: family for family in collector.collect()}
+    assert [(s.labels, s.value) for s in families["salesai_cache_hits"].samples] == [({"cache": "briefing"}, 3)]
+    assert families["salesai_cache_entries"].samples[0].value == 2
+
+
+def test_profiler_is_opt_in_and_rate_limited(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.metrics.time.monotonic", lambda: now[0])
+    assert not RequestProfiler(False, "unused").should_profile(True)
+    profiler = RequestProfiler(True, "unused", max_per_minute=2)
+    assert not profiler.should_profile(False)
+    assert [profiler.should_profile(True) for _ in range(3)] == [True, True, False]
+    now[0] += 60
+    assert profiler.should_profile(True)
+
+
+def test_profile_writes_a_report(tmp_path):
+    profiler = RequestProfiler(True, str(tmp_path))
+    with profiler.profile("briefing") as result:
+        sum(range(1000))
+    assert os.path.exists(result["path"]) and "-briefing-" in result["path"]
+    assert not profiler._active
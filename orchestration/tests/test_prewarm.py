@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from src.models import UpcomingMeeting
+from src.prewarm import FileMeetingSource, PrewarmScheduler, QueueMeetingSource
+
+
+def meeting(meeting_id, minutes, account_id="acme"):
+    start = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    return UpcomingMeeting(meeting_id=meeting_id, account_id=account_id, start_time=start)
+
+
+def scheduler(sources, warm):
+    return PrewarmScheduler(sources, warm, lead_time=timedelta(minutes=30), max_per_minute=60000)
+
+
+def test_warms_meetings_inside_the_lead_time_soonest_first_and_once():
+    source = QueueMeetingSource()
+    for m in (meeting("later", 20), meeting("soon", 5), meeting("tomorrow", 24 * 60), meeting("past", -5)):
+        source.push(m)
+    warmed = []
+
+    async def warm(m):
+        warmed.append(m.meeting_id)
+
+    prewarm = scheduler([source], warm)
+
+    async def run():
+        return await prewarm.run_once(), await prewarm.run_once()
+
+    assert asyncio.run(run()) == (2, 0)
+    assert warmed == ["soon", "later"]
+    stats = prewarm.stats()
+    assert (stats["pending_meetings"], stats["warmed_upcoming_meetings"]) == (0, 2)
+
+
+def test_failed_warms_are_retried_on_the_next_cycle():
+    source = QueueMeetingSource()
+    source.push(meeting("m1", 5))
+    attempts = []
+
+    async def warm(m):
+        attempts.append(m.meeting_id)
+        if len(attempts) == 1:
+            raise RuntimeError("groq unavailable")
+
+    prewarm = scheduler([source], warm)
+
+    async def run():
+        first = await prewarm.run_once()
+        pending = prewarm.stats()["pending_meetings"]
+        return first, pending, await prewarm.run_once()
+
+    assert asyncio.run(run()) == (0, 1, 1)
+    assert prewarm.stats()["pending_meetings"] == 0
+    assert (prewarm.failed, prewarm.warmed) == (1, 1)
+
+
+def test_file_source_rereads_the_file_when_it_changes(tmp_path):
+    path = tmp_path / "meetings.json"
+    source = FileMeetingSource(str(path))
+    until = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    def write(*meetings):
+        path.write_text(json.dumps([m.model_dump(mode="json") for m in meetings]))
+
+    async def run():
+        assert await source.upcoming(until) == []
+        write(meeting("m1", 10), meeting("m2", 120))
+        first = [m.meeting_id for m in await source.upcoming(until)]
+        write(meeting("m3", 10))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        return first, [m.meeting_id for m in await source.upcoming(until)]
+
+    assert asyncio.run(run()) == (["m1"], ["m3"])
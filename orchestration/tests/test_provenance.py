@@ -0,0 +1,22 @@
+from src.models import Citation
+from src.provenance import ProvenanceStore, insight_id
+
+
+def test_insight_ids_are_stable_per_input():
+    args = ("acme", "ae", "Renewal risk?", "context", "Renewal slips to Q3")
+    assert insight_id(*args) == insight_id("acme", "ae", "  renewal risk? ", "context", "Renewal slips to Q3")
+    assert insight_id(*args) != insight_id(*args, index=1)
+    assert insight_id(*args).startswith("ins_")
+
+
+def test_records_round_trip_with_models(tmp_path):
+    store = ProvenanceStore(str(tmp_path / "provenance.sqlite"))
+    citation = Citation(source_url="https://news/1", title="Acme renewal", text_snippet="slips to Q3",
+                        retrieval_method="vector", confidence=0.9)
+    record = {"insight": "Renewal slips to Q3", "citations": [citation]}
+    store.put("ins_1", record)
+    loaded = store.get("ins_1")
+    assert loaded["insight"] == "Renewal slips to Q3"
+    assert loaded["citations"][0]["source_url"] == "https://news/1"
+    assert store.get("ins_missing") is None
+    assert store.stats() == {"records": 1, "writes": 1, "reads": 2, "misses": 1, "evictions": 0}
@@ -0,0 +1,23 @@
+import json
+from datetime import datetime, timezone
+
+from src.models import UpcomingMeeting
+from src.responses import FastJSONResponse, dump_json
+
+
+def test_dump_json_serializes_models_inside_plain_containers():
+    start = datetime(2026, 1, 5, 9, 30, tzinfo=timezone.utc)
+    meeting = UpcomingMeeting(meeting_id="m1", account_id="acme", start_time=start)
+    body = dump_json({"meetings": [meeting], "count": 1})
+    assert b" " not in body
+    decoded = json.loads(body)
+    assert decoded["meetings"][0] == meeting.model_dump(mode="json")
+    assert decoded["meetings"][0]["start_time"] == "2026-01-05T09:30:00Z"
+
+
+def test_fast_json_response_renders_models_with_content_type():
+    meeting = UpcomingMeeting(meeting_id="m1", account_id="acme", start_time=datetime.now(timezone.utc))
+    response = FastJSONResponse(meeting, status_code=201)
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body)["meeting_id"] == "m1"
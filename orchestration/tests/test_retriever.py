@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.db import PooledConnection
+from src.retriever import SOURCE_ERROR, SOURCE_OK, SOURCE_SKIPPED, SOURCE_TIMEOUT, HybridRetriever, reciprocal_rank_fusion
+
+
+def test_rrf_merges_a_document_found_by_several_sources():
+    fused = reciprocal_rank_fusion({
+        "vector_results": [{"id": "d1", "score": 0.9, "text": "snippet"}, {"id": "d2", "score": 0.8}],
+        "lexical_results": [{"id": "d2", "score": 7.1, "title": "Deal"}, {"id": "d3", "score": 3.0}],
+        "sql_metadata": [{"id": "d3", "title": "Other"}],
+    }, k=60)
+    assert [entry["item"]["id"] for entry in fused] == ["d2", "d3", "d1"]
+    d2 = fused[0]
+    assert d2["rrf_score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert (d2["source"], d2["rank"], d2["sources"]) == ("lexical", 1, ["vector", "lexical"])
+    # Fields of the best-ranked source win, the others are kept
+    assert d2["item"] == {"id": "d2", "score": 7.1, "title": "Deal"}
+
+
+def test_rrf_keeps_graph_edges_apart_and_breaks_ties_by_source_order():
+    edge = {"from": "acme", "to": "Jane Doe", "relation": "hasExecutive"}
+    fused = reciprocal_rank_fusion({
+        "vector_results": [{"id": "d1"}],
+        "graph_context": [edge, dict(edge, relation="boardMember")],
+    })
+    assert [entry["source"] for entry in fused] == ["vector", "graph", "graph"]
+    assert fused[1]["item"] == edge
+    assert reciprocal_rank_fusion({}) == []
+
+
+def retriever(**kwargs):
+    return HybridRetriever("dbname=none", "localhost", 19530, "neo4j://localhost", "neo4j", "pw", **kwargs)
+
+
+def test_hybrid_search_bounds_slow_and_failing_sources(monkeypatch):
+    r = retriever(source_timeouts={"sql": 0.05, "graph": 1.0})
+
+    def slow_sql(account_id, limit=10):
+        time.sleep(0.5)
+        return [{"id": "late"}]
+
+    def broken_vector(embedding, top_k=5, account_id=None):
+        raise RuntimeError("milvus down")
+
+    monkeypatch.setattr(r, "sql_search", slow_sql)
+    monkeypatch.setattr(r, "vector_search", broken_vector)
+
+    async def timed_search():
+        # Timed in the loop, so only hybrid_search's own wait counts
+        start = time.perf_counter()
+        results = await r.hybrid_search([0.1, 0.2], "acme", "renewal")
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(timed_search())
+    assert elapsed < 0.4
+    status = {name: s["status"] for name, s in results["status"].items()}
+    assert status == {"vector": SOURCE_ERROR, "lexical": SOURCE_SKIPPED, "graph": SOURCE_SKIPPED, "sql": SOURCE_TIMEOUT}
+    assert results["sql_metadata"] == [] and results["vector_results"] == []
+    # Neo4j is disabled: no graph, and nothing made up in its place
+    assert results["graph_context"] == [] and results["fused_results"] == []
+    r.close()
+
+
+def test_unreachable_neo4j_contributes_no_edges(monkeypatch):
+    r = retriever(neo4j_enabled=True)
+
+    def unreachable(account_id, depth):
+        raise ConnectionError("neo4j down")
+
+    monkeypatch.setattr(r.graph_cache, "loader", unreachable)
+    results = asyncio.run(r.hybrid_search(None, "acme", "", sources=("graph",)))
+    assert results["status"]["graph"]["status"] == SOURCE_ERROR
+    assert results["graph_context"] == [] and results["fused_results"] == []
+    assert r.graph_cache.lookup("acme", 2) is None
+    r.close()
+
+
+def test_hybrid_search_skips_unlisted_sources(monkeypatch):
+    r = retriever()
+    monkeypatch.setattr(r, "sql_search", lambda account_id, limit=10: [{"id": "d1"}])
+    results = asyncio.run(r.hybrid_search(None, "acme", "", sources=("sql",)))
+    assert {name: s["status"] for name, s in results["status"].items()} == {
+        "vector": SOURCE_SKIPPED, "lexical": SOURCE_SKIPPED, "graph": SOURCE_SKIPPED, "sql": SOURCE_OK,
+    }
+    assert [entry["item"]["id"] for entry in results["fused_results"]] == ["d1"]
+    r.close()
+
+
+class RecordingCursor:
+    def __init__(self, executed):
+        self.executed = executed
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        self.description = [("id",)] if sql.startswith("EXECUTE") else None
+
+    def fetchall(self):
+        return [("d1", "Acme renews early", "news", "https://news/1")]
+
+
+class RecordingConnection:
+    closed = 0
+
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return RecordingCursor(self.executed)
+
+
+def test_sql_search_is_cancelled_server_side_at_its_deadline(monkeypatch):
+    r = retriever(source_timeouts={"sql": 0.25})
+    conn = RecordingConnection()
+    monkeypatch.setattr(r.pg_pool, "_connect", lambda: PooledConnection(conn))
+    assert r.sql_search("acme") == [{"id": "d1", "title": "Acme renews early", "source": "news", "url": "https://news/1"}]
+    assert conn.executed[:2] == ["BEGIN", "SET LOCAL statement_timeout = 250"]
+    assert conn.executed[-1] == "COMMIT"
+    r.close()
+
+
+def test_sql_searches_queued_past_their_deadline_never_run(monkeypatch):
+    # One pooled connection, so one SQL thread: the second search waits behind the first
+    r = retriever(source_timeouts={"sql": 0.05}, pg_pool_options={"max_size": 1})
+    release = threading.Event()
+    calls = []
+
+    def slow_sql(account_id, limit=10):
+        calls.append(account_id)
+        release.wait(1)
+        return []
+
+    monkeypatch.setattr(r, "sql_search", slow_sql)
+
+    async def search_both():
+        return await asyncio.gather(
+            r.hybrid_search(None, "acme", "", sources=("sql",)),
+            r.hybrid_search(None, "beta", "", sources=("sql",)),
+        )
+
+    results = asyncio.run(search_both())
+    release.set()
+    time.sleep(0.05)
+    assert [result["status"]["sql"]["status"] for result in results] == [SOURCE_TIMEOUT, SOURCE_TIMEOUT]
+    assert calls == ["acme"]
+    r.close()
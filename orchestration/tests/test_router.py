@@ -0,0 +1,63 @@
+import pytest
+
+from src.admission import BATCH
+from src.config import settings
+from src.router import ModelRouter, build_model_router, parse_routes
+
+TIERS = {"deep": "big-model", "fast": "small-model"}
+
+
+def router(routes, **kwargs):
+    return ModelRouter(TIERS, routes, default_tier="deep", hedge_tier="fast", **kwargs)
+
+
+def test_parse_routes():
+    assert parse_routes(" sdr=fast, ae=deep,*:calendar=deep,") == {"sdr": "fast", "ae": "deep", "*:calendar": "deep"}
+    assert parse_routes("") == {}
+
+
+def test_most_specific_route_wins():
+    r = router({"*": "fast", "*:calendar": "deep", "sdr": "fast", "sdr:calendar": "deep"})
+    assert r.route("sdr", "calendar").reason == "route sdr:calendar"
+    assert r.route("sdr", "manual").reason == "route sdr"
+    assert r.route("ae", "calendar").reason == "route *:calendar"
+    decision = r.route("ae", "manual")
+    assert (decision.reason, decision.model) == ("route *", "small-model")
+
+
+def test_unmatched_calls_use_default_tier():
+    decision = router({"sdr": "fast"}).route("ae")
+    assert (decision.tier, decision.model, decision.reason) == ("deep", "big-model", "default")
+
+
+def test_unknown_tier_is_rejected():
+    with pytest.raises(ValueError):
+        router({"sdr": "medium"})
+
+
+def test_only_interactive_deep_calls_are_hedged():
+    r = router({"sdr": "fast"}, hedge_after_ms=1500)
+    decision = r.route("ae")
+    assert (decision.hedge_model, decision.hedge_after) == ("small-model", 1.5)
+    assert r.route("ae", priority=BATCH).hedge_model is None
+    assert r.route("sdr").hedge_model is None
+    assert router({}).route("ae").hedge_model is None
+
+
+def test_latency_budget_swaps_slow_tier():
+    r = router({}, min_samples=3)
+    assert r.route("ae", latency_budget_ms=1000).tier == "deep"  # no history yet
+    for _ in range(3):
+        r.record_call("big-model", 3.0)
+        r.record_call("small-model", 0.5)
+    decision = r.route("ae", latency_budget_ms=1000)
+    assert decision.tier == "fast"
+    assert decision.reason.startswith("p90 3000ms")
+    assert r.route("ae", latency_budget_ms=5000).tier == "deep"
+
+
+def test_default_settings_route_everything_to_groq_model():
+    r = build_model_router()
+    for role in ("sdr", "ae", "csm"):
+        decision = r.route(role)
+        assert (decision.model, decision.hedge_model) == (settings.groq_model, None)
@@ -0,0 +1,82 @@
+import numpy as np
+
+from src.retriever import SOURCE_OK, SOURCE_SKIPPED, SOURCE_TIMEOUT
+from src.semantic_cache import SemanticAnswerCache, account_context_version
+
+DIM = 8
+
+
+def unit(*values):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[: len(values)] = values
+    return vector
+
+
+def test_similar_queries_hit_while_the_context_is_unchanged():
+    cache = SemanticAnswerCache(DIM, threshold=0.9)
+    cache.put("acme", "ae", "v1", "renewal risk?", unit(1, 0), "answer")
+    hit = cache.lookup("acme", "ae", "v1", unit(1, 0.2))
+    assert (hit.value, hit.query) == ("answer", "renewal risk?")
+    assert hit.similarity > 0.9
+    assert cache.lookup("acme", "ae", "v1", unit(0, 1)) is None
+    assert cache.lookup("acme", "sdr", "v1", unit(1, 0)) is None
+    assert cache.lookup("acme", "ae", None, unit(1, 0)) is None
+    assert cache.lookup("acme", "ae", "v2", unit(1, 0)) is None
+    # The new version dropped the old answers
+    assert cache.lookup("acme", "ae", "v1", unit(1, 0)) is None
+    assert cache.misses == {"empty": 2, "stale": 1, "unversioned": 1, "below_threshold": 1}
+    assert cache.hits == 1
+
+
+def test_answers_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.semantic_cache.time.monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(DIM, ttl_seconds=10)
+    cache.put("acme", "ae", "v1", "q", unit(1), "answer")
+    now[0] += 11
+    assert cache.lookup("acme", "ae", "v1", unit(1)) is None
+    assert cache.misses["empty"] == 1
+
+
+def test_bucket_overwrites_oldest_when_full_and_reuses_same_wording():
+    cache = SemanticAnswerCache(DIM, max_per_account=2)
+    cache.put("acme", "ae", "v1", "q0", unit(1, 0, 0), "a0")
+    cache.put("acme", "ae", "v1", "q0", unit(1, 0, 0), "a0 again")
+    cache.put("acme", "ae", "v1", "q1", unit(0, 1, 0), "a1")
+    cache.put("acme", "ae", "v1", "q2", unit(0, 0, 1), "a2")
+    assert len(cache) == 2
+    assert cache.lookup("acme", "ae", "v1", unit(1, 0, 0)) is None
+    assert cache.lookup("acme", "ae", "v1", unit(0, 0, 1)).value == "a2"
+
+
+def test_least_recently_used_accounts_are_dropped_and_invalidate():
+    cache = SemanticAnswerCache(DIM, max_accounts=2)
+    for account in ("a", "b"):
+        cache.put(account, "ae", "v1", "q", unit(1), account)
+    cache.lookup("a", "ae", "v1", unit(1))
+    cache.put("c", "ae", "v1", "q", unit(1), "c")
+    assert cache.lookup("b", "ae", "v1", unit(1)) is None
+    assert cache.invalidate("a") == 1
+    assert len(cache) == 1
+
+
+def test_audits_count_false_hits():
+    cache = SemanticAnswerCache(DIM, audit_min_agreement=0.8)
+    cache.put("acme", "ae", "v1", "q", unit(1), "answer")
+    hit = cache.lookup("acme", "ae", "v1", unit(1))
+    assert cache.record_audit("q'", hit, 0.95) == "agree"
+    assert cache.record_audit("q''", hit, 0.3) == "false_hit"
+    assert cache.record_audit("q'''", hit, None) == "error"
+    stats = cache.stats()
+    assert stats["false_hit_rate"] == 0.5
+    assert stats["recent_false_hits"][0]["cached_query"] == "q"
+
+
+def test_account_context_version():
+    results = {"graph_context": [{"from": "a", "to": "b"}], "sql_metadata": [{"id": "d1"}],
+               "status": {"graph": {"status": SOURCE_OK}, "sql": {"status": SOURCE_OK}}}
+    version = account_context_version(results)
+    assert version == account_context_version(dict(results, vector_results=[{"id": "x"}]))
+    assert version != account_context_version(dict(results, sql_metadata=[{"id": "d2"}]))
+    assert account_context_version(dict(results, status={"sql": {"status": SOURCE_TIMEOUT}})) is None
+    assert account_context_version(dict(results, status={"graph": {"status": SOURCE_SKIPPED}})) == version
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from src.cache import BriefingCache, SharedCacheTier
+
+KEY = ("a", "ae", "q", "ctx")
+
+
+def shared_tier(tmp_path):
+    return SharedCacheTier(
+        str(tmp_path / "briefings.sqlite"),
+        dumps=lambda value: json.dumps(value).encode(),
+        loads=json.loads,
+        lease_seconds=5,
+        poll_seconds=0.01,
+    )
+
+
+def test_origin_ignores_expired_entries(monkeypatch):
+    cache = BriefingCache(ttl_seconds=10)
+    now = [100.0]
+    monkeypatch.setattr("src.cache.time.monotonic", lambda: now[0])
+    asyncio.run(cache.set(KEY, "briefing", origin="prewarm"))
+    assert cache.origin(KEY) == "prewarm"
+    now[0] += 11
+    assert cache.origin(KEY) is None
+
+
+def test_shared_tier_serves_other_workers(tmp_path):
+    first = BriefingCache(shared=shared_tier(tmp_path))
+    second = BriefingCache(shared=shared_tier(tmp_path))
+
+    async def run():
+        await first.set(KEY, {"summary": "s"}, origin="prewarm")
+        return await second.get(KEY)
+
+    assert asyncio.run(run()) == {"summary": "s"}
+    assert second.shared_hits == 1
+    assert second.origin(KEY) == "prewarm"
+    first.close()
+    second.close()
+
+
+def test_shared_lease_makes_other_workers_wait(tmp_path):
+    # Two caches on one file stand in for two worker processes
+    first = BriefingCache(shared=shared_tier(tmp_path))
+    second = BriefingCache(shared=shared_tier(tmp_path))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"summary": "s"}
+
+    async def run():
+        leader = asyncio.create_task(first.get_or_compute(KEY, compute))
+        await asyncio.sleep(0.02)
+        follower = await second.get_or_compute(KEY, compute)
+        return await leader, follower
+
+    assert asyncio.run(run()) == ({"summary": "s"}, {"summary": "s"})
+    assert len(calls) == 1
+    assert second.shared_waits == 1
+    first.close()
+    second.close()
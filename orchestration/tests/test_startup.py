@@ -0,0 +1,100 @@
+"""
+Importing the API must not load the embedding model (torch, weights): that happens in the
+background. A started app answers at once and its readiness reflects backends that failed.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import httpx
+
+from bench.loadtest import ORCHESTRATION_DIR, app_env, free_port
+
+# Spawn to first response, and the first (degraded) briefing; generous for slow CI machines
+FIRST_RESPONSE_BUDGET_S = 10.0
+
+CHECK = textwrap.dedent("""
+    import sys
+    import src.main
+    from src.config import settings
+    assert settings.embedding_backend == "sentence-transformers", settings.embedding_backend
+    assert not src.main.embedding_service.model.loaded
+    assert "sentence_transformers" not in sys.modules and "torch" not in sys.modules
+    try:
+        src.main.embedding_service.load()
+    except RuntimeError as e:
+        print("load:", e)
+""")
+
+
+def test_import_does_not_load_the_default_embedding_model(tmp_path):
+    # Stands in for the real package: importing it at all means the model was loaded
+    (tmp_path / "sentence_transformers.py").write_text("raise RuntimeError('model loaded')\n")
+    env = dict(os.environ, EMBEDDING_BACKEND="sentence-transformers")
+    env["PYTHONPATH"] = os.pathsep.join([str(tmp_path), ORCHESTRATION_DIR])
+    out = subprocess.run(
+        [sys.executable, "-c", CHECK], cwd=ORCHESTRATION_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert out.returncode == 0, out.stderr
+    # load() is what imports the package
+    assert "load: model loaded" in out.stdout
+
+
+def wait_for(client, method, url, accept, timeout):
+    """The first response `accept` takes within `timeout` seconds of now."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = client.request(method, url)
+            if accept(response):
+                return response
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise AssertionError(f"no acceptable response from {method} {url} within {timeout}s")
+
+
+def test_first_requests_are_answered_promptly_and_readiness_reports_failed_backends(tmp_path):
+    (tmp_path / "sentence_transformers.py").write_text("raise ImportError('No module named torch')\n")
+    groq_port, app_port = free_port(), free_port()
+    env = app_env(str(tmp_path), f"http://127.0.0.1:{groq_port}/openai/v1/chat/completions")
+    env.update(EMBEDDING_BACKEND="sentence-transformers", PYTHONPATH=os.pathsep.join([str(tmp_path), ORCHESTRATION_DIR]))
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "bench.fake_groq", "--port", str(groq_port), "--latency-ms", "0", "--jitter-ms", "0",
+             "--first-token-ms", "0"],
+            cwd=ORCHESTRATION_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ),
+    ]
+    start = time.monotonic()
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+         "--log-level", "warning"],
+        cwd=ORCHESTRATION_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    ))
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{app_port}", timeout=FIRST_RESPONSE_BUDGET_S) as client:
+            wait_for(client, "GET", "/health/live", lambda r: r.status_code == 200, FIRST_RESPONSE_BUDGET_S)
+            assert time.monotonic() - start < FIRST_RESPONSE_BUDGET_S
+
+            # Degraded (no embeddings, no PostgreSQL) but answered
+            started = time.monotonic()
+            briefing = client.post("/api/briefing/acme", params={"query": "renewal risk"})
+            assert briefing.status_code == 200, briefing.text
+            assert time.monotonic() - started < FIRST_RESPONSE_BUDGET_S
+
+            ready = wait_for(
+                client, "GET", "/health/ready", lambda r: r.json()["status"] == "unavailable", FIRST_RESPONSE_BUDGET_S
+            )
+            assert ready.status_code == 503
+            backends = ready.json()["backends"]
+            assert backends["embeddings"]["state"] == "failed"
+            assert "sentence-transformers is not installed" in backends["embeddings"]["error"]
+            assert backends["postgres"]["state"] == "failed"
+            assert ready.json()["required"] == ["embeddings"]
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
@@ -0,0 +1,42 @@
+import json
+
+from src.streaming import IncrementalJSONFieldParser, sse_event
+
+ANSWER = {
+    "summary": 'Renewal at risk, "urgent", see {notes}',
+    "signals": [{"type": "hiring", "detail": "3 roles, [EMEA]"}, {"type": "funding"}],
+    "confidence": 0.82,
+    "path": "C:\\temp\\",
+}
+
+
+def feed_in_pieces(parser, text, size):
+    fields = []
+    for i in range(0, len(text), size):
+        fields.extend(parser.feed(text[i:i + size]))
+    return fields
+
+
+def test_fields_are_emitted_once_complete_whatever_the_chunking():
+    text = "```json\n" + json.dumps(ANSWER, indent=2) + "\n```"
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalJSONFieldParser()
+        assert dict(feed_in_pieces(parser, text, size)) == ANSWER
+        assert parser.done
+
+
+def test_a_field_is_emitted_with_the_delta_that_completes_it():
+    parser = IncrementalJSONFieldParser()
+    assert parser.feed('{"summary": "Renewal, at') == []
+    assert parser.feed(' risk", "confid') == [("summary", "Renewal, at risk")]
+    assert parser.feed("ence\": 0.5}") == [("confidence", 0.5)]
+    assert parser.feed(', "late": 1}') == []
+
+
+def test_unparseable_fields_are_skipped():
+    parser = IncrementalJSONFieldParser()
+    assert parser.feed('{"summary": nope, "confidence": 0.4}') == [("confidence", 0.4)]
+
+
+def test_sse_event_frames_json():
+    assert sse_event("insight", {"key": "summary"}) == b'event: insight\ndata: {"key":"summary"}\n\n'
@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from src.vector_index import MilvusVectorStore, NumpyVectorIndex, milvus_string_literal
+
+DIM = 16
+
+
+def vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def add(index, ids, embeddings, account="acme"):
+    index.add(ids, embeddings, [account] * len(ids), [{"title": doc_id} for doc_id in ids])
+
+
+def test_exact_search_filters_by_account_and_updates_in_place(tmp_path):
+    index = NumpyVectorIndex(str(tmp_path), DIM)
+    data = vectors(3)
+    add(index, ["a", "b"], data[:2])
+    add(index, ["c"], data[2:], account="globex")
+    assert index.search(data[0], top_k=1)[0]["id"] == "a"
+    assert {hit["id"] for hit in index.search(data[2], top_k=3, account_id="acme")} == {"a", "b"}
+    assert index.search(data[0], account_id="initech") == []
+
+    add(index, ["a"], data[2:])
+    assert len(index) == 3
+    hit = index.search(data[2], top_k=1, account_id="acme")[0]
+    assert (hit["id"], round(hit["score"], 4)) == ("a", 1.0)
+
+
+def test_instances_sharing_a_directory_allocate_distinct_rows(tmp_path):
+    first = NumpyVectorIndex(str(tmp_path), DIM)
+    second = NumpyVectorIndex(str(tmp_path), DIM)
+    data = vectors(4)
+    add(first, ["a", "b"], data[:2])
+    # second hasn't searched since; it must still append after first's rows
+    add(second, ["c", "d"], data[2:])
+    reopened = NumpyVectorIndex(str(tmp_path), DIM)
+    assert len(reopened) == 4
+    for doc_id, vector in zip("abcd", data):
+        assert reopened.search(vector, top_k=1)[0]["id"] == doc_id
+
+
+def _write_batches(path, worker, batches):
+    index = NumpyVectorIndex(path, DIM)
+    for batch in range(batches):
+        ids = [f"{worker}-{batch}-{i}" for i in range(5)]
+        add(index, ids, vectors(5, seed=worker * 1000 + batch))
+    index.close()
+
+
+def test_concurrent_writer_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_write_batches, args=(str(tmp_path), w, 20)) for w in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+    index = NumpyVectorIndex(str(tmp_path), DIM)
+    assert len(index) == 3 * 20 * 5
+    for w in range(3):
+        ids = [f"{w}-7-{i}" for i in range(5)]
+        data = vectors(5, seed=w * 1000 + 7)
+        assert index.search(data[3], top_k=1)[0]["id"] == ids[3]
+
+
+def test_ivf_state_is_persisted_with_the_rows(tmp_path):
+    index = NumpyVectorIndex(str(tmp_path), DIM, mode="ivf", nlist=4, nprobe=4, ivf_min_size=50)
+    data = vectors(80)
+    add(index, [f"d{i}" for i in range(60)], data[:60])
+    assert index._ivf_trained_at == 60
+    # Added after training, with no flush or close: a crash here must not lose them
+    add(index, [f"d{i}" for i in range(60, 80)], data[60:])
+
+    reopened = NumpyVectorIndex(str(tmp_path), DIM, mode="ivf", nlist=4, nprobe=4, ivf_min_size=50)
+    assert reopened._ivf_trained_at == 60
+    assert np.array_equal(reopened._ivf_rows["assign"][:80], index._ivf_rows["assign"][:80])
+    for i in (0, 65, 79):
+        assert reopened.search(data[i], top_k=1)[0]["id"] == f"d{i}"
+
+
+def test_retraining_switches_other_processes_to_the_new_centroids(tmp_path):
+    writer = NumpyVectorIndex(str(tmp_path), DIM, mode="ivf", nlist=4, nprobe=4, ivf_min_size=10)
+    reader = NumpyVectorIndex(str(tmp_path), DIM, mode="ivf", nlist=4, nprobe=4, ivf_min_size=10)
+    data = vectors(50)
+    add(writer, [f"d{i}" for i in range(10)], data[:10])
+    assert reader.search(data[3], top_k=1)[0]["id"] == "d3"
+    assert reader._ivf_trained_at == 10
+    add(writer, [f"d{i}" for i in range(10, 50)], data[10:])
+    assert writer._ivf_trained_at == 50
+    assert reader.search(data[42], top_k=1)[0]["id"] == "d42"
+    assert reader._ivf_trained_at == 50
+    assert not os.path.exists(tmp_path / "ivf-10.rows")
+
+
+class FakeCollection:
+    def __init__(self):
+        self.exprs = []
+
+    def search(self, expr=None, **kwargs):
+        self.exprs.append(expr)
+        return [[]]
+
+
+def test_milvus_account_filter_cannot_be_extended():
+    store = MilvusVectorStore("localhost", 19530, "documents")
+    store._collection = FakeCollection()
+    store.search([0.1] * DIM, account_id='acme" or account_id != "')
+    store.search([0.1] * DIM)
+    assert store._collection.exprs == ['account_id == "acme\\" or account_id != \\""', None]
+    assert milvus_string_literal("a\\b") == '"a\\\\b"'
+    with pytest.raises(ValueError):
+        milvus_string_literal("acme\n")
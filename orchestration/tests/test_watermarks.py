@@ -0,0 +1,91 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import src.main as main
+from src.context import AssembledContext
+from src.llm import fallback_synthesis
+from src.models import Briefing
+from src.responses import dump_json
+from src.watermarks import AccountWatermarks, BriefingStore, POLL_OVERLAP
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _briefing(insight: str = "ACME is consolidating vendors", fallback: bool = False) -> Briefing:
+    output = fallback_synthesis("q") if fallback else {"insight": insight, "confidence": 0.8, "model": "m"}
+    return main._build_briefing("acme", "ae", output, query="q")
+
+
+def _store(tmp_path) -> BriefingStore:
+    return BriefingStore(str(tmp_path / "briefings.sqlite"), dump_json, Briefing.model_validate_json)
+
+
+def test_watermarks_unknown_until_first_poll():
+    marks = AccountWatermarks()
+    assert marks.get("acme") is None
+    assert marks.apply([]) == 0
+    assert marks.get("acme") == 0
+
+
+def test_watermarks_only_move_forward():
+    marks = AccountWatermarks()
+    assert marks.apply([("acme", 5, NOW), ("beta", 2, NOW)]) == 2
+    assert marks.apply([("acme", 3, NOW + timedelta(seconds=1))]) == 0
+    assert marks.get("acme") == 5
+    assert marks.poll_since() == NOW + timedelta(seconds=1) - POLL_OVERLAP
+
+
+def test_store_round_trip_and_invalidate(tmp_path):
+    store = _store(tmp_path)
+    briefing = _briefing()
+    store.put("acme", "ae", " q ", 7, briefing, deltas=2)
+    stored = store.get("acme", "ae", "q")
+    assert (stored.watermark, stored.deltas, stored.origin) == (7, 2, "request")
+    assert stored.briefing == briefing
+    assert store.invalidate("acme") == 1
+    assert store.get("acme", "ae", "q") is None
+
+
+def test_fallback_briefings_are_not_stored(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(main, "briefing_store", store)
+    context = AssembledContext("ctx", [], 0, {})
+    context.watermark = 4
+
+    asyncio.run(main._store_briefing("acme", "ae", "q", context, _briefing(fallback=True)))
+    assert store.get("acme", "ae", "q") is None
+
+    asyncio.run(main._store_briefing("acme", "ae", "q", context, _briefing()))
+    assert store.get("acme", "ae", "q").watermark == 4
+
+
+def test_unknown_watermark_is_not_stored(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(main, "briefing_store", store)
+    asyncio.run(main._store_briefing("acme", "ae", "q", AssembledContext("ctx", [], 0, {}), _briefing()))
+    assert store.get("acme", "ae", "q") is None
+
+
+def test_prewarmed_briefings_served_unchanged_count_as_prewarmed_hits(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(main, "briefing_store", store)
+    monkeypatch.setattr(main, "retriever", object())
+    marks = AccountWatermarks()
+    marks.apply([("acme", 4, NOW)])
+    monkeypatch.setattr(main, "account_watermarks", marks)
+    context = AssembledContext("ctx", [], 0, {})
+    context.watermark = 4
+
+    async def run():
+        before = json.loads((await main.prewarm_stats()).body)["served"]
+        await main._store_briefing("acme", "ae", "q", context, _briefing(), origin="prewarm")
+        served = await main._watermark_briefing("acme", "ae", "q")
+        after = json.loads((await main.prewarm_stats()).body)["served"]
+        return before, served, after
+
+    before, served, after = asyncio.run(run())
+    assert served is not None and store.get("acme", "ae", "q").origin == "prewarm"
+    assert after["prewarmed"] == before["prewarmed"] + 1
+    assert after["cached"] == before["cached"]
+    assert store.stats()["unchanged_by_origin"] == {"request": 0, "prewarm": 1}